@@ -3,8 +3,10 @@ import logging
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_socketio import SocketIO
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
+from services.sqlite_profile import SQLiteProfile, is_sqlite
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -26,15 +28,39 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_recycle": 300,
     "pool_pre_ping": True,
 }
+if is_sqlite(app.config["SQLALCHEMY_DATABASE_URI"]):
+    # Connections are shared by the monitoring thread, job workers and request threads
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"]["connect_args"] = {"check_same_thread": False, "timeout": 30}
 
 # Initialize extensions
 db.init_app(app)
 socketio.init_app(app, cors_allowed_origins="*", async_mode='threading')
 
+# WAL pragmas, single-writer queue and read-only query connections for SQLite
+sqlite_profile = SQLiteProfile(app, db)
+
+def _add_missing_columns():
+    """create_all() never alters existing tables; add nullable columns introduced since"""
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                column_type = column.type.compile(db.engine.dialect)
+                db.session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                logging.info(f"Added column {table.name}.{column.name}")
+    db.session.commit()
+
 with app.app_context():
     # Import models to ensure tables are created
     import models
     db.create_all()
+    _add_missing_columns()
 
 # Import routes
 import routes
+
+# Fail jobs orphaned by dead processes once per process, then keep this process's jobs alive
+routes.job_queue.start()
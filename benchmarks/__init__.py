@@ -0,0 +1,12 @@
+"""Offline benchmarks for the monitoring pipeline.
+
+Upstream clients (yfinance, FRED, pytrends, NewsAPI/GNews, Reddit, Gemini/OpenAI and the
+alert webhooks) are replaced with stubs that replay responses from
+benchmarks/fixtures/upstreams.json, so results are reproducible and need no network.
+The checked-in fixture is synthetic (record.py --synthetic, seed 7); its "source" field
+says so, and is copied into every results file.
+
+    python -m benchmarks.run                      # run and save results JSON
+    python -m benchmarks.run --compare old.json   # flag regressions against a saved run
+    python -m benchmarks.record                   # refresh the fixture from live upstreams
+"""
@@ -0,0 +1,215 @@
+import os
+import json
+from collections import namedtuple
+from contextlib import ExitStack, contextmanager
+from types import SimpleNamespace
+from unittest import mock
+
+import pandas as pd
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'upstreams.json')
+
+# Credentials the collectors check before calling an upstream; the stubs ignore the values
+FIXTURE_ENVIRONMENT = {
+    'FRED_API_KEY': 'fixture',
+    'NEWSAPI_KEY': 'fixture0000000000000000000000000',
+    'GNEWS_KEY': 'fixture',
+    'REDDIT_CLIENT_ID': 'fixture',
+    'REDDIT_CLIENT_SECRET': 'fixture',
+    'GEMINI_API_KEY': 'fixture',
+    'OPENAI_API_KEY': 'fixture',
+    'DISCORD_WEBHOOK_URL': 'https://discord.invalid/api/webhooks/fixture',
+    'TELEGRAM_BOT_TOKEN': 'fixture',
+    'TELEGRAM_CHAT_ID': 'fixture',
+    'SENDER_EMAIL': 'fixture@example.invalid',
+    'EMAIL_PASSWORD': 'fixture',
+    'RECIPIENT_EMAILS': 'fixture@example.invalid'
+}
+
+OptionChain = namedtuple('OptionChain', ['calls', 'puts'])
+
+
+def load_fixture(path=None):
+    with open(path or FIXTURE_PATH) as f:
+        return json.load(f)
+
+
+class FixtureTicker:
+    """yfinance.Ticker replaying recorded daily and 1-minute bars"""
+
+    def __init__(self, fixture, symbol):
+        self.fixture = fixture
+        self.symbol = symbol
+
+    def history(self, period=None, interval='1d', start=None, end=None, **kwargs):
+        if interval == '1m':
+            return self._intraday()
+
+        bars = self.fixture['daily'].get(self.symbol)
+        if not bars:
+            return pd.DataFrame()
+
+        # Re-date the recorded bars so they end today, keeping date-range queries meaningful
+        index = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=len(bars['close']))
+        frame = pd.DataFrame({'Close': bars['close'], 'Volume': bars['volume']}, index=index)
+
+        if start is not None:
+            frame = frame[frame.index >= pd.Timestamp(start).normalize()]
+            if end is not None:
+                frame = frame[frame.index < pd.Timestamp(end)]
+            return frame
+        return frame.tail(self._period_rows(period, len(frame)))
+
+    @property
+    def options(self):
+        return tuple(self.fixture['options']['expirations'])
+
+    def option_chain(self, expiration=None):
+        chain = self.fixture['options']
+        return OptionChain(calls=pd.DataFrame(chain['calls']), puts=pd.DataFrame(chain['puts']))
+
+    @property
+    def info(self):
+        return {'previousClose': self.fixture['options']['previous_close']}
+
+    def _intraday(self):
+        bars = self.fixture['intraday'].get(self.symbol)
+        if not bars:
+            return pd.DataFrame()
+        index = pd.date_range(end=pd.Timestamp.now().floor('min'), periods=len(bars['close']), freq='min')
+        return pd.DataFrame({'Close': bars['close']}, index=index)
+
+    def _period_rows(self, period, available):
+        if not period or period == 'max':
+            return available
+        if period.endswith('mo'):
+            return int(period[:-2]) * 21
+        if period.endswith('y'):
+            return int(period[:-1]) * 252
+        if period.endswith('d'):
+            return int(period[:-1])
+        return available
+
+
+class FixtureFred:
+    def __init__(self, fixture, api_key=None):
+        self.fixture = fixture
+
+    def get_series(self, series_id, limit=None, **kwargs):
+        value = self.fixture['fred'].get(series_id)
+        if value is None:
+            return pd.Series(dtype=float)
+        return pd.Series([value], index=[pd.Timestamp.now().normalize()])
+
+
+class FixtureTrendReq:
+    def __init__(self, fixture, *args, **kwargs):
+        self.fixture = fixture
+        self.keywords = []
+
+    def build_payload(self, kw_list, **kwargs):
+        self.keywords = list(kw_list)
+
+    def interest_over_time(self):
+        trends = self.fixture['trends']
+        frame = pd.DataFrame(trends['rows'], columns=trends['columns'])
+        frame.index = pd.date_range(end=pd.Timestamp.now().floor('h'), periods=len(frame), freq='h')
+        return frame[[k for k in self.keywords if k in frame.columns]]
+
+
+class FixtureReddit:
+    def __init__(self, fixture, *args, **kwargs):
+        self.fixture = fixture
+
+    def subreddit(self, name):
+        titles = self.fixture['reddit']['titles']
+        posts = lambda limit=10: [SimpleNamespace(title=t) for t in titles[:limit]]
+        return SimpleNamespace(hot=posts, new=posts)
+
+
+class FixtureResponse:
+    def __init__(self, payload=None, status_code=200):
+        self.payload = payload if payload is not None else {}
+        self.status_code = status_code
+        self.text = json.dumps(self.payload)
+
+    def json(self):
+        return self.payload
+
+
+class FixtureGenAIClient:
+    def __init__(self, fixture, *args, **kwargs):
+        text = json.dumps(fixture['llm']['risk_analysis'])
+        self.models = SimpleNamespace(generate_content=lambda **kw: SimpleNamespace(text=text))
+
+
+class FixtureOpenAI:
+    def __init__(self, fixture, *args, **kwargs):
+        def create(messages=(), **kw):
+            system = messages[0]['content'] if messages else ''
+            key = 'alert_insights' if 'alert' in system.lower() else 'risk_analysis'
+            message = SimpleNamespace(content=json.dumps(fixture['llm'][key]))
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+
+class FixtureSMTP:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def starttls(self):
+        pass
+
+    def login(self, *args):
+        pass
+
+    def send_message(self, *args, **kwargs):
+        pass
+
+
+@contextmanager
+def replay_upstreams(fixture=None):
+    """Patch every upstream client used by the monitoring cycle to replay the fixture"""
+    fixture = fixture or load_fixture()
+
+    def fixture_get(url, *args, **kwargs):
+        if 'newsapi.org' in url:
+            return FixtureResponse(fixture['news']['newsapi'])
+        if 'gnews.io' in url:
+            return FixtureResponse(fixture['news']['gnews'])
+        return FixtureResponse(status_code=404)
+
+    def fixture_post(url, *args, **kwargs):
+        return FixtureResponse(status_code=204 if 'discord' in url else 200)
+
+    patches = [
+        mock.patch.dict(os.environ, FIXTURE_ENVIRONMENT),
+        mock.patch('yfinance.Ticker', lambda symbol, *a, **kw: FixtureTicker(fixture, symbol)),
+        mock.patch('fredapi.Fred', lambda *a, **kw: FixtureFred(fixture)),
+        mock.patch('services.data_collector.Fred', lambda *a, **kw: FixtureFred(fixture)),
+        mock.patch('services.google_trends.TrendReq', lambda *a, **kw: FixtureTrendReq(fixture)),
+        mock.patch('praw.Reddit', lambda *a, **kw: FixtureReddit(fixture)),
+        mock.patch('requests.get', fixture_get),
+        mock.patch('requests.post', fixture_post),
+        mock.patch('google.genai.Client', lambda *a, **kw: FixtureGenAIClient(fixture)),
+        mock.patch('services.llm_risk_analyzer.OpenAI', lambda *a, **kw: FixtureOpenAI(fixture)),
+        mock.patch('smtplib.SMTP', FixtureSMTP)
+    ]
+
+    # Start from a cold options cache and seen-text state so every replay fetches the fixture
+    from services.options_analytics import spy_options
+    from services.text_ingestion import text_ingestor
+    spy_options.clear()
+    text_ingestor.reset()
+
+    with ExitStack() as stack:
+        for patch in patches:
+            stack.enter_context(patch)
+        yield fixture
@@ -0,0 +1,197 @@
+import os
+import sys
+import json
+import logging
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.fixtures import FIXTURE_PATH
+
+# Symbols fetched as daily bars (engineer_features, sector and breadth features)
+DAILY_SYMBOLS = {
+    'SPY': 320, 'IWM': 30, '^VIX': 10, '^VIX9D': 10,
+    'XLF': 10, 'XLK': 10, 'XLV': 10, 'XLE': 10, 'XLI': 10,
+    'XLU': 10, 'XLB': 10, 'XLRE': 10, 'XLP': 10, 'XLY': 10
+}
+
+# Symbols fetched as 1-minute bars by collect_market_data and the Treasury curve
+INTRADAY_SYMBOLS = [
+    'SPY', '^VIX', 'DX-Y.NYB', 'QQQ', 'XLRE', 'VNQ', 'IYR', '^TNX', 'GDX', 'GLD',
+    'USO', 'TLT', 'HYG', 'LQD', '^IRX', '^FVX', '^TYX'
+]
+INTRADAY_BARS = 60
+
+FRED_SERIES = ['DFF', 'DGS10', 'BAMLH0A0HYM2', 'DEXUSEU', 'UNRATE', 'CPIAUCSL', 'GDP', 'UMCSENT', 'GDPC1']
+
+TREND_KEYWORDS = ['stock market crash', 'market volatility', 'recession', 'bull market', 'bear market']
+
+
+def synthetic_fixture(seed=7):
+    """Deterministic fixture with the recorded schema, for building the benchmark offline"""
+    rng = np.random.default_rng(seed)
+    levels = {'SPY': 560.0, 'IWM': 215.0, '^VIX': 24.0, '^VIX9D': 26.0, 'XLF': 47.0, 'XLK': 230.0,
+              'XLV': 150.0, 'XLE': 90.0, 'XLI': 130.0, 'DX-Y.NYB': 104.0, 'QQQ': 480.0, 'XLRE': 42.0,
+              'VNQ': 90.0, 'IYR': 95.0, '^TNX': 4.3, 'GDX': 38.0, 'GLD': 240.0, 'USO': 75.0,
+              'TLT': 92.0, 'HYG': 78.0, 'LQD': 108.0, '^IRX': 5.1, '^FVX': 4.1, '^TYX': 4.5,
+              'XLU': 78.0, 'XLB': 90.0, 'XLP': 82.0, 'XLY': 210.0}
+
+    def walk(start, n, vol):
+        return [round(float(v), 4) for v in start * np.exp(np.cumsum(rng.normal(0, vol, n)))]
+
+    daily = {}
+    for symbol, rows in DAILY_SYMBOLS.items():
+        vol = 0.05 if symbol.startswith('^VIX') else 0.011
+        daily[symbol] = {
+            'close': walk(levels[symbol], rows, vol),
+            'volume': [int(v) for v in rng.lognormal(17.5, 0.3, rows)]
+        }
+
+    intraday = {symbol: {'close': walk(levels[symbol], INTRADAY_BARS, 0.0006)} for symbol in INTRADAY_SYMBOLS}
+
+    strikes = np.arange(500, 621, 5, dtype=float)
+    spot = daily['SPY']['close'][-1]
+
+    def chain(is_put):
+        moneyness = (spot - strikes) / spot if is_put else (strikes - spot) / spot
+        return {
+            'strike': strikes.tolist(),
+            'volume': [int(v) for v in rng.poisson(4000 if is_put else 3000, len(strikes))],
+            'impliedVolatility': [round(float(0.16 + 0.35 * max(m, 0) + rng.normal(0, 0.005)), 4) for m in moneyness]
+        }
+
+    return {
+        'recorded_at': datetime.utcnow().isoformat(),
+        'source': f'synthetic (seed={seed})',
+        'daily': daily,
+        'intraday': intraday,
+        'options': {
+            'expirations': ['2026-10-23', '2026-10-30', '2026-11-20'],
+            'previous_close': spot,
+            'calls': chain(False),
+            'puts': chain(True)
+        },
+        'fred': {'DFF': 4.58, 'DGS10': 4.21, 'BAMLH0A0HYM2': 3.42, 'DEXUSEU': 1.09, 'UNRATE': 4.3,
+                 'CPIAUCSL': 318.4, 'GDP': 29890.0, 'UMCSENT': 68.1, 'GDPC1': 23510.0},
+        'trends': {
+            'columns': TREND_KEYWORDS,
+            'rows': [[int(v) for v in row] for row in rng.integers(5, 100, (24, len(TREND_KEYWORDS)))]
+        },
+        'news': {
+            'newsapi': {'status': 'ok', 'articles': [
+                {'title': 'Stocks slide as recession fears grow', 'description': 'Markets drop on weak data'},
+                {'title': 'Tech rally lifts Nasdaq to record high', 'description': 'Strong earnings fuel gains'},
+                {'title': 'Treasury yields rise ahead of Fed decision', 'description': None},
+                {'title': 'Oil prices fall on demand concerns', 'description': 'Energy shares decline'},
+                {'title': 'Volatility index jumps as investors sell', 'description': 'Bearish options flow'}
+            ]},
+            'gnews': {'articles': [
+                {'title': 'Stock market gains on bank earnings', 'description': 'Financials up'},
+                {'title': 'Futures fall after inflation surprise', 'description': 'Bond yields rise'}
+            ]}
+        },
+        'reddit': {'titles': [
+            'Bearish on SPY into earnings season', 'Bought more puts today', 'Is this the start of a crash?',
+            'Bullish case for small caps', 'Loss porn: down 40% this week', 'Profit taking on NVDA',
+            'Market up 2% on Fed hopes', 'Why I sell covered calls', 'Recession indicators thread',
+            'Daily discussion thread'
+        ]},
+        'llm': {
+            'risk_analysis': {
+                'risk_assessment': 'MODERATE',
+                'key_concerns': ['Elevated VIX', 'Rising credit spreads', 'Weak breadth'],
+                'market_narrative': 'Volatility is elevated while credit spreads widen modestly.',
+                'specific_recommendations': ['Hedge 10% of equity exposure with SPY puts'],
+                'watchlist': ['VIX term structure', 'HYG', 'DXY'],
+                'probability_scenarios': {'base': 0.6, 'correction': 0.3, 'crash': 0.1},
+                'time_horizon': 'short-term'
+            },
+            'alert_insights': {
+                'alert_title': 'Volatility rising',
+                'alert_message': 'VIX is elevated and sentiment is negative.',
+                'immediate_action': 'Review hedges on equity positions.',
+                'urgency_level': 3
+            }
+        }
+    }
+
+
+def record_fixture(base):
+    """Replace the market parts of a fixture with live responses; LLM and Reddit entries are kept"""
+    import requests
+    import yfinance as yf
+    from fredapi import Fred
+    from pytrends.request import TrendReq
+
+    fixture = dict(base)
+
+    for symbol, rows in DAILY_SYMBOLS.items():
+        history = yf.Ticker(symbol).history(period='2y' if rows > 252 else '3mo').tail(rows)
+        if not history.empty:
+            fixture['daily'][symbol] = {'close': history['Close'].round(4).tolist(),
+                                        'volume': history['Volume'].astype(int).tolist()}
+
+    for symbol in INTRADAY_SYMBOLS:
+        history = yf.Ticker(symbol).history(period='1d', interval='1m').tail(INTRADAY_BARS)
+        if not history.empty:
+            fixture['intraday'][symbol] = {'close': history['Close'].round(4).tolist()}
+
+    spy = yf.Ticker('SPY')
+    if spy.options:
+        chain = spy.option_chain(spy.options[0])
+        columns = ['strike', 'volume', 'impliedVolatility']
+        fixture['options'] = {
+            'expirations': list(spy.options[:3]),
+            'previous_close': spy.info.get('previousClose'),
+            'calls': chain.calls[columns].fillna(0).to_dict(orient='list'),
+            'puts': chain.puts[columns].fillna(0).to_dict(orient='list')
+        }
+
+    if os.getenv('FRED_API_KEY'):
+        fred = Fred(api_key=os.getenv('FRED_API_KEY'))
+        for series_id in FRED_SERIES:
+            fixture['fred'][series_id] = float(fred.get_series(series_id).dropna().iloc[-1])
+
+    pytrends = TrendReq(hl='en-US', tz=360)
+    pytrends.build_payload(TREND_KEYWORDS, cat=0, timeframe='now 1-d', geo='US', gprop='')
+    interest = pytrends.interest_over_time().tail(24)
+    if not interest.empty:
+        fixture['trends'] = {'columns': TREND_KEYWORDS, 'rows': interest[TREND_KEYWORDS].astype(int).values.tolist()}
+
+    if os.getenv('NEWSAPI_KEY'):
+        response = requests.get(f"https://newsapi.org/v2/everything?q=stock market OR SPY OR VIX&apiKey={os.getenv('NEWSAPI_KEY')}&sortBy=publishedAt&pageSize=10")
+        if response.status_code == 200:
+            fixture['news']['newsapi'] = response.json()
+
+    fixture['recorded_at'] = datetime.utcnow().isoformat()
+    fixture['source'] = 'live'
+    return fixture
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Record upstream responses for the offline benchmarks')
+    parser.add_argument('--output', default=FIXTURE_PATH)
+    parser.add_argument('--synthetic', action='store_true', help='build a deterministic fixture without network access')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        fixture = synthetic_fixture(args.seed)
+    else:
+        base = synthetic_fixture(args.seed)
+        if os.path.exists(args.output):
+            with open(args.output) as f:
+                base = json.load(f)
+        fixture = record_fixture(base)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(fixture, f, separators=(',', ':'))
+    logging.info(f"Wrote fixture ({fixture['source']}) to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import shutil
+import subprocess
+import tempfile
+from datetime import datetime
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'results')
+
+
+def measure(func, repeat=5, warmup=1):
+    """Wall-clock timings of repeated calls, in milliseconds"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def summarize(samples):
+    ms = np.asarray(samples) * 1000
+    return {
+        'repeat': len(ms),
+        'min_ms': float(ms.min()),
+        'median_ms': float(np.median(ms)),
+        'mean_ms': float(ms.mean()),
+        'max_ms': float(ms.max())
+    }
+
+
+def stage_deltas(before, after):
+    """Per-stage mean latency recorded by services.metrics between two snapshots"""
+    stages = {}
+    for key, (total, count) in after.items():
+        prev_total, prev_count = before.get(key, (0.0, 0))
+        if count > prev_count:
+            calls = count - prev_count
+            stages[key[0]] = {'calls': calls, 'mean_ms': (total - prev_total) / calls * 1000}
+    return dict(sorted(stages.items(), key=lambda item: -item[1]['mean_ms'] * item[1]['calls']))
+
+
+def run_benchmarks(repeat=5, cycles=5, fixture_path=None):
+    """Run the micro-benchmarks and the end-to-end monitoring cycle against recorded upstreams"""
+    from benchmarks.fixtures import load_fixture, replay_upstreams
+
+    fixture = load_fixture(fixture_path)
+    results = {'benchmarks': {}, 'fixture': {'source': fixture.get('source'), 'recorded_at': fixture.get('recorded_at')}}
+    bench = results['benchmarks']
+
+    with replay_upstreams(fixture):
+        from app import app, db
+        from models import AlertConfig
+        from monitoring import run_monitoring_cycle
+        from services.metrics import STAGE_SECONDS
+        from services.risk_calculator import RiskCalculator
+        from services.ml_risk_scorer import MLRiskScorer
+        from services.backtesting import Backtester
+        from services.alert_system import AlertSystem
+        from services.email_alerter import EmailAlerter
+        from services.keyword_sentiment import keyword_sentiment
+
+        logging.getLogger().setLevel(logging.WARNING)
+
+        with app.app_context():
+            for channel in ('email', 'discord', 'telegram'):
+                db.session.add(AlertConfig(channel=channel, enabled=True, threshold=0))
+            db.session.commit()
+
+            market_data = {'spy': 560.0, 'vix': 27.5, 'dxy': 104.2, 'ten_year': 4.2, 'credit_spread': 3.4,
+                           'three_month': 5.1, 'put_call_ratio': 1.15, 'skew': 0.04, 'unemployment': 4.3}
+            sentiment_data = {'reddit': -0.05, 'twitter': -0.02, 'news': -0.04}
+
+            # Risk calculator: one scalar score, and a vectorized pass over 24 years of daily rows
+            calculator = RiskCalculator()
+            bench['risk_calculator.scalar'] = measure(lambda: calculator.calculate_risk_score(market_data, sentiment_data), repeat * 20)
+            rng = np.random.default_rng(0)
+            n = 6000
+            market_arrays = {'spy': 400 + rng.normal(0, 1, n).cumsum(), 'vix': rng.uniform(12, 45, n), 'dxy': rng.uniform(95, 110, n)}
+            sentiment_arrays = {k: rng.normal(0, 0.1, n) for k in ('reddit', 'twitter', 'news')}
+            bench['risk_calculator.array_6000'] = measure(lambda: calculator.calculate_risk_score_array(market_arrays, sentiment_arrays), repeat)
+
+            # Keyword sentiment over a day's worth of headlines from the recorded articles
+            articles = fixture['news']['newsapi'].get('articles', []) + fixture['news']['gnews'].get('articles', [])
+            headlines = [f"{a.get('title') or ''} {a.get('description') or ''}" for a in articles] or ['']
+            headlines = (headlines * (5000 // len(headlines) + 1))[:5000]
+            bench['sentiment.keywords_5000'] = measure(lambda: keyword_sentiment.score_texts(headlines), repeat)
+
+            # ML: training writes models/ into the working directory, which the cycle then loads
+            ml_scorer = MLRiskScorer()
+            training_data = ml_scorer._generate_synthetic_training_data(200)
+            bench['ml.engineer_features'] = measure(lambda: ml_scorer.engineer_features(market_data, sentiment_data), repeat)
+            bench['ml.train_models_200'] = measure(lambda: ml_scorer.train_models(training_data), 1, warmup=0)
+            ml_scorer.load_models()
+            if ml_scorer.compiled is not None:
+                feature_values = ml_scorer.engineer_features(market_data, sentiment_data).values
+                bench['ml.compiled_predict'] = measure(lambda: ml_scorer.compiled.predict(feature_values), repeat * 20)
+            bench['ml.predict_market_risks'] = measure(lambda: ml_scorer.predict_market_risks(market_data, sentiment_data), repeat)
+
+            backtester = Backtester()
+            bench['backtest.4y'] = measure(lambda: backtester.run_backtest({'start_date': '2020-01-01', 'end_date': '2023-12-31'}), repeat)
+            bench['backtest.24y'] = measure(lambda: backtester.run_backtest({'start_date': '2000-01-01', 'end_date': '2023-12-31'}), repeat)
+
+            alerter = AlertSystem()
+            risk_score = {'value': 62.5, 'level': 'HIGH', 'components': calculator.calculate_risk_score(market_data, sentiment_data)['components'],
+                          'llm_insights': fixture['llm']['alert_insights']}
+            message = alerter._format_alert_message(risk_score)
+            bench['alerts.format_message'] = measure(lambda: alerter._format_alert_message(risk_score), repeat * 20)
+            bench['alerts.email_html'] = measure(lambda: EmailAlerter()._create_html_email('Alert', message), repeat * 20)
+
+        # End to end: each cycle builds its own services, as the scheduler does. Trends are
+        # refreshed by their own scheduled job, so the cycle only reads the cached series
+        from services.google_trends import google_trends
+        bench['trends.refresh'] = measure(lambda: google_trends.refresh(force=True), 1, warmup=0)
+        run_monitoring_cycle()
+        before = STAGE_SECONDS.snapshot_all()
+        bench['monitoring_cycle'] = measure(run_monitoring_cycle, cycles, warmup=0)
+        results['stages'] = stage_deltas(before, STAGE_SECONDS.snapshot_all())
+
+    return results
+
+
+def compare(current, baseline, threshold):
+    """Print median ratios against a saved run; returns the names that regressed"""
+    regressions = []
+    print(f"{'benchmark':<32} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}")
+    for name, stats in current['benchmarks'].items():
+        old = baseline.get('benchmarks', {}).get(name)
+        if not old or not old['median_ms']:
+            print(f"{name:<32} {'-':>12} {stats['median_ms']:>12.3f} {'new':>7}")
+            continue
+        ratio = stats['median_ms'] / old['median_ms']
+        flag = '  REGRESSION' if ratio > threshold else ''
+        print(f"{name:<32} {old['median_ms']:>12.3f} {stats['median_ms']:>12.3f} {ratio:>7.2f}{flag}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmarks for the monitoring pipeline')
+    parser.add_argument('--output', help='results JSON path (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', help='saved results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='median ratio counted as a regression')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--cycles', type=int, default=5)
+    parser.add_argument('--fixture', help='fixture JSON (default: benchmarks/fixtures/upstreams.json)')
+    args = parser.parse_args(argv)
+
+    output = os.path.abspath(args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json"))
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    fixture_path = os.path.abspath(args.fixture) if args.fixture else None
+
+    # Never touch the real database or models: everything runs in a scratch directory
+    workdir = tempfile.mkdtemp(prefix='risk-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    sys.path.insert(0, REPO_ROOT)
+    os.chdir(workdir)
+    try:
+        results = run_benchmarks(args.repeat, args.cycles, fixture_path)
+    finally:
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results.update({
+        'created_at': datetime.utcnow().isoformat(),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__
+    })
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved benchmark results to {output}")
+    print(f"Upstream fixture: {results['fixture']['source']} (recorded {results['fixture']['recorded_at']})")
+
+    print(f"\n{'stage':<32} {'calls':>6} {'mean ms':>10}")
+    for stage, stats in results['stages'].items():
+        print(f"{stage:<32} {stats['calls']:>6} {stats['mean_ms']:>10.3f}")
+    print()
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed beyond {args.threshold:.2f}x: {', '.join(regressions)}")
+            return 1
+    else:
+        for name, stats in results['benchmarks'].items():
+            print(f"{name:<32} {stats['median_ms']:>12.3f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
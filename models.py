@@ -42,3 +42,47 @@ class MLModel(db.Model):
     accuracy = db.Column(db.Float)
     training_data_size = db.Column(db.Integer)
     model_path = db.Column(db.String(255))
+
+class BackgroundJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)  # backtest, backtest_sweep, stress_scenarios, train_ml_model, train_advanced_ml, update_ml_models
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed, failed, cancelled
+    parameters = db.Column(JSON)
+    progress = db.Column(db.Float, default=0.0)
+    message = db.Column(db.String(255))
+    result = db.Column(JSON)  # Summary plus ids of persisted BacktestResult/MLModel rows
+    error = db.Column(db.Text)
+    cancel_requested = db.Column(db.Boolean, default=False)
+    owner = db.Column(db.String(100))  # host:pid:boot id of the process executing the job
+    heartbeat_at = db.Column(db.DateTime)  # Refreshed by the owner while the job is queued or running
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+class RiskScoreAggregate(db.Model):
+    """Hourly or daily roll-up of RiskScore rows that retention has compacted away"""
+    id = db.Column(db.Integer, primary_key=True)
+    resolution = db.Column(db.String(10), nullable=False)  # hour, day
+    bucket_start = db.Column(db.DateTime, nullable=False, index=True)
+    sample_count = db.Column(db.Integer, nullable=False)
+    score_mean = db.Column(db.Float, nullable=False)
+    score_min = db.Column(db.Float)
+    score_max = db.Column(db.Float)
+    score_last = db.Column(db.Float)
+    last_timestamp = db.Column(db.DateTime)
+    level = db.Column(db.String(20))  # Level of the last sample in the bucket
+    market_data = db.Column(JSON)  # Last sample's snapshot
+    sentiment_data = db.Column(JSON)
+
+    __table_args__ = (db.UniqueConstraint('resolution', 'bucket_start', name='uq_risk_score_aggregate_bucket'),)
+
+class SeenTextItem(db.Model):
+    """Reddit post or news article already scored by the text ingestion pipeline"""
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(20), nullable=False)  # reddit, newsapi, gnews
+    item_key = db.Column(db.String(64), nullable=False)  # Upstream id, or content hash when there is none
+    seen_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    published_at = db.Column(db.DateTime)
+    sentiment = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (db.UniqueConstraint('source', 'item_key', name='uq_seen_text_item_key'),)
@@ -2,44 +2,51 @@ import schedule
 import time
 import logging
 from threading import Thread
-from app import app, db, socketio
-from models import RiskScore, SystemLog
+from app import app, db, socketio, sqlite_profile
+from models import RiskScore
 from services.data_collector import DataCollector
 from services.risk_calculator import RiskCalculator
 from services.ml_risk_scorer import MLRiskScorer
+from services.feature_context import shared_feature_context
 from services.alert_system import AlertSystem
 from services.disaster_recovery import DisasterRecoveryManager
 from services.llm_risk_analyzer import LLMRiskAnalyzer
+from services.market_replay import MarketReplay
+from services.retention import RetentionManager
+from services.google_trends import google_trends
+from services.metrics import timed, MONITORING_CYCLES
+from services.system_log_writer import get_system_event_logger
 from datetime import datetime
 
 def log_system_event(level, message, component="monitoring"):
-    """Log system events to database"""
+    """Log system events to database (buffered and written in batches)"""
     try:
-        with app.app_context():
-            log_entry = SystemLog(
-                level=level,
-                message=message,
-                component=component
-            )
-            db.session.add(log_entry)
-            db.session.commit()
+        get_system_event_logger().log(logging.getLevelName(level), message, extra={'component': component})
     except Exception as e:
         logging.error(f"Failed to log system event: {e}")
 
+def _save_risk_score(risk_score):
+    """Write job for the single-writer queue"""
+    db.session.add(risk_score)
+    db.session.commit()
+
 def run_monitoring_cycle():
     """Run a single monitoring cycle"""
     try:
-        with app.app_context():
+        with app.app_context(), timed('monitoring_cycle'):
             # Initialize services
-            dr_manager = DisasterRecoveryManager()
-            collector = DataCollector(dr_manager)
-            calculator = RiskCalculator()
-            ml_scorer = MLRiskScorer()
-            alerter = AlertSystem()
-            llm_analyzer = LLMRiskAnalyzer()
+            with timed('service_init'):
+                dr_manager = DisasterRecoveryManager()
+                collector = DataCollector(dr_manager)
+                calculator = RiskCalculator()
+                ml_scorer = MLRiskScorer()
+                alerter = AlertSystem()
+                llm_analyzer = LLMRiskAnalyzer()
             
             # Load existing ML models or train new ones
-            if not ml_scorer.load_models():
+            with timed('ml_model_load'):
+                models_loaded = ml_scorer.load_models()
+            if not models_loaded:
                 logging.info("Training initial ML models...")
             
             # Collect data
@@ -47,8 +54,19 @@ def run_monitoring_cycle():
             sentiment_data = collector.collect_sentiment_data()
             
             # Calculate enhanced risk score with ML
-            basic_risk_score = calculator.calculate_risk_score(market_data, sentiment_data)
-            ml_predictions = ml_scorer.predict_market_risks(market_data, sentiment_data)
+            with timed('risk_calculation'):
+                basic_risk_score = calculator.calculate_risk_score(market_data, sentiment_data)
+            
+            # Historical context and this tick's features are built once here and shared with
+            # every web worker and job process
+            with timed('feature_context'):
+                feature_context = ml_scorer.build_feature_context()
+                features = ml_scorer.engineer_features(market_data, sentiment_data, context=feature_context)
+            ml_predictions = ml_scorer.predict_market_risks(market_data, sentiment_data, features=features)
+            try:
+                shared_feature_context.publish(feature_context, market_data, sentiment_data, features)
+            except OSError as e:
+                logging.warning(f"Could not publish feature context: {e}")
             
             # Combine basic and ML scores (weighted approach)
             combined_score = (basic_risk_score['value'] * 0.6) + (ml_predictions['ml_risk_score'] * 0.4)
@@ -70,8 +88,8 @@ def run_monitoring_cycle():
                 market_data=market_data,
                 sentiment_data=sentiment_data
             )
-            db.session.add(new_score)
-            db.session.commit()
+            with timed('db_risk_score'):
+                sqlite_profile.writes.run(lambda: _save_risk_score(new_score))
             
             # Send intelligent alerts with LLM insights
             if risk_score['value'] >= 40:
@@ -82,20 +100,61 @@ def run_monitoring_cycle():
                 log_system_event("WARNING", f"Intelligent risk alert sent: {risk_score['level']} ({risk_score['value']}) - {alert_insights.get('alert_title', 'Risk Alert')}")
             
             # Emit real-time update via WebSocket with LLM analysis
-            socketio.emit('risk_update', {
-                'risk_score': risk_score,
-                'market_data': market_data,
-                'sentiment_data': sentiment_data,
-                'llm_analysis': llm_analysis,
-                'timestamp': datetime.utcnow().isoformat()
-            })
+            with timed('socketio_emit'):
+                socketio.emit('risk_update', {
+                    'risk_score': risk_score,
+                    'market_data': market_data,
+                    'sentiment_data': sentiment_data,
+                    'llm_analysis': llm_analysis,
+                    'timestamp': datetime.utcnow().isoformat()
+                })
             
             log_system_event("INFO", "✅ Monitoring cycle complete")
+        MONITORING_CYCLES.inc(status='success')
             
     except Exception as e:
+        MONITORING_CYCLES.inc(status='failed')
         logging.error(f"Error in monitoring cycle: {e}")
         log_system_event("ERROR", f"Monitoring cycle failed: {str(e)}")
 
+def refresh_replay_store():
+    """Refresh cached daily bars and RiskScore roll-ups used by replay backtests"""
+    try:
+        replay = MarketReplay()
+        replay.refresh_daily_bars(period='1mo' if replay.available_range() else 'max')
+        replay.sync_observations()
+        log_system_event("INFO", "Replay store refreshed", component="backtesting")
+    except Exception as e:
+        logging.error(f"Error refreshing replay store: {e}")
+
+def run_retention():
+    """Compact, archive and prune old RiskScore/SystemLog rows in small batches"""
+    try:
+        with app.app_context():
+            summary = RetentionManager().run()
+        if summary['risk_scores_compacted'] or summary['system_logs_archived']:
+            log_system_event("INFO", f"Retention: compacted {summary['risk_scores_compacted']} risk scores, "
+                                     f"archived {summary['system_logs_archived']} log entries", component="retention")
+    except Exception as e:
+        logging.error(f"Error running retention: {e}")
+
+def refresh_google_trends():
+    """Refresh the cached Google Trends series when due (hourly, longer while backing off)"""
+    try:
+        google_trends.refresh()
+    except Exception as e:
+        logging.error(f"Error refreshing Google Trends: {e}")
+
+def update_ml_models():
+    """Queue the daily online update of the ML models (a full refit when one is due)"""
+    try:
+        from routes import job_queue
+        with app.app_context():
+            job_id = job_queue.submit('update_ml_models', {})
+        log_system_event("INFO", f"ML model update queued (job {job_id})", component="ml")
+    except Exception as e:
+        logging.error(f"Error queueing ML model update: {e}")
+
 def start_monitoring_system():
     """Start the monitoring system with scheduled tasks"""
     logging.info("🚀 Starting monitoring system background tasks")
@@ -103,6 +162,19 @@ def start_monitoring_system():
     # Schedule monitoring cycle every minute
     schedule.every(1).minutes.do(run_monitoring_cycle)
     
+    # Keep the backtest replay store current once a day, after the US close
+    schedule.every().day.at("22:30").do(refresh_replay_store)
+    
+    # Fold the day's observations into the ML models once the replay store is current
+    schedule.every().day.at("23:00").do(update_ml_models)
+    
+    # Retention works through old rows a few batches at a time
+    schedule.every(10).minutes.do(run_retention)
+    
+    # Google Trends refreshes on its own cadence; checking often lets backoff expire promptly
+    refresh_google_trends()
+    schedule.every(5).minutes.do(refresh_google_trends)
+    
     # Run continuously
     while True:
         try:
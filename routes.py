@@ -1,17 +1,25 @@
-from flask import render_template, request, jsonify, redirect, url_for
+from flask import render_template, request, jsonify, redirect, url_for, Response
 from flask_socketio import emit
-from app import app, db, socketio
+from app import app, db, socketio, sqlite_profile
 from models import RiskScore, AlertConfig, SystemLog, BacktestResult, MLModel
 from services.risk_calculator import RiskCalculator
 from services.data_collector import DataCollector
 from services.alert_system import AlertSystem
 from services.backtesting import Backtester
+from services.backtest_sweep import BacktestSweep
 from services.ml_integration import MLIntegration
 from services.ml_trainer import MLTrainer
 from services.disaster_recovery import DisasterRecoveryManager
+from services.job_queue import JobQueue
+from services.model_store import ModelStore
+from services.feature_context import shared_feature_context
+from services.metrics import registry as metrics_registry
 from datetime import datetime, timedelta
+import os
 import json
 import logging
+import threading
+import time
 
 # Initialize services lazily
 dr_manager = None
@@ -22,6 +30,9 @@ backtester = None
 ml_integration = None
 ml_trainer = None
 
+# Background jobs keep long backtests and training out of the request thread
+job_queue = JobQueue()
+
 def init_services():
     global dr_manager, data_collector, risk_calculator, alert_system, backtester, ml_integration, ml_trainer
     try:
@@ -64,11 +75,48 @@ def init_services():
 #         <p><a href="/health">Health Check</a> | <a href="/admin">Admin Panel</a></p>
 #         """, 200
 
+def _save_model(instance):
+    """Write job for the single-writer queue"""
+    db.session.add(instance)
+    db.session.commit()
+
+# Loaded MLRiskScorer shared by batch predictions, reloaded when the saved models change
+batch_ml_scorer = None
+batch_ml_scorer_version = None
+batch_ml_scorer_lock = threading.Lock()
+BATCH_PREDICT_MAX_SCENARIOS = int(os.getenv('BATCH_PREDICT_MAX_SCENARIOS', '10000'))
+
+def _fresh_tick_snapshot():
+    """The monitoring cycle's shared tick when its features are at most FEATURE_CONTEXT_TTL old, else None"""
+    from services.ml_risk_scorer import FEATURE_CONTEXT_TTL
+    snapshot = shared_feature_context.attach()
+    if snapshot is None or snapshot.features is None or snapshot.age() > FEATURE_CONTEXT_TTL:
+        return None
+    return snapshot
+
+def _get_batch_ml_scorer():
+    global batch_ml_scorer, batch_ml_scorer_version
+    from services.ml_risk_scorer import MLRiskScorer
+    
+    # A new publish swaps the store's current version; reload when it changes
+    version = ModelStore().current_version()
+    with batch_ml_scorer_lock:
+        if batch_ml_scorer is None or version != batch_ml_scorer_version:
+            scorer = MLRiskScorer()
+            scorer.load_models()
+            batch_ml_scorer, batch_ml_scorer_version = scorer, version
+        return batch_ml_scorer
+
 @app.route('/health')
 def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+@app.route('/metrics')
+def metrics():
+    """Per-stage latency histograms and counters in Prometheus text format"""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/admin')
 def admin():
     """Admin panel for system configuration"""
@@ -110,8 +158,7 @@ def get_risk_data():
             market_data=market_data,
             sentiment_data=sentiment_data
         )
-        db.session.add(new_score)
-        db.session.commit()
+        sqlite_profile.writes.run(lambda: _save_model(new_score))
         
         # Get LLM analysis
         try:
@@ -148,7 +195,8 @@ def quick_data():
         init_services()
         
         # Get only the latest database record instead of collecting new data
-        latest_score = RiskScore.query.order_by(RiskScore.timestamp.desc()).first()
+        with sqlite_profile.read_session() as session:
+            latest_score = session.query(RiskScore).order_by(RiskScore.timestamp.desc()).first()
         
         if latest_score:
             # Ensure proper data structure
@@ -268,11 +316,12 @@ def test_data():
 def test_historical():
     """Simple test for historical data without complex queries"""
     try:
-        # Simple count query first
-        count = RiskScore.query.count()
-        
-        # Get just 5 records
-        scores = RiskScore.query.order_by(RiskScore.id.desc()).limit(5).all()
+        with sqlite_profile.read_session() as session:
+            # Simple count query first
+            count = session.query(RiskScore).count()
+            
+            # Get just 5 records
+            scores = session.query(RiskScore).order_by(RiskScore.id.desc()).limit(5).all()
         
         data = []
         for score in scores:
@@ -311,6 +360,27 @@ def get_historical_data():
         'count': 9
     })
 
+@app.route('/api/risk_history')
+def risk_history():
+    """Risk score history spanning raw rows, compacted aggregates and archives"""
+    try:
+        from services.retention import RetentionManager
+
+        end = datetime.fromisoformat(request.args['end']) if 'end' in request.args else datetime.utcnow()
+        start = datetime.fromisoformat(request.args['start']) if 'start' in request.args else end - timedelta(days=30)
+        resolution = request.args.get('resolution', 'auto')
+        if resolution not in ('auto', 'raw', 'hour', 'day'):
+            return jsonify({'success': False, 'error': f"Unknown resolution: {resolution}"}), 400
+
+        with sqlite_profile.read_session() as session:
+            data = RetentionManager().risk_history(start, end, resolution, session=session)
+        return jsonify({'success': True, 'data': data, 'count': len(data)})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logging.error(f"Error getting risk history: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/update_alert_config', methods=['POST'])
 def update_alert_config():
     """API endpoint to update alert configuration"""
@@ -338,56 +408,84 @@ def update_alert_config():
 
 @app.route('/api/run_backtest', methods=['POST'])
 def run_backtest():
-    """API endpoint to run backtesting"""
+    """API endpoint to queue a backtest as a background job"""
     try:
-        data = request.get_json()
-        name = data.get('name', 'Backtest')
-        parameters = data.get('parameters', {})
-        
-        # Run backtest
-        results = backtester.run_backtest(parameters)
-        
-        # Save results
-        backtest_result = BacktestResult(
-            name=name,
-            parameters=parameters,
-            results=results,
-            performance_metrics=backtester.calculate_performance_metrics(results)
-        )
-        db.session.add(backtest_result)
-        db.session.commit()
-        
-        return jsonify({'success': True, 'results': results})
+        job_id = job_queue.submit('backtest', request.get_json() or {})
+        return jsonify({'success': True, 'job_id': job_id, 'status': 'queued'}), 202
+    except Exception as e:
+        logging.error(f"Error queuing backtest: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/backtest_results/<int:result_id>')
+def get_backtest_result(result_id):
+    """API endpoint to fetch a stored backtest, sweep or stress test result"""
+    backtest_result = db.session.get(BacktestResult, result_id)
+    if backtest_result is None:
+        return jsonify({'success': False, 'error': 'Backtest result not found'}), 404
+    return jsonify({'success': True, 'backtest_result': {
+        'id': backtest_result.id,
+        'name': backtest_result.name,
+        'timestamp': backtest_result.timestamp.isoformat() if backtest_result.timestamp else None,
+        'parameters': backtest_result.parameters,
+        'results': backtest_result.results,
+        'performance_metrics': backtest_result.performance_metrics
+    }})
+
+@app.route('/api/run_backtest_sweep', methods=['POST'])
+def run_backtest_sweep():
+    """API endpoint to queue a ranked grid of backtest parameters"""
+    try:
+        data = request.get_json() or {}
+        BacktestSweep(max_workers=1).expand_grid(data.get('parameters', {}))  # Reject a bad grid before queuing
+        job_id = job_queue.submit('backtest_sweep', data)
+        return jsonify({'success': True, 'job_id': job_id, 'status': 'queued'}), 202
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
-        logging.error(f"Error running backtest: {e}")
+        logging.error(f"Error queuing backtest sweep: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/run_stress_scenarios', methods=['POST'])
+def run_stress_scenarios():
+    """API endpoint to queue a Monte Carlo stress test of the strategy"""
+    try:
+        job_id = job_queue.submit('stress_scenarios', request.get_json() or {})
+        return jsonify({'success': True, 'job_id': job_id, 'status': 'queued'}), 202
+    except Exception as e:
+        logging.error(f"Error queuing stress scenarios: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/train_ml_model', methods=['POST'])
 def train_ml_model():
-    """API endpoint to train ML model"""
+    """API endpoint to queue ML model training"""
     try:
-        data = request.get_json()
-        model_name = data.get('name', 'Risk Predictor')
-        
-        # Train model
-        model_path, accuracy, training_size = ml_trainer.train_model()
-        
-        # Save model info
-        ml_model = MLModel(
-            name=model_name,
-            version="1.0",
-            accuracy=accuracy,
-            training_data_size=training_size,
-            model_path=model_path
-        )
-        db.session.add(ml_model)
-        db.session.commit()
-        
-        return jsonify({'success': True, 'accuracy': accuracy})
+        job_id = job_queue.submit('train_ml_model', request.get_json() or {})
+        return jsonify({'success': True, 'job_id': job_id, 'status': 'queued'}), 202
     except Exception as e:
-        logging.error(f"Error training ML model: {e}")
+        logging.error(f"Error queuing ML model training: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/jobs')
+def list_jobs():
+    """API endpoint to list recent background jobs"""
+    return jsonify({'success': True, 'jobs': job_queue.list_recent()})
+
+@app.route('/api/jobs/<int:job_id>')
+def get_job(job_id):
+    """API endpoint to poll a background job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job})
+
+@app.route('/api/jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """API endpoint to cancel a queued or running job"""
+    job = job_queue.cancel(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job})
+
 @app.route('/api/ml_predict', methods=['POST'])
 def ml_predict():
     """API endpoint for ML predictions"""
@@ -408,8 +506,14 @@ def ml_predict():
             if not success:
                 return jsonify({'success': False, 'error': 'Failed to train ML models'})
         
-        # Get ML predictions
-        predictions = ml_scorer.predict_market_risks(market_data, sentiment_data)
+        # Without market data, predict the current tick from the features the monitoring cycle shared;
+        # once those are stale (monitoring stopped) the features are engineered here instead
+        snapshot = _fresh_tick_snapshot()
+        if not market_data and snapshot is not None:
+            predictions = ml_scorer.predict_market_risks(snapshot.market_data or {}, snapshot.sentiment_data or {},
+                                                         features=snapshot.features)
+        else:
+            predictions = ml_scorer.predict_market_risks(market_data, sentiment_data)
         
         return jsonify({
             'success': True,
@@ -420,6 +524,57 @@ def ml_predict():
         logging.error(f"Error making ML prediction: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/ml_predict_batch', methods=['POST'])
+def ml_predict_batch():
+    """API endpoint scoring many hypothetical market states in one call"""
+    try:
+        data = request.get_json(silent=True) or {}
+        scenarios = data.get('scenarios')
+        if not isinstance(scenarios, list) or not scenarios:
+            return jsonify({'success': False, 'error': 'scenarios must be a non-empty list'}), 400
+        if len(scenarios) > BATCH_PREDICT_MAX_SCENARIOS:
+            return jsonify({'success': False, 'error': f'At most {BATCH_PREDICT_MAX_SCENARIOS} scenarios per call'}), 400
+        if not all(isinstance(scenario, dict) for scenario in scenarios):
+            return jsonify({'success': False, 'error': 'Each scenario must be an object with market_data and sentiment_data'}), 400
+        
+        start_time = time.perf_counter()
+        ml_scorer = _get_batch_ml_scorer()
+        predictions = ml_scorer.predict_batch(scenarios)
+        
+        return jsonify({
+            'success': True,
+            'count': len(scenarios),
+            'models_loaded': 'features' in ml_scorer.scalers,
+            'elapsed_ms': round((time.perf_counter() - start_time) * 1000, 3),
+            'predictions': predictions
+        })
+        
+    except Exception as e:
+        logging.error(f"Error making batch ML prediction: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/ml_explain', methods=['POST'])
+def ml_explain():
+    """API endpoint returning per-feature TreeSHAP attributions for one market state"""
+    try:
+        data = request.get_json(silent=True) or {}
+        ml_scorer = _get_batch_ml_scorer()
+        snapshot = _fresh_tick_snapshot()
+        if not data.get('market_data') and snapshot is not None:
+            features = snapshot.features
+        else:
+            features = ml_scorer.engineer_features(data.get('market_data', {}), data.get('sentiment_data', {}),
+                                                   context=ml_scorer.get_feature_context())
+        explanations = ml_scorer.explain(features, data.get('models'))
+        if not explanations:
+            return jsonify({'success': False, 'error': 'No explainable models are loaded'}), 404
+        
+        return jsonify({'success': True, 'explanations': explanations})
+        
+    except Exception as e:
+        logging.error(f"Error explaining ML prediction: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @socketio.on('connect')
 def handle_connect():
     """Handle WebSocket connection"""
@@ -443,50 +598,45 @@ def handle_update_request():
         logging.error(f"Error sending update: {e}")
         emit('error', {'message': str(e)})
 
-@app.route('/api/train_advanced_ml', methods=['POST'])
-def train_advanced_ml():
-    """API endpoint to train advanced ML models"""
+@socketio.on('cancel_job')
+def handle_cancel_job(data):
+    """Handle job cancellation requested over WebSocket"""
+    job = job_queue.cancel(data.get('job_id'))
+    if job is None:
+        emit('error', {'message': 'Job not found'})
+
+@app.route('/api/ml_models/<int:model_id>/activate', methods=['POST'])
+def activate_ml_model(model_id):
+    """API endpoint to roll the ML models back (or forward) to a trained version"""
     try:
-        from services.ml_risk_scorer import MLRiskScorer
-        import pandas as pd
+        ml_model = db.session.get(MLModel, model_id)
+        store = ModelStore()
+        if ml_model is None or not (ml_model.model_path or '').startswith(store.versions_dir):
+            return jsonify({'success': False, 'error': 'Model version not found'}), 404
         
-        ml_scorer = MLRiskScorer()
-        
-        # Get historical data for training
-        historical_scores = RiskScore.query.order_by(RiskScore.timestamp.desc()).limit(1000).all()
+        version = os.path.basename(ml_model.model_path)
+        if not store.verify(version):
+            return jsonify({'success': False, 'error': f'Model version {version} is no longer available'}), 409
+        store.activate(version)
         
-        if len(historical_scores) < 10:
-            # Generate synthetic training data if insufficient real data
-            logging.info("Insufficient historical data, generating synthetic training data")
-            training_data = ml_scorer._generate_synthetic_training_data(500)
-        else:
-            # Convert historical scores to training format
-            training_data = []
-            for score in historical_scores:
-                training_data.append({
-                    'market_data': score.market_data or {},
-                    'sentiment_data': score.sentiment_data or {},
-                    'risk_score': score.score,
-                    'timestamp': score.timestamp
-                })
-            training_data = pd.DataFrame(training_data)
+        def write():
+            MLModel.query.filter(MLModel.model_path.like(f"{store.versions_dir}%")).update({'is_active': False})
+            db.session.get(MLModel, model_id).is_active = True
+            db.session.commit()
         
-        # Train the models
-        success = ml_scorer.train_models(training_data)
+        sqlite_profile.writes.run(write)
+        return jsonify({'success': True, 'ml_model_id': ml_model.id, 'artifact_version': version})
         
-        if success:
-            performance = ml_scorer.get_model_performance()
-            feature_importance = ml_scorer.get_feature_importance()
-            
-            return jsonify({
-                'success': True, 
-                'message': 'Advanced ML models trained successfully',
-                'performance': performance,
-                'feature_importance': feature_importance
-            })
-        else:
-            return jsonify({'success': False, 'error': 'Training failed'})
-            
     except Exception as e:
-        logging.error(f"Error training advanced ML models: {e}")
+        logging.error(f"Error activating ML model: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/train_advanced_ml', methods=['POST'])
+def train_advanced_ml():
+    """API endpoint to queue advanced ML model training"""
+    try:
+        job_id = job_queue.submit('train_advanced_ml', request.get_json(silent=True) or {})
+        return jsonify({'success': True, 'job_id': job_id, 'status': 'queued'}), 202
+    except Exception as e:
+        logging.error(f"Error queuing advanced ML training: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
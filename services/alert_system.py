@@ -4,6 +4,7 @@ from models import AlertConfig
 from services.email_alerter import EmailAlerter
 from services.discord_alerter import DiscordAlerter
 from services.telegram_alerter import TelegramAlerter
+from services.metrics import instrumented, timed, stage_failed
 
 class AlertSystem:
     def __init__(self):
@@ -11,6 +12,7 @@ class AlertSystem:
         self.discord_alerter = DiscordAlerter()
         self.telegram_alerter = TelegramAlerter()
     
+    @instrumented('alerts')
     def send_alert(self, risk_score):
         """Send alerts through configured channels"""
         try:
@@ -29,6 +31,7 @@ class AlertSystem:
             
         except Exception as e:
             logging.error(f"Error sending alerts: {e}")
+            stage_failed()
     
     def _format_alert_message(self, risk_score):
         """Format alert message with LLM insights"""
@@ -74,14 +77,15 @@ Timestamp: {risk_score.get('timestamp', 'N/A')}
     def _send_channel_alert(self, channel, subject, message, risk_score):
         """Send alert to specific channel"""
         try:
-            if channel == 'email':
-                self.email_alerter.send_email(subject, message)
-            elif channel == 'discord':
-                self.discord_alerter.send_alert(f"**{subject}**\n```\n{message}\n```")
-            elif channel == 'telegram':
-                self.telegram_alerter.send_alert(f"{subject}\n\n{message}")
-            else:
-                logging.warning(f"Unknown alert channel: {channel}")
+            with timed(f'alert_{channel}'):
+                if channel == 'email':
+                    self.email_alerter.send_email(subject, message)
+                elif channel == 'discord':
+                    self.discord_alerter.send_alert(f"**{subject}**\n```\n{message}\n```")
+                elif channel == 'telegram':
+                    self.telegram_alerter.send_alert(f"{subject}\n\n{message}")
+                else:
+                    logging.warning(f"Unknown alert channel: {channel}")
                 
         except Exception as e:
             logging.error(f"Error sending {channel} alert: {e}")
@@ -0,0 +1,205 @@
+import os
+import math
+import time
+import logging
+import itertools
+import functools
+import numpy as np
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from services.backtesting import Backtester
+
+# Rows of the shared market block; the remaining risk components are scalars
+SHARED_ROWS = ('spy', 'vix', 'sentiment', 'dxy', 'momentum')
+
+# Metrics a sweep can be ranked by
+RANK_METRICS = ('final_value', 'total_return', 'volatility', 'sharpe_ratio', 'max_drawdown', 'num_trades')
+
+# Per-process view of the market block in pool workers, filled in by _attach_shared_data.
+# Only pool worker processes use it; in-process sweeps pass their data explicitly.
+_shared = {}
+
+
+def _pool_context():
+    """Pool workers are never forked from this multi-threaded process; forkserver children
+    fork from a clean single-threaded server that only preloads this module"""
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+def _attach_shared_data(name, shape, scalar_components):
+    """Pool initializer: map the parent's market block read-only"""
+    shm = shared_memory.SharedMemory(name=name)
+    block = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    block.flags.writeable = False
+    _shared['shm'] = shm  # Keep the mapping alive for the life of the worker
+    _shared['block'] = block
+    _shared['scalars'] = scalar_components
+    _shared['backtester'] = Backtester()
+
+
+def _evaluate_pooled(task):
+    """Pool worker entry point, reading the block mapped by _attach_shared_data"""
+    return _evaluate_task(task, _shared['block'], _shared['scalars'], _shared['backtester'])
+
+
+def _evaluate_task(task, block, scalars, backtester):
+    """Score one weight set and run every (threshold, re-entry) pair against it"""
+    weights, pairs, initial_capital = task
+    rows = dict(zip(SHARED_ROWS, block))
+
+    components = {**scalars, **{name: rows[name] for name in SHARED_ROWS[1:]}}
+    risk_scores = backtester.risk_calculator.combine_component_arrays(components, weights)
+
+    results = []
+    for risk_threshold, reentry_ratio in pairs:
+        _, trade_idx, values = backtester._simulate(rows['spy'], risk_scores, initial_capital, risk_threshold, reentry_ratio)
+        results.append({
+            'risk_threshold': float(risk_threshold),
+            'reentry_ratio': float(reentry_ratio),
+            'weights': weights,
+            'num_trades': len(trade_idx),
+            **{k: float(v) for k, v in backtester._summarize(values, initial_capital).items()}
+        })
+    return results
+
+
+class BacktestSweep:
+    def __init__(self, max_workers=None):
+        self.backtester = Backtester()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_parallel_combinations = 500  # Below this a pool costs more than it saves
+
+    def run_sweep(self, parameters, progress_callback=None):
+        """Evaluate a grid of strategy parameters and rank the combinations"""
+        try:
+            start_time = time.perf_counter()
+
+            start_date = parameters.get('start_date', '2020-01-01')
+            end_date = parameters.get('end_date', '2023-12-31')
+            initial_capital = parameters.get('initial_capital', 100000)
+            top_n = parameters.get('top_n', 20)
+            rank_by, thresholds, reentry_ratios, weight_sets = self.expand_grid(parameters)
+
+            data_source = parameters.get('data_source', 'synthetic')
+
+            historical_data = self.backtester._load_historical_data(start_date, end_date, data_source)
+            components = self.backtester.risk_calculator.calculate_component_arrays(
+                self.backtester._market_columns(historical_data),
+                self.backtester._sentiment_columns(historical_data)
+            )
+
+            block = np.vstack([historical_data['spy'].to_numpy(dtype=float)] +
+                              [np.asarray(components[name], dtype=float) for name in SHARED_ROWS[1:]])
+            scalars = {k: v for k, v in components.items() if k not in SHARED_ROWS}
+
+            pairs = list(itertools.product(thresholds, reentry_ratios))
+            total = len(pairs) * len(weight_sets)
+            tasks = self._build_tasks(weight_sets, pairs, initial_capital, total)
+
+            if self.max_workers > 1 and total >= self.min_parallel_combinations:
+                rows = self._evaluate_parallel(tasks, block, scalars, progress_callback)
+            else:
+                rows = self._evaluate_local(tasks, block, scalars, progress_callback)
+
+            ranked = sorted(rows, key=lambda r: -np.inf if np.isnan(r[rank_by]) else r[rank_by], reverse=True)
+            elapsed = time.perf_counter() - start_time
+
+            logging.info(f"✅ Backtest sweep completed: {total} combinations in {elapsed:.2f}s")
+
+            return {
+                'combinations': total,
+                'rank_by': rank_by,
+                'elapsed_seconds': elapsed,
+                'ranking': ranked[:top_n]
+            }
+
+        except Exception as e:
+            logging.error(f"❌ Error running backtest sweep: {e}")
+            raise
+
+    def expand_grid(self, parameters):
+        """Validate a sweep's ranking metric and grid specs, returning
+        (rank_by, thresholds, reentry_ratios, weight_sets); raises ValueError on a bad spec"""
+        rank_by = parameters.get('rank_by', 'sharpe_ratio')
+        if rank_by not in RANK_METRICS:
+            raise ValueError(f"rank_by must be one of {', '.join(RANK_METRICS)}, not {rank_by!r}")
+
+        thresholds = self._expand_range(parameters.get('risk_threshold', 60), 'risk_threshold')
+        reentry_ratios = self._expand_range(parameters.get('reentry_ratio', 0.7), 'reentry_ratio')
+        weight_sets = self._expand_weights(parameters.get('weights') or {})
+        return rank_by, thresholds, reentry_ratios, weight_sets
+
+    def _build_tasks(self, weight_sets, pairs, initial_capital, total):
+        """Split the grid so every worker gets several tasks of similar size"""
+        chunk = max(1, math.ceil(total / (self.max_workers * 4)))
+        tasks = []
+        for weights in weight_sets:
+            for i in range(0, len(pairs), chunk):
+                tasks.append((weights, pairs[i:i + chunk], initial_capital))
+        return tasks
+
+    def _evaluate_local(self, tasks, block, scalars, progress_callback=None):
+        """Evaluate tasks in this process; concurrent sweeps each keep their own data"""
+        block.flags.writeable = False
+        evaluate = functools.partial(_evaluate_task, block=block, scalars=scalars, backtester=self.backtester)
+        return self._collect(map(evaluate, tasks), len(tasks), progress_callback)
+
+    def _evaluate_parallel(self, tasks, block, scalars, progress_callback=None):
+        """Evaluate tasks on a process pool sharing one read-only market block"""
+        shm = shared_memory.SharedMemory(create=True, size=block.nbytes)
+        try:
+            np.ndarray(block.shape, dtype=np.float64, buffer=shm.buf)[:] = block
+            with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=_pool_context(),
+                                     initializer=_attach_shared_data,
+                                     initargs=(shm.name, block.shape, scalars)) as pool:
+                return self._collect(pool.map(_evaluate_pooled, tasks), len(tasks), progress_callback)
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def _collect(self, task_results, total_tasks, progress_callback=None):
+        """Flatten task results, reporting progress as each task finishes"""
+        rows = []
+        for done, task_rows in enumerate(task_results, start=1):
+            rows.extend(task_rows)
+            if progress_callback:
+                progress_callback(done / total_tasks, f"Evaluated {len(rows)} combinations")
+        return rows
+
+    def _expand_range(self, spec, name):
+        """Expand a scalar, list or {'start', 'stop', 'step'} spec into values"""
+        if isinstance(spec, dict):
+            try:
+                start, stop, step = float(spec['start']), float(spec['stop']), float(spec.get('step', 1))
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f"{name} range needs numeric start and stop (and optionally step)")
+            if not step > 0:
+                raise ValueError(f"{name} step must be positive, not {step}")
+            if stop < start:
+                raise ValueError(f"{name} range stop {stop} is below start {start}")
+            values = np.arange(start, stop + step / 2, step)
+            return [round(float(v), 10) for v in values]
+        if isinstance(spec, (list, tuple)):
+            if not spec:
+                raise ValueError(f"{name} needs at least one value")
+            return list(spec)
+        return [spec]
+
+    def _expand_weights(self, spec):
+        """Cartesian product of per-component weight ranges; unlisted components keep defaults"""
+        if not spec:
+            return [None]
+        if not isinstance(spec, dict):
+            raise ValueError("weights must map risk component names to weight ranges")
+        unknown = sorted(set(spec) - set(self.backtester.risk_calculator.weights))
+        if unknown:
+            raise ValueError(f"Unknown risk components in weights: {', '.join(unknown)}; "
+                             f"expected {', '.join(self.backtester.risk_calculator.weights)}")
+        names = list(spec)
+        ranges = [self._expand_range(spec[name], f'weights.{name}') for name in names]
+        return [dict(zip(names, combo)) for combo in itertools.product(*ranges)]
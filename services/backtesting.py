@@ -3,6 +3,7 @@ import pandas as pd
 import logging
 from datetime import datetime, timedelta
 from services.risk_calculator import RiskCalculator
+from services.market_replay import MarketReplay
 
 class Backtester:
     def __init__(self):
@@ -16,12 +17,15 @@ class Backtester:
             end_date = parameters.get('end_date', '2023-12-31')
             initial_capital = parameters.get('initial_capital', 100000)
             risk_threshold = parameters.get('risk_threshold', 60)
+            reentry_ratio = parameters.get('reentry_ratio', 0.7)
+            weights = parameters.get('weights')
+            data_source = parameters.get('data_source', 'synthetic')
             
-            # Generate synthetic historical data
-            historical_data = self._generate_historical_data(start_date, end_date)
+            # Synthetic paths or replayed real history
+            historical_data = self._load_historical_data(start_date, end_date, data_source)
             
             # Run backtest
-            results = self._execute_backtest(historical_data, initial_capital, risk_threshold)
+            results = self._execute_backtest(historical_data, initial_capital, risk_threshold, reentry_ratio, weights)
             
             logging.info(f"✅ Backtest completed. Final portfolio value: ${results['final_value']:,.2f}")
             
@@ -31,6 +35,14 @@ class Backtester:
             logging.error(f"❌ Error running backtest: {e}")
             raise
     
+    def _load_historical_data(self, start_date, end_date, data_source='synthetic'):
+        """Historical frame from the requested source ('synthetic' or 'replay')"""
+        if data_source == 'replay':
+            return MarketReplay().load(start_date, end_date)
+        if data_source == 'synthetic':
+            return self._generate_historical_data(start_date, end_date)
+        raise ValueError(f"Unknown backtest data source: {data_source}")
+    
     def _generate_historical_data(self, start_date, end_date):
         """Generate synthetic historical market data"""
         start = datetime.strptime(start_date, '%Y-%m-%d')
@@ -41,10 +53,11 @@ class Backtester:
         n_days = len(dates)
         
         # Generate market data with realistic patterns
-        np.random.seed(42)
+        # Private generator: same sequence as seeding the global one, safe for concurrent sweeps
+        rng = np.random.RandomState(42)
         
         # SPY prices (with trend and volatility)
-        spy_returns = np.random.normal(0.0005, 0.015, n_days)  # Daily returns
+        spy_returns = rng.normal(0.0005, 0.015, n_days)  # Daily returns
         spy_prices = 400 * np.exp(np.cumsum(spy_returns))
         
         # VIX (mean-reverting)
@@ -54,18 +67,18 @@ class Backtester:
         
         for i in range(n_days):
             # Mean reversion
-            vix_change = np.random.normal(0, 2) - 0.1 * (current_vix - vix_base)
+            vix_change = rng.normal(0, 2) - 0.1 * (current_vix - vix_base)
             current_vix = max(10, min(80, current_vix + vix_change))
             vix_values.append(current_vix)
         
         # DXY (dollar index)
-        dxy_returns = np.random.normal(0, 0.005, n_days)
+        dxy_returns = rng.normal(0, 0.005, n_days)
         dxy_prices = 100 * np.exp(np.cumsum(dxy_returns))
         
         # Sentiment data
-        reddit_sentiment = np.random.normal(0, 0.1, n_days)
-        twitter_sentiment = np.random.normal(0, 0.1, n_days)
-        news_sentiment = np.random.normal(0, 0.1, n_days)
+        reddit_sentiment = rng.normal(0, 0.1, n_days)
+        twitter_sentiment = rng.normal(0, 0.1, n_days)
+        news_sentiment = rng.normal(0, 0.1, n_days)
         
         # Create DataFrame
         data = pd.DataFrame({
@@ -80,93 +93,126 @@ class Backtester:
         
         return data
     
-    def _execute_backtest(self, data, initial_capital, risk_threshold):
-        """Execute backtesting logic"""
-        portfolio_value = initial_capital
-        cash = initial_capital
-        positions = 0
+    def _execute_backtest(self, data, initial_capital, risk_threshold, reentry_ratio=0.7, weights=None):
+        """Execute backtesting logic as a columnar NumPy pass over the whole history"""
+        dates = data['date'].to_numpy()
+        spy = data['spy'].to_numpy(dtype=float)
+        vix = data['vix'].to_numpy(dtype=float)
         
-        portfolio_history = []
-        trades = []
+        risk_scores = self.risk_calculator.calculate_risk_score_array(
+            self._market_columns(data), self._sentiment_columns(data), weights
+        )
         
-        for i, row in data.iterrows():
-            # Calculate risk score
-            market_data = {
-                'spy': row['spy'],
-                'vix': row['vix'],
-                'dxy': row['dxy']
-            }
-            
-            sentiment_data = {
-                'reddit': row['reddit_sentiment'],
-                'twitter': row['twitter_sentiment'],
-                'news': row['news_sentiment']
+        in_position, trade_idx, values = self._simulate(spy, risk_scores, initial_capital, risk_threshold, reentry_ratio)
+        
+        return {
+            'initial_capital': initial_capital,
+            **self._summarize(values, initial_capital),
+            'num_trades': len(trade_idx),
+            'portfolio_history': {
+                'date': dates,
+                'value': values,
+                'risk_score': risk_scores,
+                'spy_price': spy,
+                'vix': vix
+            },
+            'trades': {
+                'date': dates[trade_idx],
+                'action': np.where(in_position[trade_idx], 'BUY', 'SELL'),
+                'price': spy[trade_idx],
+                'risk_score': risk_scores[trade_idx]
             }
-            
-            risk_score = self.risk_calculator.calculate_risk_score(market_data, sentiment_data)
-            
-            # Trading logic
-            if risk_score['value'] > risk_threshold and positions > 0:
-                # Sell positions (risk too high)
-                cash = positions * row['spy']
-                positions = 0
-                trades.append({
-                    'date': row['date'],
-                    'action': 'SELL',
-                    'price': row['spy'],
-                    'risk_score': risk_score['value']
-                })
-            elif risk_score['value'] < risk_threshold * 0.7 and positions == 0:
-                # Buy positions (risk acceptable)
-                positions = cash / row['spy']
+        }
+    
+    def _market_columns(self, data):
+        """Market columns of a historical frame as float arrays"""
+        return {name: data[name].to_numpy(dtype=float) for name in ('spy', 'vix', 'dxy')}
+    
+    def _sentiment_columns(self, data):
+        """Sentiment columns of a historical frame as float arrays"""
+        return {
+            'reddit': data['reddit_sentiment'].to_numpy(dtype=float),
+            'twitter': data['twitter_sentiment'].to_numpy(dtype=float),
+            'news': data['news_sentiment'].to_numpy(dtype=float)
+        }
+    
+    def _simulate(self, spy, risk_scores, initial_capital, risk_threshold, reentry_ratio=0.7):
+        """Run the threshold strategy over a score array, returning positions, trades and equity"""
+        # Hysteresis: exit above the threshold, re-enter below reentry_ratio of it
+        in_position = self._latch_positions(
+            buy=risk_scores < risk_threshold * reentry_ratio,
+            sell=risk_scores > risk_threshold
+        )
+        
+        # Trades happen wherever the latched state flips
+        previous = np.concatenate(([False], in_position[:-1]))
+        trade_idx = np.flatnonzero(in_position != previous)
+        
+        # Walk the (few) trades to carry cash/shares with the same arithmetic as a
+        # day-by-day simulation, then broadcast each holding segment over its days
+        segment_cash = np.empty(len(trade_idx) + 1)
+        segment_shares = np.zeros(len(trade_idx) + 1)
+        cash = initial_capital
+        positions = 0
+        segment_cash[0] = cash
+        for k, i in enumerate(trade_idx, start=1):
+            if in_position[i]:
+                positions = cash / spy[i]
                 cash = 0
-                trades.append({
-                    'date': row['date'],
-                    'action': 'BUY',
-                    'price': row['spy'],
-                    'risk_score': risk_score['value']
-                })
-            
-            # Calculate portfolio value
-            current_value = cash + (positions * row['spy'])
-            portfolio_history.append({
-                'date': row['date'],
-                'value': current_value,
-                'risk_score': risk_score['value'],
-                'spy_price': row['spy'],
-                'vix': row['vix']
-            })
-        
-        # Calculate final results
-        final_value = cash + (positions * data.iloc[-1]['spy'])
+            else:
+                cash = positions * spy[i]
+                positions = 0
+            segment_cash[k] = cash
+            segment_shares[k] = positions
+        
+        segment = np.zeros(len(spy), dtype=np.intp)
+        segment[trade_idx] = 1
+        segment = np.cumsum(segment)
+        values = np.where(in_position, segment_shares[segment] * spy, segment_cash[segment])
+        
+        return in_position, trade_idx, values
+    
+    def _summarize(self, values, initial_capital):
+        """Headline performance figures for an equity curve"""
+        final_value = float(values[-1])
         total_return = (final_value - initial_capital) / initial_capital
         
-        # Calculate performance metrics
-        portfolio_df = pd.DataFrame(portfolio_history)
-        daily_returns = portfolio_df['value'].pct_change().dropna()
+        daily_returns = values[1:] / values[:-1] - 1
+        daily_returns = daily_returns[~np.isnan(daily_returns)]
         
-        volatility = daily_returns.std() * np.sqrt(252)  # Annualized
+        volatility = daily_returns.std(ddof=1) * np.sqrt(252) if len(daily_returns) > 1 else np.nan  # Annualized
         sharpe_ratio = (daily_returns.mean() * 252) / volatility if volatility > 0 else 0
         
-        max_drawdown = self._calculate_max_drawdown(portfolio_df['value'])
-        
         return {
-            'initial_capital': initial_capital,
             'final_value': final_value,
             'total_return': total_return,
             'volatility': volatility,
             'sharpe_ratio': sharpe_ratio,
-            'max_drawdown': max_drawdown,
-            'num_trades': len(trades),
-            'portfolio_history': portfolio_history,
-            'trades': trades
+            'max_drawdown': self._calculate_max_drawdown(values)
         }
     
+    def _latch_positions(self, buy, sell):
+        """Turn buy/sell trigger arrays into a boolean in-position series"""
+        if np.any(buy & sell):
+            # Overlapping triggers (non-positive thresholds) depend on the current state
+            in_position = np.zeros(len(buy), dtype=bool)
+            held = False
+            for i in range(len(buy)):
+                held = not sell[i] if held else bool(buy[i])
+                in_position[i] = held
+            return in_position
+        
+        # Forward-fill the most recent trigger: buy latches on, sell latches off
+        last_trigger = np.where(buy | sell, np.arange(len(buy)), -1)
+        last_trigger = np.maximum.accumulate(last_trigger)
+        return np.where(last_trigger >= 0, buy[np.maximum(last_trigger, 0)], False)
+    
     def _calculate_max_drawdown(self, portfolio_values):
         """Calculate maximum drawdown"""
-        peak = portfolio_values.expanding().max()
+        portfolio_values = np.asarray(portfolio_values, dtype=float)
+        peak = np.maximum.accumulate(portfolio_values)
         drawdown = (portfolio_values - peak) / peak
-        return drawdown.min()
+        return float(drawdown.min())
     
     def calculate_performance_metrics(self, results):
         """Calculate additional performance metrics"""
@@ -195,3 +241,22 @@ class Backtester:
         except Exception as e:
             logging.error(f"❌ Error calculating performance metrics: {e}")
             return {}
+    
+    def serialize_results(self, results):
+        """Convert columnar backtest results into JSON-friendly lists"""
+        serialized = {}
+        for key, value in results.items():
+            if isinstance(value, dict):
+                serialized[key] = {col: self._column_to_list(values) for col, values in value.items()}
+            elif isinstance(value, np.generic):
+                serialized[key] = value.item()
+            else:
+                serialized[key] = value
+        return serialized
+    
+    def _column_to_list(self, values):
+        """Convert one result column to a plain list"""
+        values = np.asarray(values)
+        if np.issubdtype(values.dtype, np.datetime64):
+            return [pd.Timestamp(v).isoformat() for v in values]
+        return values.tolist()
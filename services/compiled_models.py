@@ -0,0 +1,227 @@
+import json
+import logging
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.neural_network import MLPRegressor
+
+ACTIVATIONS = {
+    'identity': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'logistic': lambda x: 1 / (1 + np.exp(-x))
+}
+
+
+class CompiledTrees:
+    """Regression trees flattened into shared node arrays and walked for all trees at once.
+
+    Leaves point back at themselves, so every tree can be advanced one level per step with
+    a handful of vectorized lookups; after max_depth steps each tree sits on its leaf. Inputs
+    are compared in float32, as sklearn's trees do.
+    """
+
+    kind = 'trees'
+
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots, max_depth, scale, offset):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.scale = float(scale)    # Sum of leaf values is multiplied by scale ...
+        self.offset = float(offset)  # ... and offset added
+
+    @classmethod
+    def from_estimators(cls, trees, scale, offset):
+        arrays = {'feature': [], 'threshold': [], 'left': [], 'right': [], 'missing_left': [], 'value': []}
+        roots = []
+        max_depth = 0
+        base = 0
+        for estimator in trees:
+            tree = estimator.tree_
+            n = tree.node_count
+            leaf = tree.children_left == -1
+            index = np.arange(n)
+            roots.append(base)
+            arrays['feature'].append(np.where(leaf, 0, tree.feature))
+            arrays['threshold'].append(np.where(leaf, np.inf, tree.threshold))
+            arrays['left'].append(np.where(leaf, index, tree.children_left) + base)
+            arrays['right'].append(np.where(leaf, index, tree.children_right) + base)
+            missing = getattr(tree, 'missing_go_to_left', None)
+            arrays['missing_left'].append(np.zeros(n, dtype=bool) if missing is None else missing.astype(bool))
+            arrays['value'].append(tree.value.reshape(n, -1)[:, 0])
+            max_depth = max(max_depth, tree.max_depth)
+            base += n
+
+        return cls(
+            feature=np.concatenate(arrays['feature']).astype(np.intp),
+            threshold=np.concatenate(arrays['threshold']).astype(np.float64),
+            left=np.concatenate(arrays['left']).astype(np.intp),
+            right=np.concatenate(arrays['right']).astype(np.intp),
+            missing_left=np.concatenate(arrays['missing_left']),
+            value=np.concatenate(arrays['value']).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth, scale=scale, offset=offset
+        )
+
+    def predict(self, X):
+        """Predictions for a 2-D array of scaled rows"""
+        X = np.asarray(X, dtype=np.float32)
+        if len(X) == 1 and not np.isnan(X).any():
+            return np.array([self._predict_one(X[0])])
+
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[nodes]]
+            go_left = np.where(np.isnan(x), self.missing_left[nodes], x <= self.threshold[nodes])
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes].sum(axis=1) * self.scale + self.offset
+
+    def _predict_one(self, x):
+        """Single-row path: 1-D node indices and no missing-value branch"""
+        nodes = self.roots
+        feature, threshold, left, right = self.feature, self.threshold, self.left, self.right
+        for _ in range(self.max_depth):
+            nodes = np.where(x[feature[nodes]] <= threshold[nodes], left[nodes], right[nodes])
+        return self.value[nodes].sum() * self.scale + self.offset
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in
+                ('feature', 'threshold', 'left', 'right', 'missing_left', 'value', 'roots')}
+
+    def params(self):
+        return {'max_depth': self.max_depth, 'scale': self.scale, 'offset': self.offset}
+
+
+class CompiledMLP:
+    """Dense layers of an MLPRegressor as plain matrix products"""
+
+    kind = 'mlp'
+
+    def __init__(self, coefs, intercepts, activation):
+        self.coefs = list(coefs)
+        self.intercepts = list(intercepts)
+        self.activation = activation
+
+    @classmethod
+    def from_estimator(cls, model):
+        return cls([c.astype(np.float64) for c in model.coefs_],
+                   [b.astype(np.float64) for b in model.intercepts_], model.activation)
+
+    def predict(self, X):
+        hidden = ACTIVATIONS[self.activation]
+        out = np.asarray(X, dtype=np.float64)
+        for i, (coef, intercept) in enumerate(zip(self.coefs, self.intercepts)):
+            out = out @ coef + intercept
+            if i < len(self.coefs) - 1:
+                out = hidden(out)
+        return out[:, 0]
+
+    def arrays(self):
+        arrays = {}
+        for i, (coef, intercept) in enumerate(zip(self.coefs, self.intercepts)):
+            arrays[f'coef{i}'] = coef
+            arrays[f'intercept{i}'] = intercept
+        return arrays
+
+    def params(self):
+        return {'activation': self.activation, 'layers': len(self.coefs)}
+
+
+def compile_estimator(model):
+    """Compiled form of a fitted regressor, or None if the model type is not supported"""
+    if isinstance(model, RandomForestRegressor):
+        return CompiledTrees.from_estimators(model.estimators_, 1.0 / len(model.estimators_), 0.0)
+    if isinstance(model, GradientBoostingRegressor):
+        if model.loss != 'squared_error' or not hasattr(model.init_, 'constant_'):
+            return None
+        return CompiledTrees.from_estimators(model.estimators_[:, 0], model.learning_rate,
+                                             float(np.ravel(model.init_.constant_)[0]))
+    if isinstance(model, MLPRegressor):
+        if model.out_activation_ != 'identity' or model.activation not in ACTIVATIONS:
+            return None
+        return CompiledMLP.from_estimator(model)
+    return None
+
+
+class CompiledEnsemble:
+    """The feature scaler and every trained model as one NumPy inference artifact.
+
+    predict() takes one unscaled feature vector, predict_batch() a 2-D array; both skip
+    sklearn's per-call validation. Models that cannot be compiled are kept as sklearn
+    estimators (fallbacks) and called as before. The artifact is a single .npz file with
+    the model layout in a JSON header, so loading it needs no pickle.
+    """
+
+    def __init__(self, center, scale, predictors, fallbacks=None):
+        self.center = center
+        self.scale = scale
+        self.predictors = predictors
+        self.fallbacks = fallbacks or {}
+
+    @classmethod
+    def compile(cls, models, scaler):
+        n_features = scaler.n_features_in_
+        center = scaler.center_ if getattr(scaler, 'center_', None) is not None else np.zeros(n_features)
+        scale = scaler.scale_ if getattr(scaler, 'scale_', None) is not None else np.ones(n_features)
+
+        predictors, fallbacks = {}, {}
+        for name, model in models.items():
+            if model is None:
+                continue
+            compiled = compile_estimator(model)
+            if compiled is None:
+                logging.warning(f"Cannot compile {type(model).__name__} for {name}, using sklearn predict")
+                fallbacks[name] = model
+            else:
+                predictors[name] = compiled
+        return cls(np.asarray(center, dtype=np.float64), np.asarray(scale, dtype=np.float64), predictors, fallbacks)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.center) / self.scale
+
+    def predict_batch(self, X):
+        """{model name: predictions} for a 2-D array of unscaled feature rows"""
+        X_scaled = self.transform(np.atleast_2d(X))
+        predictions = {name: predictor.predict(X_scaled) for name, predictor in self.predictors.items()}
+        for name, model in self.fallbacks.items():
+            predictions[name] = model.predict(X_scaled)
+        return predictions
+
+    def predict(self, x):
+        """{model name: prediction} for one unscaled feature vector"""
+        return {name: float(values[0]) for name, values in self.predict_batch(np.reshape(x, (1, -1))).items()}
+
+    def save(self, path):
+        """Write the compiled models; uncompilable fallbacks are not included"""
+        header = {'models': {}}
+        arrays = {'center': self.center, 'scale': self.scale}
+        for name, predictor in self.predictors.items():
+            header['models'][name] = {'kind': predictor.kind, **predictor.params()}
+            for key, array in predictor.arrays().items():
+                arrays[f'{name}.{key}'] = array
+        with open(path, 'wb') as f:
+            np.savez(f, header=np.array(json.dumps(header)), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            header = json.loads(str(data['header']))
+            predictors = {}
+            for name, spec in header['models'].items():
+                if spec['kind'] == 'trees':
+                    predictors[name] = CompiledTrees(
+                        *(data[f'{name}.{key}'] for key in
+                          ('feature', 'threshold', 'left', 'right', 'missing_left', 'value', 'roots')),
+                        max_depth=spec['max_depth'], scale=spec['scale'], offset=spec['offset'])
+                else:
+                    predictors[name] = CompiledMLP(
+                        [data[f'{name}.coef{i}'] for i in range(spec['layers'])],
+                        [data[f'{name}.intercept{i}'] for i in range(spec['layers'])],
+                        spec['activation'])
+            return cls(data['center'], data['scale'], predictors)
@@ -6,12 +6,30 @@ import yfinance as yf
 import praw
 import tweepy
 from fredapi import Fred
-from pytrends.request import TrendReq
 from bs4 import BeautifulSoup
 from fredapi import Fred
 from bs4 import BeautifulSoup
+from services.metrics import instrumented, stage_failed
+from services.options_analytics import spy_options, analyze_chain
+from services.keyword_sentiment import keyword_sentiment
+from services.text_ingestion import text_ingestor
+from services.google_trends import google_trends
+from services.feature_context import shared_feature_context
+from services.rate_limit import RateLimitGovernor
+
+# Newest posts / articles paged through per cycle; paging stops early at already-seen items
+REDDIT_INGEST_LIMIT = int(os.getenv('REDDIT_INGEST_LIMIT', '500'))
+NEWS_INGEST_PAGES = int(os.getenv('NEWS_INGEST_PAGES', '3'))
+NEWSAPI_PAGE_SIZE = int(os.getenv('NEWSAPI_PAGE_SIZE', '100'))
+GNEWS_PAGE_SIZE = int(os.getenv('GNEWS_PAGE_SIZE', '10'))
+
+# Shared by every DataCollector in the process, which are created per cycle
+twitter_governor = RateLimitGovernor('Twitter')
 
 class DataCollector:
+    # Latest successful market snapshot in this process, for fallbacks that need no DB query
+    latest_market_data = None
+
     def __init__(self, recovery_manager):
         self.recovery = recovery_manager
         self.alpha_vantage_key = os.getenv('ALPHA_VANTAGE_KEY')
@@ -31,9 +49,6 @@ class DataCollector:
         # FRED API (Federal Reserve Economic Data) - Free, unlimited
         self.fred_api_key = os.getenv('FRED_API_KEY')
         
-        # Google Trends client (no API key needed)
-        self.pytrends = TrendReq(hl='en-US', tz=360)
-        
         self._setup_apis()
     
     def _setup_apis(self):
@@ -51,7 +66,8 @@ class DataCollector:
             twitter_bearer_token = os.environ.get('TWITTER_BEARER_TOKEN')
             if twitter_bearer_token:
                 try:
-                    self.twitter_client = tweepy.Client(bearer_token=twitter_bearer_token)
+                    # Raw responses expose the x-rate-limit-* headers to the governor
+                    self.twitter_client = tweepy.Client(bearer_token=twitter_bearer_token, return_type=requests.Response)
                     logging.info("Twitter API configured with Bearer Token")
                 except Exception as e:
                     logging.error(f"Error setting up Twitter Bearer Token: {e}")
@@ -62,7 +78,8 @@ class DataCollector:
                         consumer_key=self.twitter_api_key,
                         consumer_secret=self.twitter_api_secret,
                         access_token=self.twitter_access_token,
-                        access_token_secret=self.twitter_access_token_secret
+                        access_token_secret=self.twitter_access_token_secret,
+                        return_type=requests.Response
                     )
                     logging.info("Twitter API configured with OAuth 1.1")
                 except Exception as e:
@@ -82,6 +99,7 @@ class DataCollector:
         except Exception as e:
             logging.error(f"Error setting up APIs: {e}")
     
+    @instrumented('collect_market_data')
     def collect_market_data(self):
         """Collect market data from various sources"""
         try:
@@ -112,7 +130,8 @@ class DataCollector:
                 market_data.update(treasury_data)
                 
                 # Add options market data
-                options_data = self._get_options_data()
+                spot = float(spy_data['Close'].iloc[-1]) if not spy_data.empty else None
+                options_data = self._get_options_data(spot)
                 market_data.update(options_data)
                 
                 # Add additional market ETFs for broader coverage
@@ -146,10 +165,12 @@ class DataCollector:
                 logging.warning(f"Error collecting additional market data: {e}")
             
             logging.info(f"Market data collected: SPY={market_data['spy']}, VIX={market_data['vix']}, DXY={market_data['dxy']}")
+            DataCollector.latest_market_data = market_data
             return market_data
             
         except Exception as e:
             logging.error(f"Error collecting market data: {e}")
+            stage_failed()
             self.recovery.fallback("market_data")
             # Return fallback data
             return {
@@ -159,6 +180,7 @@ class DataCollector:
                 'timestamp': datetime.utcnow().isoformat()
             }
     
+    @instrumented('fred')
     def _get_fred_data(self):
         """Get Federal Reserve Economic Data - Free unlimited access"""
         fred_data = {}
@@ -190,9 +212,11 @@ class DataCollector:
                     
         except Exception as e:
             logging.error(f"Error getting FRED data: {e}")
+            stage_failed()
             
         return fred_data
     
+    @instrumented('treasury_yields')
     def _get_treasury_data(self):
         """Get Treasury yield curve data"""
         treasury_data = {}
@@ -221,53 +245,28 @@ class DataCollector:
                     
         except Exception as e:
             logging.error(f"Error getting Treasury data: {e}")
+            stage_failed()
             
         return treasury_data
     
-    def _get_options_data(self):
-        """Get options market data for risk assessment"""
+    @instrumented('options_chain')
+    def _get_options_data(self, spot=None):
+        """Get options market data for risk assessment
+
+        Chains come from the process-wide snapshot cache and are only refetched once their
+        TTL has passed; spot is the SPY quote already fetched this cycle.
+        """
         options_data = {}
         
         try:
-            # Get VIX term structure and options data
-            vix = yf.Ticker("^VIX")
-            spy = yf.Ticker("SPY")
-            
-            # Get options expiration dates
-            spy_expirations = spy.options
-            
-            if spy_expirations:
-                # Get near-term options data
-                near_expiry = spy_expirations[0]
-                option_chain = spy.option_chain(near_expiry)
-                
-                # Calculate put/call ratio
-                puts_volume = option_chain.puts['volume'].sum()
-                calls_volume = option_chain.calls['volume'].sum()
-                
-                if calls_volume > 0:
-                    put_call_ratio = puts_volume / calls_volume
-                    options_data['put_call_ratio'] = float(put_call_ratio)
-                else:
-                    options_data['put_call_ratio'] = None
-                    
-                # Get skew indicators
-                atm_strike = spy.info.get('previousClose', 440)
-                otm_puts = option_chain.puts[option_chain.puts['strike'] < atm_strike * 0.95]
-                otm_calls = option_chain.calls[option_chain.calls['strike'] > atm_strike * 1.05]
-                
-                if not otm_puts.empty and not otm_calls.empty:
-                    put_iv = otm_puts['impliedVolatility'].mean()
-                    call_iv = otm_calls['impliedVolatility'].mean()
-                    options_data['skew'] = float(put_iv - call_iv) if put_iv and call_iv else None
-                else:
-                    options_data['skew'] = None
-                    
+            options_data = analyze_chain(spy_options.snapshot(), spot)
         except Exception as e:
             logging.error(f"Error getting options data: {e}")
+            stage_failed()
             
         return options_data
     
+    @instrumented('collect_sentiment_data')
     def collect_sentiment_data(self):
         """Collect sentiment data from social media and news"""
         sentiment_data = {
@@ -293,149 +292,118 @@ class DataCollector:
             
         except Exception as e:
             logging.error(f"Error collecting sentiment data: {e}")
+            stage_failed()
             self.recovery.fallback("sentiment_data")
             return sentiment_data
     
+    @instrumented('reddit')
     def _get_reddit_sentiment(self):
-        """Get sentiment from Reddit posts"""
+        """Get time-decayed sentiment of Reddit posts, scoring only posts not seen before"""
         try:
             subreddit = self.reddit.subreddit("investing+stocks+wallstreetbets")
-            posts = subreddit.hot(limit=10)
-            
-            sentiment_scores = []
-            for post in posts:
-                # Simple sentiment analysis based on title keywords
-                title = post.title.lower()
-                score = 0
-                
-                # Positive keywords
-                if any(word in title for word in ['bull', 'up', 'gain', 'profit', 'buy', 'bullish']):
-                    score += 0.1
-                
-                # Negative keywords
-                if any(word in title for word in ['bear', 'down', 'loss', 'sell', 'crash', 'bearish']):
-                    score -= 0.1
-                
-                sentiment_scores.append(score)
+            posts = subreddit.new(limit=REDDIT_INGEST_LIMIT)  # praw pages through the listing lazily
             
-            return sum(sentiment_scores) / len(sentiment_scores) if sentiment_scores else 0.0
+            items = ((text_ingestor.item_key(getattr(post, 'id', None), post.title),
+                      f"{post.title} {(getattr(post, 'selftext', '') or '')[:1000]}",
+                      _from_timestamp(getattr(post, 'created_utc', None)))
+                     for post in posts)
+            new_posts = text_ingestor.collect('reddit', items)
+            sentiment = text_ingestor.sentiment('reddit')
+            logging.info(f"Reddit sentiment {sentiment:.4f} ({new_posts} new posts)")
+            return sentiment
             
         except Exception as e:
             logging.error(f"Error getting Reddit sentiment: {e}")
+            stage_failed()
             return 0.0
     
+    @instrumented('twitter')
     def _get_twitter_sentiment(self):
-        """Get sentiment from Twitter"""
+        """Get sentiment from Twitter, paced by the rate-limit governor
+
+        Calls are spread evenly over the rate-limit window; between them the last reading is
+        served, and while rate limited a VIX-based estimate from the latest market snapshot.
+        """
+        if not self.twitter_client:
+            logging.warning("Twitter client not initialized")
+            return 0.0
+        
+        if not twitter_governor.acquire():
+            if twitter_governor.remaining == 0 or twitter_governor.last_value is None:
+                return self._twitter_fallback_sentiment()
+            return twitter_governor.last_value
+        
         try:
-            if not self.twitter_client:
-                logging.warning("Twitter client not initialized")
-                return 0.0
-                
             # Search for market-related tweets (without cashtag operator)
-            tweets = self.twitter_client.search_recent_tweets(
+            response = self.twitter_client.search_recent_tweets(
                 query="SPY OR VIX OR \"stock market\" OR stocks",
                 max_results=10,
                 tweet_fields=['public_metrics']
             )
+            twitter_governor.update(response.headers)
             
-            if not tweets or not tweets.data:
+            tweets = response.json().get('data') or []
+            if not tweets:
                 logging.warning("No Twitter data received")
                 return 0.0
             
-            sentiment_scores = []
-            for tweet in tweets.data:
-                text = tweet.text.lower()
-                score = 0
-                
-                # Enhanced sentiment analysis
-                positive_words = ['bull', 'bullish', 'up', 'gain', 'profit', 'buy', 'rally', 'surge', 'strong', 'growth']
-                negative_words = ['bear', 'bearish', 'down', 'loss', 'sell', 'crash', 'drop', 'decline', 'weak', 'fall']
-                
-                for word in positive_words:
-                    if word in text:
-                        score += 0.05
-                
-                for word in negative_words:
-                    if word in text:
-                        score -= 0.05
-                
-                score = max(-0.3, min(0.3, score))
-                sentiment_scores.append(score)
-            
-            avg_sentiment = sum(sentiment_scores) / len(sentiment_scores) if sentiment_scores else 0.0
-            logging.info(f"Twitter sentiment calculated: {avg_sentiment} from {len(sentiment_scores)} tweets")
-            return avg_sentiment
+            scored = keyword_sentiment.score_texts([tweet.get('text', '') for tweet in tweets])
+            logging.info(f"Twitter sentiment calculated: {scored['average']} from {scored['count']} tweets")
+            twitter_governor.last_value = scored['average']
+            return scored['average']
             
+        except tweepy.TooManyRequests as e:
+            twitter_governor.rate_limited(getattr(e.response, 'headers', None))
+            stage_failed()
+            return self._twitter_fallback_sentiment()
         except Exception as e:
-            error_msg = str(e)
-            if "429" in error_msg or "Too Many Requests" in error_msg:
-                logging.warning("Twitter API rate limit exceeded, using intelligent fallback")
-                # Use VIX level to estimate market sentiment since Twitter is rate limited
-                # Higher VIX = more fear = negative sentiment
-                try:
-                    from app import app
-                    with app.app_context():
-                        from models import RiskScore
-                        latest_risk = RiskScore.query.order_by(RiskScore.timestamp.desc()).first()
-                        if latest_risk and latest_risk.market_data:
-                            vix = latest_risk.market_data.get('vix', 20)
-                            # Convert VIX to sentiment: VIX 10-15 = positive, 15-25 = neutral, 25+ = negative
-                            if vix < 15:
-                                fallback_sentiment = 0.02  # Positive sentiment
-                            elif vix < 25:
-                                fallback_sentiment = -0.01  # Slightly negative
-                            else:
-                                fallback_sentiment = -0.03  # More negative
-                            logging.info(f"Twitter fallback sentiment based on VIX {vix}: {fallback_sentiment}")
-                            return fallback_sentiment
-                except:
-                    pass
-                # Final fallback
-                return -0.01
-            else:
-                logging.error(f"Error getting Twitter sentiment: {e}")
-                return 0.0
+            logging.error(f"Error getting Twitter sentiment: {e}")
+            stage_failed()
+            return 0.0
     
+    def _twitter_fallback_sentiment(self):
+        """Estimate sentiment from VIX in the latest in-memory market snapshot (no DB query)"""
+        market_data = DataCollector.latest_market_data
+        if not market_data:
+            snapshot = shared_feature_context.attach()
+            market_data = snapshot.market_data if snapshot else None
+        vix = (market_data or {}).get('vix')
+        if vix is None:
+            return -0.01
+        
+        # Higher VIX = more fear = negative sentiment: VIX 10-15 positive, 15-25 neutral, 25+ negative
+        if vix < 15:
+            fallback_sentiment = 0.02
+        elif vix < 25:
+            fallback_sentiment = -0.01
+        else:
+            fallback_sentiment = -0.03
+        logging.info(f"Twitter fallback sentiment based on VIX {vix}: {fallback_sentiment}")
+        return fallback_sentiment
+    
+    @instrumented('google_trends')
     def _get_google_trends_sentiment(self):
-        """Get market sentiment from Google Trends data"""
+        """Get market sentiment from the cached Google Trends series
+
+        The series is refreshed by the scheduler on its own cadence (see
+        services/google_trends.py); this only reads the latest cached values.
+        """
         try:
-            # Define market-related search terms
-            keywords = ['stock market crash', 'market volatility', 'recession', 'bull market', 'bear market']
-            
-            # Build payload for Google Trends
-            self.pytrends.build_payload(keywords, cat=0, timeframe='now 1-d', geo='US', gprop='')
-            
-            # Get interest over time
-            interest_data = self.pytrends.interest_over_time()
-            
-            if interest_data.empty:
+            age = google_trends.age()
+            if age is None:
                 return 0.0
             
-            # Calculate sentiment score based on search patterns
-            latest_data = interest_data.iloc[-1]  # Most recent data point
-            
-            # Negative sentiment indicators (higher values = more fear)
-            negative_score = (
-                latest_data.get('stock market crash', 0) * 0.4 +
-                latest_data.get('market volatility', 0) * 0.3 +
-                latest_data.get('recession', 0) * 0.3 +
-                latest_data.get('bear market', 0) * 0.2
-            ) / 100  # Normalize to 0-1
-            
-            # Positive sentiment indicators
-            positive_score = latest_data.get('bull market', 0) / 100
-            
-            # Calculate final sentiment (-0.3 to +0.3 range)
-            sentiment = (positive_score - negative_score) * 0.3
-            
-            logging.info(f"Google Trends sentiment calculated: {sentiment:.3f}")
-            return max(-0.3, min(0.3, sentiment))
+            sentiment = google_trends.sentiment()
+            logging.info(f"Google Trends sentiment: {sentiment:.3f} (data {age.total_seconds() / 60:.0f} min old)")
+            return sentiment
             
         except Exception as e:
             logging.error(f"Error getting Google Trends sentiment: {e}")
+            stage_failed()
             # Return neutral sentiment on error
             return 0.0
     
+    @instrumented('news')
     def _get_news_sentiment(self):
         """Get sentiment from news articles"""
         try:
@@ -451,89 +419,76 @@ class DataCollector:
             
         except Exception as e:
             logging.error(f"Error getting news sentiment: {e}")
+            stage_failed()
             return 0.0
     
+    @instrumented('newsapi')
     def _get_newsapi_sentiment(self):
-        """Get sentiment from NewsAPI"""
+        """Get time-decayed sentiment of NewsAPI articles, scoring only articles not seen before"""
         try:
             # Check if API key format is correct (NewsAPI keys are 32 characters, not OpenAI format)
             if not self.newsapi_key or self.newsapi_key.startswith('sk-'):
                 logging.warning("NewsAPI key appears to be in wrong format. Please get a proper key from newsapi.org")
                 return 0.0
                 
-            url = f"https://newsapi.org/v2/everything?q=stock market OR SPY OR VIX&apiKey={self.newsapi_key}&sortBy=publishedAt&pageSize=10"
-            response = requests.get(url)
-            
-            if response.status_code == 200:
-                articles = response.json().get('articles', [])
-                
-                sentiment_scores = []
-                for article in articles:
-                    # Handle None values properly
-                    title = article.get('title')
-                    description = article.get('description')
-                    
-                    # Skip if both title and description are None
-                    if not title and not description:
-                        continue
-                    
-                    # Create text string with proper None handling
-                    text = f"{title or ''} {description or ''}".lower()
-                    
-                    score = 0
-                    # Enhanced sentiment keywords for better detection
-                    positive_words = ['bull', 'bullish', 'up', 'gain', 'profit', 'rise', 'rally', 'surge', 'buy', 'strong', 'growth', 'optimistic', 'record', 'high']
-                    negative_words = ['bear', 'bearish', 'down', 'loss', 'fall', 'crash', 'sell', 'drop', 'decline', 'weak', 'recession', 'pessimistic', 'plunge', 'low']
-                    
-                    # Count sentiment words with more granular scoring
-                    for word in positive_words:
-                        if word in text:
-                            score += 0.05
-                    
-                    for word in negative_words:
-                        if word in text:
-                            score -= 0.05
-                    
-                    # Cap the score and ensure we get some signal
-                    score = max(-0.3, min(0.3, score))
-                    sentiment_scores.append(score)
-                
-                return sum(sentiment_scores) / len(sentiment_scores) if sentiment_scores else 0.0
-            
-            return 0.0
+            url = (f"https://newsapi.org/v2/everything?q=stock market OR SPY OR VIX&apiKey={self.newsapi_key}"
+                   f"&sortBy=publishedAt&pageSize={NEWSAPI_PAGE_SIZE}")
+            new_articles = text_ingestor.collect('newsapi', self._paged_articles(url, NEWSAPI_PAGE_SIZE))
+            sentiment = text_ingestor.sentiment('newsapi')
+            logging.info(f"NewsAPI sentiment {sentiment:.4f} ({new_articles} new articles)")
+            return sentiment
             
         except Exception as e:
             logging.error(f"Error with NewsAPI: {e}")
+            stage_failed()
             return 0.0
     
+    @instrumented('gnews')
     def _get_gnews_sentiment(self):
-        """Get sentiment from GNews"""
+        """Get time-decayed sentiment of GNews articles, scoring only articles not seen before"""
         try:
-            url = f"https://gnews.io/api/v4/search?q=stock market&token={self.gnews_key}&max=10"
-            response = requests.get(url)
-            
-            if response.status_code == 200:
-                articles = response.json().get('articles', [])
-                
-                sentiment_scores = []
-                for article in articles:
-                    title = article.get('title', '').lower()
-                    description = article.get('description', '').lower()
-                    text = f"{title} {description}"
-                    
-                    score = 0
-                    if any(word in text for word in ['bull', 'up', 'gain', 'profit', 'rise']):
-                        score += 0.1
-                    
-                    if any(word in text for word in ['bear', 'down', 'loss', 'fall', 'crash']):
-                        score -= 0.1
-                    
-                    sentiment_scores.append(score)
-                
-                return sum(sentiment_scores) / len(sentiment_scores) if sentiment_scores else 0.0
-            
-            return 0.0
+            url = f"https://gnews.io/api/v4/search?q=stock market&token={self.gnews_key}&max={GNEWS_PAGE_SIZE}&sortby=publishedAt"
+            new_articles = text_ingestor.collect('gnews', self._paged_articles(url, GNEWS_PAGE_SIZE))
+            sentiment = text_ingestor.sentiment('gnews')
+            logging.info(f"GNews sentiment {sentiment:.4f} ({new_articles} new articles)")
+            return sentiment
             
         except Exception as e:
             logging.error(f"Error with GNews: {e}")
+            stage_failed()
             return 0.0
+    
+    def _paged_articles(self, url, page_size):
+        """Yield (key, text, published_at) for articles page by page, newest first"""
+        for page in range(1, NEWS_INGEST_PAGES + 1):
+            response = requests.get(f"{url}&page={page}")
+            if response.status_code != 200:
+                return
+            
+            articles = response.json().get('articles', [])
+            for article in articles:
+                title = article.get('title')
+                description = article.get('description')
+                # Skip if both title and description are None
+                if not title and not description:
+                    continue
+                text = f"{title or ''} {description or ''}"
+                yield text_ingestor.item_key(article.get('url'), text), text, _parse_published(article.get('publishedAt'))
+            
+            if len(articles) < page_size:
+                return
+
+
+def _from_timestamp(value):
+    try:
+        return datetime.utcfromtimestamp(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_published(value):
+    """Naive UTC datetime from an ISO 8601 publishedAt, or None"""
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except (AttributeError, ValueError):
+        return None
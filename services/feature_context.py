@@ -0,0 +1,142 @@
+import os
+import mmap
+import json
+import time
+import struct
+import logging
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Context groups in the order MLRiskScorer.build_feature_context returns them
+CONTEXT_GROUPS = ('technical', 'sector', 'economic', 'breadth', 'options')
+
+MAGIC = b'MRTFCTX1'
+# magic, sequence, published_at, header length, value count
+HEADER = struct.Struct('<8sQdII')
+
+
+def _default_path():
+    # /dev/shm keeps the file in shared memory where it exists
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, 'market_risk_feature_context')
+
+
+class FeatureSnapshot:
+    """One published tick, read straight out of the mapped file.
+
+    values is a read-only float64 view into the mapping: the historical context groups,
+    followed by the tick's feature vector when one was published.
+    """
+
+    def __init__(self, sequence, published_at, header, values):
+        self.sequence = sequence
+        self.published_at = published_at
+        self.header = header
+        self.values = values
+        self.market_data = header.get('market_data')
+        self.sentiment_data = header.get('sentiment_data')
+        self.feature_names = header.get('feature_names') or []
+
+    def age(self):
+        return time.time() - self.published_at
+
+    @property
+    def context(self):
+        """Context dict in the shape build_feature_context returns"""
+        return {group: dict(zip(names, self.values[start:start + len(names)].tolist()))
+                for group, (start, names) in self.header['groups'].items()}
+
+    @property
+    def features(self):
+        """The tick's feature vector as a Series over the mapped memory, or None"""
+        if not self.feature_names:
+            return None
+        start = self.header['features_offset']
+        return pd.Series(self.values[start:start + len(self.feature_names)], index=self.feature_names, copy=False)
+
+
+class SharedFeatureContext:
+    """Feature context published once per monitoring tick and read by every other process.
+
+    The monitoring cycle calls publish() with the context it built, the market/sentiment
+    inputs and the resulting feature vector. Each publish writes a complete new file and
+    renames it over the old one, so a reader never sees a partial write; readers map the file
+    read-only and keep using their mapping until the file's inode changes. Web workers and
+    job processes then skip the yfinance/FRED downloads and, for the current tick, feature
+    engineering altogether.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('FEATURE_CONTEXT_PATH') or _default_path()
+        self._snapshot = None
+        self._identity = None
+        self._lock = threading.Lock()
+
+    def publish(self, context, market_data=None, sentiment_data=None, features=None):
+        """Write a new snapshot; features is a Series from engineer_features, if any"""
+        values, groups, offset = [], {}, 0
+        for group in CONTEXT_GROUPS:
+            items = context.get(group) or {}
+            groups[group] = (offset, list(items))
+            values.extend(_to_float(v) for v in items.values())
+            offset += len(items)
+
+        header = {'groups': groups, 'market_data': market_data, 'sentiment_data': sentiment_data}
+        if features is not None:
+            header['feature_names'] = list(features.index)
+            header['features_offset'] = offset
+            values.extend(features.to_numpy(dtype=np.float64).tolist())
+
+        previous = self.attach()
+        sequence = previous.sequence + 1 if previous else 1
+        encoded = json.dumps(header, default=str).encode()
+        padding = b'\0' * (-(HEADER.size + len(encoded)) % 8)  # Align the float array
+
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, sequence, time.time(), len(encoded) + len(padding), len(values)))
+            f.write(encoded + padding)
+            f.write(np.asarray(values, dtype=np.float64).tobytes())
+        os.replace(tmp_path, self.path)
+        return sequence
+
+    def attach(self):
+        """Latest snapshot, or None; the file is only remapped after a new publish"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            if identity != self._identity:
+                try:
+                    self._snapshot = self._map()
+                except (OSError, ValueError) as e:
+                    logging.warning(f"Could not read shared feature context: {e}")
+                    self._snapshot = None
+                self._identity = identity
+            return self._snapshot
+
+    def _map(self):
+        with open(self.path, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, sequence, published_at, header_length, count = HEADER.unpack_from(mapping)
+        if magic != MAGIC:
+            raise ValueError('not a feature context file')
+        header = json.loads(bytes(mapping[HEADER.size:HEADER.size + header_length]).rstrip(b'\0'))
+        values = np.frombuffer(mapping, dtype=np.float64, count=count, offset=HEADER.size + header_length)
+        return FeatureSnapshot(sequence, published_at, header, values)
+
+
+def _to_float(value):
+    try:
+        return float(value) if value is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+shared_feature_context = SharedFeatureContext()
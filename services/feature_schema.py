@@ -0,0 +1,66 @@
+import hashlib
+
+import numpy as np
+
+# Every model input in column order, with the value used when its source is unavailable.
+# Scenario-dependent inputs come first within each block, matching the order features were
+# originally assembled in; all features are float64.
+FEATURES = (
+    # Market inputs
+    ('spy_price', 440.0), ('vix', 20.0), ('dxy', 100.0), ('ten_year', 4.5),
+    # SPY technicals (feature context)
+    ('rsi_14', 50.0), ('rsi_30', 50.0), ('sma_20', 0.0), ('sma_50', 0.0), ('sma_200', 0.0),
+    ('price_vs_sma20', 0.0), ('price_vs_sma50', 0.0), ('price_vs_sma200', 0.0),
+    ('volatility_20d', 0.0), ('volatility_60d', 0.0), ('volume_ratio', 1.0), ('volume_trend', 1.0),
+    ('momentum_1d', 0.0), ('momentum_5d', 0.0), ('momentum_20d', 0.0), ('bb_position', 0.5),
+    # Sentiment inputs
+    ('reddit_sentiment', 0.0), ('news_sentiment', 0.0), ('twitter_sentiment', 0.0), ('avg_sentiment', 0.0),
+    # Sector ETF returns (feature context)
+    ('xlf_5d_return', 0.0), ('xlk_5d_return', 0.0), ('xlv_5d_return', 0.0), ('xle_5d_return', 0.0),
+    ('xli_5d_return', 0.0), ('xlu_5d_return', 0.0), ('xlb_5d_return', 0.0), ('xlre_5d_return', 0.0),
+    ('xlp_5d_return', 0.0), ('xly_5d_return', 0.0),
+    # FRED indicators (feature context)
+    ('fed_funds_rate', 5.0), ('unemployment_rate', 4.0), ('cpi_yoy', 3.0), ('real_gdp_growth', 2.0),
+    # Interactions
+    ('vix_yield_interaction', 90.0), ('sentiment_volatility_interaction', 0.0), ('dxy_vix_interaction', 2000.0),
+    # Breadth and options (feature context)
+    ('small_large_ratio', 1.0), ('vix_level', 20.0), ('vix_term_structure', 1.0)
+)
+
+
+class FeatureSchemaError(ValueError):
+    """Raised when feature values do not follow the schema the models were trained on"""
+
+
+class FeatureSchema:
+    """Names, defaults and order of the model inputs.
+
+    Feature vectors are float64 arrays preallocated from the defaults and filled by index,
+    so a fetch that fails leaves its features at their defaults instead of dropping columns
+    and shifting every later one.
+    """
+
+    dtype = np.float64
+
+    def __init__(self, features):
+        self.names = tuple(name for name, _ in features)
+        self.defaults = np.array([default for _, default in features], dtype=self.dtype)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.fingerprint = hashlib.sha1(','.join(self.names).encode()).hexdigest()[:12]
+
+    def __len__(self):
+        return len(self.names)
+
+    def empty(self, n):
+        """(n, features) array holding the defaults"""
+        return np.tile(self.defaults, (n, 1))
+
+    def matches(self, names):
+        return names is not None and tuple(names) == self.names
+
+    def validate(self, names):
+        if not self.matches(names):
+            raise FeatureSchemaError(f"Feature layout differs from schema {self.fingerprint}")
+
+
+FEATURE_SCHEMA = FeatureSchema(FEATURES)
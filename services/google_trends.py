@@ -0,0 +1,161 @@
+import os
+import json
+import random
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+from pytrends.request import TrendReq
+
+# Market-related searches and how each moves sentiment (negative terms raise fear)
+TREND_KEYWORDS = ['stock market crash', 'market volatility', 'recession', 'bull market', 'bear market']
+NEGATIVE_WEIGHTS = {'stock market crash': 0.4, 'market volatility': 0.3, 'recession': 0.3, 'bear market': 0.2}
+POSITIVE_WEIGHTS = {'bull market': 1.0}
+
+# Trends data moves hourly; refreshes are attempted on this cadence
+TRENDS_REFRESH_MINUTES = int(os.getenv('TRENDS_REFRESH_MINUTES', '60'))
+TRENDS_TIMEFRAME = os.getenv('TRENDS_TIMEFRAME', 'now 1-d')
+
+# After a failed refresh (429s above all) wait base * 2^(failures - 1) minutes, up to max
+TRENDS_BACKOFF_BASE_MINUTES = int(os.getenv('TRENDS_BACKOFF_BASE_MINUTES', '5'))
+TRENDS_BACKOFF_MAX_MINUTES = int(os.getenv('TRENDS_BACKOFF_MAX_MINUTES', '360'))
+
+TRENDS_CACHE_PATH = os.getenv('TRENDS_CACHE_PATH', os.path.join('data', 'google_trends.json'))
+
+
+class GoogleTrendsCache:
+    """Google Trends interest series refreshed on its own cadence and cached on disk.
+
+    The scheduler calls refresh() often; it only queries Google once the last successful
+    fetch is TRENDS_REFRESH_MINUTES old, and after a failure waits exponentially longer
+    (with jitter) before trying again. The series and the backoff state live in a JSON file,
+    so restarts and other processes see both, and the monitoring cycle reads the latest
+    value from memory without any network call.
+    """
+
+    def __init__(self, path=None, refresh_minutes=None, client_factory=None):
+        self.path = path or TRENDS_CACHE_PATH
+        self.refresh_minutes = refresh_minutes or TRENDS_REFRESH_MINUTES
+        self.client_factory = client_factory
+        self._state = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def refresh(self, now=None, force=False):
+        """Fetch the interest series if due; returns True when a new series was stored"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            state = self._load()
+            if not force and now < self._next_attempt(state):
+                return False
+
+            try:
+                client = (self.client_factory or TrendReq)(hl='en-US', tz=360)
+                client.build_payload(TREND_KEYWORDS, cat=0, timeframe=TRENDS_TIMEFRAME, geo='US', gprop='')
+                interest = client.interest_over_time()
+            except Exception as e:
+                state['failures'] = state.get('failures', 0) + 1
+                delay = min(TRENDS_BACKOFF_MAX_MINUTES, TRENDS_BACKOFF_BASE_MINUTES * 2 ** (state['failures'] - 1))
+                state['retry_at'] = (now + timedelta(minutes=delay * random.uniform(1.0, 1.25))).isoformat()
+                if _is_rate_limited(e):
+                    logging.warning(f"Google Trends rate limited, retrying in ~{delay} minutes")
+                else:
+                    logging.error(f"Error refreshing Google Trends: {e}, retrying in ~{delay} minutes")
+                self._save(state)
+                return False
+
+            if interest.empty:
+                # Nothing to store; keep the previous series and try again on the normal cadence
+                state.update({'fetched_at': now.isoformat(), 'failures': 0, 'retry_at': None})
+                self._save(state)
+                return False
+
+            columns = [k for k in TREND_KEYWORDS if k in interest.columns]
+            state.update({
+                'fetched_at': now.isoformat(),
+                'failures': 0,
+                'retry_at': None,
+                'timeframe': TRENDS_TIMEFRAME,
+                'index': [ts.isoformat() for ts in interest.index],
+                'series': {k: interest[k].astype(float).tolist() for k in columns}
+            })
+            self._save(state)
+            logging.info(f"📈 Google Trends refreshed: {len(interest)} points")
+            return True
+
+    def interest_over_time(self):
+        """The cached interest series as a DataFrame (empty when nothing was fetched yet)"""
+        with self._lock:
+            state = self._load()
+        if not state.get('index'):
+            return pd.DataFrame(columns=TREND_KEYWORDS)
+        return pd.DataFrame(state['series'], index=pd.to_datetime(state['index']))
+
+    def latest(self):
+        """Most recent interest value per keyword, or {}"""
+        with self._lock:
+            state = self._load()
+        return {k: values[-1] for k, values in (state.get('series') or {}).items() if values}
+
+    def sentiment(self):
+        """Sentiment in [-0.3, 0.3] from the latest cached interest values, 0.0 without data"""
+        latest = self.latest()
+        if not latest:
+            return 0.0
+        negative = sum(latest.get(k, 0) * w for k, w in NEGATIVE_WEIGHTS.items()) / 100
+        positive = sum(latest.get(k, 0) * w for k, w in POSITIVE_WEIGHTS.items()) / 100
+        return max(-0.3, min(0.3, (positive - negative) * 0.3))
+
+    def age(self, now=None):
+        """Age of the cached series, or None"""
+        with self._lock:
+            fetched_at = self._load().get('fetched_at')
+        return (now or datetime.utcnow()) - datetime.fromisoformat(fetched_at) if fetched_at else None
+
+    def _next_attempt(self, state):
+        if state.get('retry_at'):
+            return datetime.fromisoformat(state['retry_at'])
+        if state.get('fetched_at'):
+            return datetime.fromisoformat(state['fetched_at']) + timedelta(minutes=self.refresh_minutes)
+        return datetime.min
+
+    def _load(self):
+        # Re-read only when another process (or a restart) changed the file
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if self._state is None or (mtime is not None and mtime != self._mtime):
+            try:
+                with open(self.path) as f:
+                    self._state = json.load(f)
+            except (OSError, ValueError):
+                self._state = {}
+            self._mtime = mtime
+        return self._state
+
+    def _save(self, state):
+        self._state = state
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f'{self.path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+            self._mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            logging.error(f"Could not write Google Trends cache: {e}")
+
+    def reset(self):
+        with self._lock:
+            self._state = None
+            self._mtime = None
+
+
+def _is_rate_limited(error):
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None) == 429 or '429' in str(error) or 'TooManyRequests' in type(error).__name__
+
+
+google_trends = GoogleTrendsCache()
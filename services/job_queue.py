@@ -0,0 +1,433 @@
+import os
+import time
+import uuid
+import socket
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from app import app, db, socketio, sqlite_profile
+from models import BackgroundJob, BacktestResult, MLModel
+
+# Owners refresh heartbeat_at this often; a job whose heartbeat is older than the stale
+# window belongs to a process that is gone
+JOB_HEARTBEAT_SECONDS = int(os.getenv('JOB_HEARTBEAT_SECONDS', '30'))
+JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', '300'))
+
+# Identifies this process; the boot id guards against pid reuse
+HOSTNAME = socket.gethostname()
+PROCESS_OWNER = f"{HOSTNAME}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class JobCancelled(Exception):
+    """Raised from a progress callback once cancellation has been requested"""
+
+
+class JobQueue:
+    """Background jobs on a thread pool, tracked in BackgroundJob.
+
+    Every write (job state, progress, heartbeats and the rows handlers persist) goes
+    through the sqlite_profile single-writer queue; reads use the worker's own session.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or int(os.getenv('JOB_WORKERS', '2'))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job-worker')
+        self.handlers = {
+            'backtest': self._run_backtest,
+            'backtest_sweep': self._run_backtest_sweep,
+            'stress_scenarios': self._run_stress_scenarios,
+            'train_ml_model': self._train_ml_model,
+            'train_advanced_ml': self._train_advanced_ml,
+            'update_ml_models': self._update_ml_models
+        }
+        self.owner = PROCESS_OWNER
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Once per process: fail jobs orphaned by dead processes and start the heartbeat"""
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+        self.recover_interrupted()
+        threading.Thread(target=self._heartbeat_loop, name='job-heartbeat', daemon=True).start()
+
+    def submit(self, job_type, parameters):
+        """Record a job and hand it to the worker pool, returning its id immediately"""
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+
+        job_id = self._insert(BackgroundJob(job_type=job_type, status='queued', parameters=parameters,
+                                            message='Queued', owner=self.owner, heartbeat_at=datetime.utcnow()))
+
+        self.executor.submit(self._run, job_id)
+        logging.info(f"Queued {job_type} job {job_id}")
+        return job_id
+
+    def cancel(self, job_id):
+        """Request cancellation; queued jobs stop at once, running jobs at their next progress report"""
+        def write():
+            job = db.session.get(BackgroundJob, job_id)
+            if job is None:
+                return None
+            if job.status == 'queued':
+                job.status = 'cancelled'
+                job.finished_at = datetime.utcnow()
+                job.message = 'Cancelled before start'
+            elif job.status == 'running':
+                job.cancel_requested = True
+                job.message = 'Cancellation requested'
+            db.session.commit()
+            return self.to_dict(job)
+
+        state = sqlite_profile.writes.run(write)
+        if state:
+            self._emit(state)
+        return state
+
+    def get(self, job_id):
+        """Current state of a job"""
+        job = db.session.get(BackgroundJob, job_id)
+        return self.to_dict(job) if job else None
+
+    def list_recent(self, limit=50):
+        """Most recent jobs, newest first"""
+        jobs = BackgroundJob.query.order_by(BackgroundJob.created_at.desc()).limit(limit).all()
+        return [self.to_dict(job) for job in jobs]
+
+    def to_dict(self, job):
+        """Serialize a job row for the API and SocketIO"""
+        return {
+            'id': job.id,
+            'job_type': job.job_type,
+            'status': job.status,
+            'progress': job.progress,
+            'message': job.message,
+            'result': job.result,
+            'error': job.error,
+            'created_at': job.created_at.isoformat() if job.created_at else None,
+            'started_at': job.started_at.isoformat() if job.started_at else None,
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None
+        }
+
+    def recover_interrupted(self, now=None):
+        """Fail queued or running jobs whose owning process is gone (e.g. a recycled gunicorn worker)
+
+        A job is orphaned when its owner ran on this host under a pid that no longer exists,
+        or when its heartbeat is older than JOB_STALE_SECONDS. Jobs of live processes,
+        including other gunicorn workers, are left alone.
+        """
+        now = now or datetime.utcnow()
+
+        def write():
+            active = BackgroundJob.query.filter(BackgroundJob.status.in_(['queued', 'running'])).all()
+            stale = [job for job in active if self._is_orphaned(job, now)]
+            for job in stale:
+                job.status = 'failed'
+                job.error = 'Interrupted by a process restart'
+                job.finished_at = now
+            db.session.commit()
+            return len(stale)
+
+        try:
+            with app.app_context():  # Writes run inline on other databases
+                recovered = sqlite_profile.writes.run(write)
+            if recovered:
+                logging.warning(f"Marked {recovered} interrupted background jobs as failed")
+            return recovered
+        except Exception as e:
+            logging.error(f"Error recovering background jobs: {e}")
+            return 0
+
+    def _is_orphaned(self, job, now):
+        if job.owner == self.owner:
+            return False
+        if job.heartbeat_at is None or now - job.heartbeat_at > timedelta(seconds=JOB_STALE_SECONDS):
+            return True
+        host, _, rest = (job.owner or '').partition(':')
+        pid = rest.partition(':')[0]
+        return host == HOSTNAME and pid.isdigit() and not _pid_alive(int(pid))
+
+    def _heartbeat_loop(self):
+        while True:
+            time.sleep(JOB_HEARTBEAT_SECONDS)
+            try:
+                self._heartbeat()
+            except Exception as e:
+                logging.warning(f"Job heartbeat failed: {e}")
+
+    def _heartbeat(self):
+        """Refresh heartbeat_at on this process's queued and running jobs"""
+        def write():
+            BackgroundJob.query.filter(
+                BackgroundJob.owner == self.owner, BackgroundJob.status.in_(['queued', 'running'])
+            ).update({'heartbeat_at': datetime.utcnow()}, synchronize_session=False)
+            db.session.commit()
+
+        with app.app_context():
+            sqlite_profile.writes.run(write)
+
+    def _run(self, job_id):
+        """Worker entry point: execute one job inside its own app context"""
+        with app.app_context():
+            def start():
+                job = db.session.get(BackgroundJob, job_id)
+                if job is None or job.status != 'queued':
+                    return None
+                job.status = 'running'
+                job.started_at = job.heartbeat_at = datetime.utcnow()
+                job.message = 'Running'
+                db.session.commit()
+                return self.to_dict(job)
+
+            state = sqlite_profile.writes.run(start)
+            if state is None:
+                return
+            self._emit(state)
+
+            job_type = state['job_type']
+            try:
+                handler = self.handlers[job_type]
+                parameters = db.session.get(BackgroundJob, job_id).parameters or {}
+                result = handler(parameters, lambda fraction, message=None: self._report(job_id, fraction, message))
+
+                if self._cancel_requested(job_id):
+                    raise JobCancelled()
+                outcome = {'status': 'completed', 'progress': 1.0, 'message': 'Completed', 'result': result}
+                logging.info(f"✅ {job_type} job {job_id} completed")
+
+            except Exception as e:
+                db.session.rollback()
+                if isinstance(e, JobCancelled) or self._cancel_requested(job_id):
+                    outcome = {'status': 'cancelled', 'message': 'Cancelled'}
+                    logging.info(f"{job_type} job {job_id} cancelled")
+                else:
+                    outcome = {'status': 'failed', 'error': str(e), 'message': 'Failed'}
+                    logging.error(f"❌ {job_type} job {job_id} failed: {e}")
+
+            self._emit(self._update(job_id, finished_at=datetime.utcnow(), **outcome))
+
+    def _report(self, job_id, fraction, message=None):
+        """Progress callback handed to long-running services"""
+        if self._cancel_requested(job_id):
+            raise JobCancelled()
+
+        fields = {'progress': round(min(1.0, max(0.0, fraction)), 4), 'heartbeat_at': datetime.utcnow()}
+        if message:
+            fields['message'] = message[:255]
+        self._emit(self._update(job_id, **fields))
+
+    def _update(self, job_id, **fields):
+        """Set fields on a job through the write queue; returns its new state"""
+        def write():
+            job = db.session.get(BackgroundJob, job_id)
+            for name, value in fields.items():
+                setattr(job, name, value)
+            db.session.commit()
+            return self.to_dict(job)
+
+        return sqlite_profile.writes.run(write)
+
+    def _insert(self, instance):
+        """Add a row through the write queue; returns its id"""
+        def write():
+            db.session.add(instance)
+            db.session.commit()
+            return instance.id
+
+        return sqlite_profile.writes.run(write)
+
+    def _cancel_requested(self, job_id):
+        """Read the cancel flag fresh from the database, since it is set from a request thread"""
+        return bool(db.session.query(BackgroundJob.cancel_requested).filter_by(id=job_id).scalar())
+
+    def _emit(self, state):
+        """Stream job state (as serialized by to_dict) to SocketIO clients"""
+        try:
+            socketio.emit('job_progress', state)
+        except Exception as e:
+            logging.warning(f"Could not emit job progress: {e}")
+
+    def _run_backtest(self, parameters, progress):
+        """Single backtest persisted to BacktestResult"""
+        from services.backtesting import Backtester
+
+        backtester = Backtester()
+        backtest_parameters = parameters.get('parameters', {})
+
+        progress(0.1, 'Running backtest')
+        results = backtester.run_backtest(backtest_parameters)
+        performance_metrics = backtester.serialize_results(backtester.calculate_performance_metrics(results))
+        results = backtester.serialize_results(results)
+
+        backtest_result = BacktestResult(
+            name=parameters.get('name', 'Backtest'),
+            parameters=backtest_parameters,
+            results=results,
+            performance_metrics=performance_metrics
+        )
+        backtest_result_id = self._insert(backtest_result)
+
+        return {
+            'backtest_result_id': backtest_result_id,
+            **{key: results[key] for key in ('final_value', 'total_return', 'sharpe_ratio', 'max_drawdown', 'num_trades')}
+        }
+
+    def _run_backtest_sweep(self, parameters, progress):
+        """Parameter grid persisted as a ranked BacktestResult"""
+        from services.backtest_sweep import BacktestSweep
+
+        sweep_parameters = parameters.get('parameters', {})
+        summary = BacktestSweep().run_sweep(sweep_parameters, progress_callback=progress)
+
+        backtest_result = BacktestResult(
+            name=parameters.get('name', 'Backtest Sweep'),
+            parameters=sweep_parameters,
+            results={'ranking': summary['ranking']},
+            performance_metrics={
+                'combinations': summary['combinations'],
+                'rank_by': summary['rank_by'],
+                'elapsed_seconds': summary['elapsed_seconds'],
+                'best': summary['ranking'][0] if summary['ranking'] else None
+            }
+        )
+        backtest_result_id = self._insert(backtest_result)
+
+        return {
+            'backtest_result_id': backtest_result_id,
+            'combinations': summary['combinations'],
+            'best': summary['ranking'][0] if summary['ranking'] else None
+        }
+
+    def _run_stress_scenarios(self, parameters, progress):
+        """Monte Carlo stress test persisted as a BacktestResult"""
+        from services.scenario_engine import ScenarioEngine
+
+        scenario_parameters = parameters.get('parameters', {})
+        summary = ScenarioEngine().run_scenarios(scenario_parameters, progress_callback=progress)
+
+        backtest_result = BacktestResult(
+            name=parameters.get('name', 'Stress Scenarios'),
+            parameters=scenario_parameters,
+            results={'distributions': summary['distributions']},
+            performance_metrics={
+                'n_paths': summary['n_paths'],
+                'n_days': summary['n_days'],
+                'elapsed_seconds': summary['elapsed_seconds'],
+                **summary['tail_risk']
+            }
+        )
+        backtest_result_id = self._insert(backtest_result)
+
+        return {'backtest_result_id': backtest_result_id, 'tail_risk': summary['tail_risk']}
+
+    def _train_ml_model(self, parameters, progress):
+        """Crash classifier training persisted to MLModel"""
+        from services.ml_trainer import MLTrainer
+
+        progress(0.1, 'Training risk predictor')
+        model_path, accuracy, training_size = MLTrainer().train_model()
+
+        ml_model = MLModel(
+            name=parameters.get('name', 'Risk Predictor'),
+            version="1.0",
+            accuracy=accuracy,
+            training_data_size=training_size,
+            model_path=model_path
+        )
+        return {'ml_model_id': self._insert(ml_model), 'accuracy': accuracy}
+
+    def _train_advanced_ml(self, parameters, progress):
+        """Multi-horizon MLRiskScorer training persisted to MLModel"""
+        from services.ml_risk_scorer import MLRiskScorer, TRAINING_COLUMNS
+        from services.training_data import TrainingDataLoader, TRAINING_MAX_ROWS, to_training_frame
+
+        ml_scorer = MLRiskScorer()
+
+        # Bring the training snapshot up to date, then read the feature columns of the most
+        # recent max_rows from it
+        loader = TrainingDataLoader()
+        progress(0.01, 'Extracting training data')
+        with sqlite_profile.read_session() as session:
+            loader.refresh(session)
+        history = loader.load(TRAINING_COLUMNS, max_rows=parameters.get('max_rows') or TRAINING_MAX_ROWS)
+        history = history.merge(loader.labels(), on='id', how='left')
+
+        if len(history) < 10:
+            # Generate synthetic training data if insufficient real data
+            logging.info("Insufficient historical data, generating synthetic training data")
+            training_data = ml_scorer._generate_synthetic_training_data(500)
+        else:
+            training_data = to_training_frame(history)
+
+        progress(0.05, f"Loaded {len(training_data)} training rows")
+        if not ml_scorer.train_models(training_data, progress_callback=progress):
+            raise RuntimeError('Training failed')
+
+        return self._record_ml_model(ml_scorer, parameters.get('name', 'Advanced Risk Ensemble'), len(training_data))
+
+    def _update_ml_models(self, parameters, progress):
+        """Daily online update of the MLRiskScorer models, with a full refit when one is due"""
+        from services.ml_risk_scorer import MLRiskScorer, TRAINING_COLUMNS
+        from services.training_data import TrainingDataLoader, to_training_frame
+
+        ml_scorer = MLRiskScorer()
+        ml_scorer.load_models()
+        if not ml_scorer.feature_names or ml_scorer.needs_full_refit(parameters.get('full_refit_days')):
+            progress(0.01, 'Full refit due')
+            return {'full_refit': True, **self._train_advanced_ml(parameters, progress)}
+
+        loader = TrainingDataLoader()
+        progress(0.01, 'Extracting new rows')
+        with sqlite_profile.read_session() as session:
+            loader.refresh(session)
+        labels = loader.labels()
+        new_rows = loader.load_since(ml_scorer.training_state.get('data_through_id'), TRAINING_COLUMNS)
+        new_rows = new_rows.merge(labels, on='id', how='left')
+
+        progress(0.05, f"Folding in {len(new_rows)} new rows")
+        if not ml_scorer.update_models(to_training_frame(new_rows), labels=labels, progress_callback=progress):
+            raise RuntimeError('Model update failed')
+
+        return {'full_refit': False,
+                **self._record_ml_model(ml_scorer, parameters.get('name', 'Advanced Risk Ensemble'), len(new_rows))}
+
+    def _record_ml_model(self, ml_scorer, name, training_size):
+        """MLModel row for the store version the scorer just published, marked active"""
+        if not ml_scorer.artifact_version:
+            raise RuntimeError('Trained models were not published')
+        performance = ml_scorer.get_model_performance()
+        cv_scores = [m['cv_score'] for m in performance.values() if 'cv_score' in m]
+
+        ml_model = MLModel(
+            name=name,
+            version=datetime.utcnow().strftime('%Y%m%d%H%M%S'),
+            accuracy=float(sum(cv_scores) / len(cv_scores)) if cv_scores else None,
+            training_data_size=training_size,
+            model_path=ml_scorer.store.version_dir(ml_scorer.artifact_version),
+            is_active=True
+        )
+
+        def write():
+            MLModel.query.filter(MLModel.model_path.like(f"{ml_scorer.store.versions_dir}%")).update({'is_active': False})
+            db.session.add(ml_model)
+            db.session.commit()
+            return ml_model.id
+
+        return {
+            'ml_model_id': sqlite_profile.writes.run(write),
+            'artifact_version': ml_scorer.artifact_version,
+            'performance': performance,
+            'feature_importance': ml_scorer.get_feature_importance()
+        }
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
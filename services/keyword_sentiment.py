@@ -0,0 +1,87 @@
+import re
+
+import numpy as np
+
+# Shared lexicon for every text source: term -> weight. Terms match whole words
+# case-insensitively, so 'up' no longer fires on 'support' nor 'low' on 'follow'.
+# Ambiguous direction words carry less weight than unambiguous market vocabulary.
+LEXICON = {
+    # Positive
+    'bull': 0.05, 'bulls': 0.05, 'bullish': 0.05, 'buy': 0.05, 'buying': 0.05,
+    'gain': 0.05, 'gains': 0.05, 'gained': 0.05, 'profit': 0.05, 'profits': 0.05,
+    'rise': 0.05, 'rises': 0.05, 'rising': 0.05, 'rose': 0.05,
+    'rally': 0.05, 'rallies': 0.05, 'rallied': 0.05, 'rebound': 0.05, 'rebounds': 0.05, 'recovery': 0.05,
+    'surge': 0.1, 'surges': 0.1, 'surged': 0.1, 'soar': 0.1, 'soars': 0.1, 'soared': 0.1,
+    'strong': 0.05, 'strength': 0.05, 'growth': 0.05, 'optimistic': 0.05, 'optimism': 0.05,
+    'upgrade': 0.05, 'upgraded': 0.05, 'record high': 0.1, 'all-time high': 0.1,
+    'up': 0.03, 'high': 0.03, 'higher': 0.03, 'record': 0.03,
+    # Negative
+    'bear': -0.05, 'bears': -0.05, 'bearish': -0.05, 'sell': -0.05, 'selling': -0.05,
+    'sell-off': -0.1, 'selloff': -0.1, 'loss': -0.05, 'losses': -0.05,
+    'fall': -0.05, 'falls': -0.05, 'falling': -0.05, 'fell': -0.05,
+    'drop': -0.05, 'drops': -0.05, 'dropped': -0.05, 'decline': -0.05, 'declines': -0.05, 'declined': -0.05,
+    'crash': -0.1, 'crashes': -0.1, 'crashed': -0.1, 'plunge': -0.1, 'plunges': -0.1, 'plunged': -0.1,
+    'slump': -0.05, 'slumps': -0.05, 'tumble': -0.05, 'tumbles': -0.05, 'tumbled': -0.05,
+    'weak': -0.05, 'weakness': -0.05, 'recession': -0.1, 'pessimistic': -0.05, 'panic': -0.1,
+    'fear': -0.05, 'fears': -0.05, 'downgrade': -0.05, 'downgraded': -0.05,
+    'down': -0.03, 'low': -0.03, 'lower': -0.03
+}
+
+# Per-document scores are clipped to this magnitude
+SCORE_CAP = 0.3
+
+
+class KeywordSentimentScorer:
+    """Lexicon sentiment for a batch of texts with one compiled word-boundary regex.
+
+    The batch is joined into a single string and scanned once; each match is mapped back
+    to its document by offset. A term counts once per document however often it repeats,
+    and a document's score is the sum of its terms' weights clipped to +/- cap.
+    """
+
+    def __init__(self, lexicon=None, cap=SCORE_CAP):
+        lexicon = LEXICON if lexicon is None else lexicon
+        self.terms = sorted(lexicon, key=len, reverse=True)  # Longest first: 'sell-off' before 'sell'
+        self.term_index = {term: i for i, term in enumerate(self.terms)}
+        self.weights = np.array([lexicon[term] for term in self.terms], dtype=np.float64)
+        self.cap = cap
+        self.pattern = re.compile(r'\b(?:' + '|'.join(re.escape(term) for term in self.terms) + r')\b',
+                                  re.IGNORECASE)
+
+    def score_texts(self, texts):
+        """{'scores': per-document array, 'average', 'count', 'positive', 'negative'}"""
+        texts = [text or '' for text in texts]
+        n = len(texts)
+        if not n:
+            return {'scores': np.zeros(0), 'average': 0.0, 'count': 0, 'positive': 0, 'negative': 0}
+
+        # Newlines are non-word characters, so no match spans two documents
+        joined = '\n'.join(text.replace('\n', ' ') for text in texts)
+        starts = np.cumsum([0] + [len(text) + 1 for text in texts[:-1]])
+
+        positions, terms = [], []
+        for match in self.pattern.finditer(joined):
+            positions.append(match.start())
+            terms.append(self.term_index[match.group().lower()])
+
+        scores = np.zeros(n)
+        if positions:
+            documents = np.searchsorted(starts, positions, side='right') - 1
+            hits = np.unique(documents * len(self.terms) + np.asarray(terms))
+            documents, terms = np.divmod(hits, len(self.terms))
+            scores = np.bincount(documents, weights=self.weights[terms], minlength=n)
+        scores = np.clip(scores, -self.cap, self.cap)
+
+        return {
+            'scores': scores,
+            'average': float(scores.mean()),
+            'count': n,
+            'positive': int((scores > 0).sum()),
+            'negative': int((scores < 0).sum())
+        }
+
+    def average(self, texts):
+        return self.score_texts(texts)['average']
+
+
+keyword_sentiment = KeywordSentimentScorer()
@@ -5,6 +5,7 @@ from datetime import datetime
 from openai import OpenAI
 from google import genai
 from google.genai import types
+from services.metrics import instrumented, stage_failed
 
 class LLMRiskAnalyzer:
     def __init__(self):
@@ -18,6 +19,7 @@ class LLMRiskAnalyzer:
         
         self.use_gemini_primary = True  # Cost optimization flag
         
+    @instrumented('llm_risk_analysis')
     def analyze_market_risks(self, market_data, sentiment_data, risk_components):
         """Generate comprehensive risk analysis with actionable insights"""
         try:
@@ -82,6 +84,7 @@ class LLMRiskAnalyzer:
             
         except Exception as e:
             logging.error(f"Error in LLM risk analysis: {e}")
+            stage_failed()
             return self._fallback_analysis(risk_components)
     
     def _analyze_with_gemini_direct(self, data_summary, risk_components):
@@ -137,6 +140,7 @@ class LLMRiskAnalyzer:
         - Economic Indicators: {risk_components.get('economic', 0)}/100
         """
     
+    @instrumented('llm_alert_insights')
     def generate_alert_insights(self, risk_score, market_data, sentiment_data):
         """Generate intelligent alert messages with context"""
         try:
@@ -177,6 +181,7 @@ class LLMRiskAnalyzer:
             
         except Exception as e:
             logging.error(f"Error generating alert insights: {e}")
+            stage_failed()
             return {
                 "alert_title": f"Risk Level: {risk_level}",
                 "alert_message": f"Market risk score is {risk_score}/100. Monitor positions closely.",
@@ -184,6 +189,7 @@ class LLMRiskAnalyzer:
                 "urgency_level": 3
             }
     
+    @instrumented('llm_portfolio_exposure')
     def analyze_portfolio_exposure(self, portfolio_data, market_risk_analysis):
         """Analyze portfolio-specific risks with LLM insights"""
         try:
@@ -222,8 +228,10 @@ class LLMRiskAnalyzer:
             
         except Exception as e:
             logging.error(f"Error analyzing portfolio exposure: {e}")
+            stage_failed()
             return {"portfolio_risk_level": "MODERATE", "vulnerable_positions": [], "hedging_recommendations": []}
     
+    @instrumented('llm_market_patterns')
     def interpret_market_patterns(self, historical_data, current_conditions):
         """Identify market patterns and correlations with LLM analysis"""
         try:
@@ -262,6 +270,7 @@ class LLMRiskAnalyzer:
             
         except Exception as e:
             logging.error(f"Error interpreting market patterns: {e}")
+            stage_failed()
             return {"pattern_identification": "Analysis unavailable", "correlation_analysis": "No patterns detected"}
     
     def _prepare_data_summary(self, market_data, sentiment_data, risk_components):
@@ -0,0 +1,188 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+# Daily bar symbols cached for replay, keyed by backtest column
+BAR_SYMBOLS = {
+    'spy': 'SPY',
+    'vix': '^VIX',
+    'dxy': 'DX-Y.NYB'
+}
+
+# On-disk record layout of a stored series; dates and values share one file so a single
+# rename publishes both
+SERIES_DTYPE = np.dtype([('date', 'datetime64[D]'), ('value', np.float64)])
+
+# RiskScore JSON fields rolled up into daily observation series
+OBSERVATION_FIELDS = {
+    'spy': ('market_data', 'spy'),
+    'vix': ('market_data', 'vix'),
+    'dxy': ('market_data', 'dxy'),
+    'reddit_sentiment': ('sentiment_data', 'reddit'),
+    'twitter_sentiment': ('sentiment_data', 'twitter'),
+    'news_sentiment': ('sentiment_data', 'news')
+}
+
+
+class MarketReplay:
+    """Replay source for backtests built from cached daily bars and stored RiskScore observations.
+
+    Every series lives in the store as one structured .npy file of (datetime64[D] date, float64
+    value) records sorted by date, memory-mapped on load, so a date range is located with a binary
+    search and sliced without reading the rest of the history. Nothing here touches the
+    network except refresh_daily_bars, which is meant to run on a schedule.
+    """
+
+    def __init__(self, store_dir=None):
+        self.store_dir = store_dir or os.getenv('REPLAY_STORE_DIR', os.path.join('data', 'replay'))
+
+    def load(self, start_date, end_date, sync_observations=False):
+        """Aligned daily frame (same columns as the synthetic generator) for a date range.
+
+        Observations come from the store as last synced by the nightly replay refresh; pass
+        sync_observations=True to roll in newer RiskScore rows first.
+        """
+        if sync_observations:
+            self.sync_observations()
+
+        start = np.datetime64(start_date, 'D')
+        end = np.datetime64(end_date, 'D')
+
+        # SPY trading days are the replay calendar
+        calendar, spy = self._slice(self._series_for('spy'), start, end)
+        valid = ~np.isnan(spy)
+        calendar, spy = calendar[valid], spy[valid]
+        if len(calendar) == 0:
+            raise ValueError(f"No cached SPY history between {start_date} and {end_date}; run refresh_daily_bars first")
+
+        data = {'date': calendar.astype('datetime64[ns]'), 'spy': spy}
+        for column, default in (('vix', 20.0), ('dxy', 100.0)):
+            data[column] = self._align(self._series_for(column), calendar, default)
+        for column in ('reddit_sentiment', 'twitter_sentiment', 'news_sentiment'):
+            data[column] = self._align(self._read(f'obs_{column}'), calendar, 0.0)
+
+        return pd.DataFrame(data)
+
+    def available_range(self):
+        """First and last replayable dates, or None if nothing is cached"""
+        dates, _ = self._series_for('spy') or (None, None)
+        if dates is None or len(dates) == 0:
+            return None
+        return str(dates[0]), str(dates[-1])
+
+    def refresh_daily_bars(self, period='max'):
+        """Download daily closes for the replay symbols into the store"""
+        import yfinance as yf
+
+        for column, symbol in BAR_SYMBOLS.items():
+            try:
+                history = yf.Ticker(symbol).history(period=period, interval='1d')
+                if history.empty:
+                    logging.warning(f"No daily bars returned for {symbol}")
+                    continue
+                dates = history.index.tz_localize(None).to_numpy().astype('datetime64[D]')
+                self._merge(f'bars_{column}', dates, history['Close'].to_numpy(dtype=float))
+                logging.info(f"Cached {len(dates)} daily bars for {symbol}")
+            except Exception as e:
+                logging.error(f"Error refreshing daily bars for {symbol}: {e}")
+
+    def sync_observations(self):
+        """Roll RiskScore rows newer than the store into daily (last-of-day) observation series"""
+        try:
+            from app import app, db
+            from models import RiskScore
+
+            # Re-read the last stored day so a partially synced day gets its final value
+            existing = self._read('obs_spy')
+            since = pd.Timestamp(existing[0][-1]).to_pydatetime() if existing and len(existing[0]) else datetime.min
+
+            with app.app_context():
+                query = (db.session.query(RiskScore.timestamp, RiskScore.market_data, RiskScore.sentiment_data)
+                         .filter(RiskScore.timestamp >= since)
+                         .order_by(RiskScore.timestamp)
+                         .yield_per(5000))
+
+                daily = {}
+                for timestamp, market_data, sentiment_data in query:
+                    if timestamp is not None:
+                        daily[timestamp.date()] = {'market_data': market_data or {}, 'sentiment_data': sentiment_data or {}}
+
+            if not daily:
+                return 0
+
+            dates = np.array(sorted(daily), dtype='datetime64[D]')
+            days = sorted(daily)
+            for column, (source, key) in OBSERVATION_FIELDS.items():
+                values = np.array([self._as_float(daily[day][source].get(key)) for day in days])
+                self._merge(f'obs_{column}', dates, values)
+
+            logging.info(f"Synced {len(days)} days of RiskScore observations into the replay store")
+            return len(days)
+
+        except Exception as e:
+            logging.warning(f"Could not sync RiskScore observations for replay: {e}")
+            return 0
+
+    def _series_for(self, column):
+        """Cached daily bars for a market column, falling back to RiskScore observations"""
+        return self._read(f'bars_{column}') or self._read(f'obs_{column}')
+
+    def _slice(self, series, start, end):
+        """Date-range view of a memory-mapped series via binary search"""
+        if not series:
+            return np.array([], dtype='datetime64[D]'), np.array([])
+        dates, values = series
+        lo = np.searchsorted(dates, start, side='left')
+        hi = np.searchsorted(dates, end, side='right')
+        return dates[lo:hi], values[lo:hi]
+
+    def _align(self, series, calendar, default):
+        """As-of join of a series onto the calendar, forward-filling gaps"""
+        if not series:
+            return np.full(len(calendar), default)
+        dates, values = series
+        idx = np.searchsorted(dates, calendar, side='right') - 1
+        aligned = np.where(idx >= 0, values[np.maximum(idx, 0)], default)
+        return np.where(np.isnan(aligned), default, aligned)
+
+    def _read(self, name):
+        """Memory-map a stored series as (dates, values) views, or None if it does not exist"""
+        path = self._path(name)
+        if not os.path.exists(path):
+            return None
+        records = np.load(path, mmap_mode='r')
+        return records['date'], records['value']
+
+    def _merge(self, name, dates, values):
+        """Upsert observations into a series; newer values win on overlapping dates"""
+        existing = self._read(name)
+        if existing:
+            keep = ~np.isin(existing[0], dates)
+            dates = np.concatenate([existing[0][keep], dates])
+            values = np.concatenate([existing[1][keep], values])
+
+        order = np.argsort(dates, kind='stable')
+        self._write(name, dates[order], values[order])
+
+    def _write(self, name, dates, values):
+        """Publish dates and values with one rename; live memory maps keep their old snapshot"""
+        os.makedirs(self.store_dir, exist_ok=True)
+        records = np.empty(len(dates), dtype=SERIES_DTYPE)
+        records['date'] = dates
+        records['value'] = values
+        path = self._path(name)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, records)
+        os.replace(tmp_path, path)
+
+    def _path(self, name):
+        return os.path.join(self.store_dir, f'{name}.npy')
+
+    def _as_float(self, value):
+        try:
+            return float(value) if value is not None else np.nan
+        except (TypeError, ValueError):
+            return np.nan
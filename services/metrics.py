@@ -0,0 +1,185 @@
+import time
+import bisect
+import functools
+import threading
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from a local DB commit up to a slow LLM or pytrends call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Counter:
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(self.label_names, labels), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label key -> [per-bucket counts (last slot is +Inf), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(self.label_names, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, **labels):
+        """(sum, count) for one label set"""
+        series = self._series.get(_label_key(self.label_names, labels))
+        return (series[1], series[2]) if series else (0.0, 0)
+
+    def snapshot_all(self):
+        """{label values: (sum, count)} for every recorded label set"""
+        with self._lock:
+            return {key: (series[1], series[2]) for key, series in self._series.items()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else _format_value(bound)
+                    bucket_labels = _format_labels(self.label_names + ('le',), key + (le,))
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text exposition format.
+
+    Metrics live in the memory of the process that records them; with gunicorn that is the
+    worker running the monitoring thread, which is also the one serving /metrics.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, documentation, label_names=()):
+        return self._register(name, lambda: Counter(name, documentation, label_names))
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(name, lambda: Histogram(name, documentation, label_names, buckets))
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, name, factory):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = factory()
+            return self._metrics[name]
+
+
+def _label_key(label_names, labels):
+    return tuple(str(labels.get(name, '')) for name in label_names)
+
+
+def _format_labels(label_names, key):
+    if not label_names:
+        return ''
+    pairs = []
+    for name, value in zip(label_names, key):
+        escaped = value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    'risk_monitor_stage_duration_seconds',
+    'Wall-clock time spent in each monitoring pipeline stage.',
+    ('stage',)
+)
+STAGE_ERRORS = registry.counter(
+    'risk_monitor_stage_errors_total',
+    'Pipeline stages that raised, or caught a failure and returned a fallback.',
+    ('stage',)
+)
+MONITORING_CYCLES = registry.counter(
+    'risk_monitor_monitoring_cycles_total',
+    'Completed monitoring cycles by outcome.',
+    ('status',)
+)
+
+
+# Stages currently running on this thread, innermost last
+_running = threading.local()
+
+
+@contextmanager
+def timed(stage):
+    """Record the duration of a block under a stage label, counting it as an error if it raises"""
+    start = time.perf_counter()
+    stages = getattr(_running, 'stages', None)
+    if stages is None:
+        stages = _running.stages = []
+    stages.append(stage)
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        stages.pop()
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def stage_failed():
+    """Count an error for the innermost running stage when it catches a failure and returns a fallback"""
+    stages = getattr(_running, 'stages', None)
+    if stages:
+        STAGE_ERRORS.inc(stage=stages[-1])
+
+
+def instrumented(stage):
+    """Decorator form of timed()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,4 +1,7 @@
 import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
@@ -11,6 +14,43 @@ import logging
 from datetime import datetime, timedelta
 import yfinance as yf
 import requests
+from services.metrics import instrumented
+from services.training_targets import HORIZONS, heuristic_crash_targets
+from services.compiled_models import CompiledEnsemble
+from services.tree_explainer import ExplanationSet
+from services.model_store import ModelStore
+from services.feature_context import shared_feature_context, CONTEXT_GROUPS
+from services.feature_schema import FEATURE_SCHEMA, FeatureSchemaError
+from services.online_learning import ReplayBuffer, update_estimator, MIN_UPDATE_ROWS
+
+# Defaults for the scenario-dependent inputs of engineer_features
+MARKET_DEFAULTS = {'spy': 440, 'vix': 20, 'dxy': 100, 'ten_year': 4.5}
+SENTIMENT_KEYS = ('reddit', 'news', 'twitter')
+
+# Training snapshot columns (services.training_data) the feature matrix and targets are built from
+TRAINING_COLUMNS = (['id', 'timestamp', 'score'] + [f'market_{key}' for key in MARKET_DEFAULTS]
+                    + [f'sentiment_{key}' for key in SENTIMENT_KEYS])
+
+# Sector ETFs whose 5-day returns are model features, and threads fetching feature history
+FEATURE_SECTORS = ('XLF', 'XLK', 'XLV', 'XLE', 'XLI', 'XLU', 'XLB', 'XLRE', 'XLP', 'XLY')
+FEATURE_FETCH_WORKERS = int(os.getenv('FEATURE_FETCH_WORKERS', '8'))
+
+# Seconds a historical feature context is reused by get_feature_context
+FEATURE_CONTEXT_TTL = int(os.getenv('FEATURE_CONTEXT_TTL', '300'))
+
+# Online updates between full refits; their replay window is published with each model version
+FULL_REFIT_DAYS = int(os.getenv('ML_FULL_REFIT_DAYS', '7'))
+REPLAY_BUFFER_FILE = 'replay_buffer.npz'
+
+CRASH_WEIGHTS = {'crash_predictor_1d': 0.4, 'crash_predictor_3d': 0.3, 'crash_predictor_7d': 0.2, 'crash_predictor_14d': 0.1}
+
+
+def _to_float(value):
+    try:
+        return float(value) if value is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
 
 class MLRiskScorer:
     def __init__(self):
@@ -24,8 +64,19 @@ class MLRiskScorer:
             'sentiment_analyzer': None
         }
         self.scalers = {}
+        self.compiled = None  # CompiledEnsemble used for inference once models are trained or loaded
+        self.explainer = None  # ExplanationSet with TreeSHAP tables for the tree-based models
+        self.feature_names = None
+        self.training_state = {}  # full_fit_at, updated_at, online_updates, data_through_id
+        self.replay = None  # ReplayBuffer the current models were fitted or updated on
+        self.store = ModelStore()
+        self.artifact_version = None  # Model store version the models were loaded from or published as
         self.feature_importance = {}
         self.performance_metrics = {}
+        self._context = None
+        self._context_built = 0.0
+        self._context_lock = threading.Lock()
+        self.shared_context = shared_feature_context
         try:
             from fredapi import Fred
             fred_api_key = os.environ.get('FRED_API_KEY')
@@ -38,97 +89,191 @@ class MLRiskScorer:
             self.fred = None
             logging.warning("FRED API not available, using fallback economic data")
         
-    def engineer_features(self, market_data, sentiment_data, lookback_days=252):
-        """Create sophisticated features for ML models"""
+    def engineer_features(self, market_data, sentiment_data, lookback_days=252, context=None):
+        """Create sophisticated features for ML models, as a Series in FEATURE_SCHEMA order"""
+        return pd.Series(self.engineer_vector(market_data, sentiment_data, lookback_days, context),
+                         index=FEATURE_SCHEMA.names)
+    
+    def engineer_vector(self, market_data, sentiment_data, lookback_days=252, context=None):
+        """Feature vector for one market state as a float64 array in FEATURE_SCHEMA order"""
         try:
-            features = {}
-            
-            # Basic market features
-            features['spy_price'] = market_data.get('spy', 440)
-            features['vix'] = market_data.get('vix', 20)
-            features['dxy'] = market_data.get('dxy', 100)
-            features['ten_year'] = market_data.get('ten_year', 4.5)
-            
-            # Technical indicators (calculated from historical data)
-            spy_data = self._get_historical_data('SPY', lookback_days)
-            if len(spy_data) > 20:
-                # RSI
-                features['rsi_14'] = self._calculate_rsi(spy_data['Close'], 14)
-                features['rsi_30'] = self._calculate_rsi(spy_data['Close'], 30)
-                
-                # Moving averages
-                features['sma_20'] = spy_data['Close'].rolling(20).mean().iloc[-1]
-                features['sma_50'] = spy_data['Close'].rolling(50).mean().iloc[-1]
-                features['sma_200'] = spy_data['Close'].rolling(200).mean().iloc[-1]
-                
-                # Price position relative to MAs
-                current_price = spy_data['Close'].iloc[-1]
-                features['price_vs_sma20'] = (current_price - features['sma_20']) / features['sma_20']
-                features['price_vs_sma50'] = (current_price - features['sma_50']) / features['sma_50']
-                features['price_vs_sma200'] = (current_price - features['sma_200']) / features['sma_200']
-                
-                # Volatility features
-                features['volatility_20d'] = spy_data['Close'].pct_change().rolling(20).std() * np.sqrt(252)
-                features['volatility_60d'] = spy_data['Close'].pct_change().rolling(60).std() * np.sqrt(252)
-                
-                # Volume analysis
-                if 'Volume' in spy_data.columns:
-                    features['volume_ratio'] = spy_data['Volume'].iloc[-1] / spy_data['Volume'].rolling(20).mean().iloc[-1]
-                    features['volume_trend'] = spy_data['Volume'].rolling(5).mean().iloc[-1] / spy_data['Volume'].rolling(20).mean().iloc[-1]
-                
-                # Momentum indicators
-                features['momentum_1d'] = spy_data['Close'].pct_change(1).iloc[-1]
-                features['momentum_5d'] = spy_data['Close'].pct_change(5).iloc[-1]
-                features['momentum_20d'] = spy_data['Close'].pct_change(20).iloc[-1]
-                
-                # Bollinger Bands
-                bb_middle = spy_data['Close'].rolling(20).mean()
-                bb_std = spy_data['Close'].rolling(20).std()
-                bb_upper = bb_middle + (bb_std * 2)
-                bb_lower = bb_middle - (bb_std * 2)
-                features['bb_position'] = (current_price - bb_lower.iloc[-1]) / (bb_upper.iloc[-1] - bb_lower.iloc[-1])
-                
-            # Sentiment features
-            features['reddit_sentiment'] = sentiment_data.get('reddit', 0)
-            features['news_sentiment'] = sentiment_data.get('news', 0)
-            features['twitter_sentiment'] = sentiment_data.get('twitter', 0)
-            features['avg_sentiment'] = (features['reddit_sentiment'] + features['news_sentiment'] + features['twitter_sentiment']) / 3
-            
-            # Market structure features
-            sector_data = self._get_sector_performance()
-            features.update(sector_data)
-            
-            # Economic indicators from FRED
-            economic_features = self._get_fred_features()
-            features.update(economic_features)
-            
-            # Interaction features (key insight from the PDF)
-            features['vix_yield_interaction'] = features['vix'] * features['ten_year']
-            features['sentiment_volatility_interaction'] = features['avg_sentiment'] * features.get('volatility_20d', 1)
-            features['dxy_vix_interaction'] = features['dxy'] * features['vix']
-            
-            # Market breadth features
-            breadth_data = self._get_market_breadth()
-            features.update(breadth_data)
-            
-            # Options market features
-            options_features = self._get_options_features()
-            features.update(options_features)
-            
-            return pd.Series(features).fillna(0)
+            context = context or self.build_feature_context(lookback_days)
+            market = {key: _to_float(market_data.get(key, default)) for key, default in MARKET_DEFAULTS.items()}
+            sentiment = {key: _to_float(sentiment_data.get(key, 0)) for key in SENTIMENT_KEYS}
+            return self._feature_array(market, sentiment, context, 1)[0]
             
         except Exception as e:
             logging.error(f"Error engineering features: {e}")
-            # Return basic features if advanced feature engineering fails
-            return pd.Series({
-                'spy_price': market_data.get('spy', 440),
-                'vix': market_data.get('vix', 20),
-                'dxy': market_data.get('dxy', 100),
-                'ten_year': market_data.get('ten_year', 4.5),
-                'reddit_sentiment': sentiment_data.get('reddit', 0),
-                'news_sentiment': sentiment_data.get('news', 0),
-                'twitter_sentiment': sentiment_data.get('twitter', 0)
-            })
+            # Basic features only if advanced feature engineering fails; the rest stay at their defaults
+            return self._feature_array({key: _to_float(market_data.get(key, default)) for key, default in MARKET_DEFAULTS.items()},
+                                       {key: _to_float(sentiment_data.get(key, 0)) for key in SENTIMENT_KEYS}, {}, 1)[0]
+    
+    def engineer_feature_matrix(self, scenarios, context=None):
+        """Feature rows for many market_data/sentiment_data scenarios sharing one context.
+
+        Columns and values match engineer_features row by row; the historical context is
+        fetched once and the scenario-dependent features are computed as arrays.
+        """
+        context = context or self.get_feature_context()
+        n = len(scenarios)
+        markets = [scenario.get('market_data') or {} for scenario in scenarios]
+        sentiments = [scenario.get('sentiment_data') or {} for scenario in scenarios]
+
+        def column(rows, key, default):
+            return np.fromiter((_to_float(row.get(key, default)) for row in rows), np.float64, n)
+
+        market = {key: column(markets, key, default) for key, default in MARKET_DEFAULTS.items()}
+        sentiment = {key: column(sentiments, key, 0) for key in SENTIMENT_KEYS}
+        return pd.DataFrame(self._feature_array(market, sentiment, context, n), columns=FEATURE_SCHEMA.names)
+
+    def engineer_column_matrix(self, frame, context=None):
+        """engineer_feature_matrix for a flat training snapshot frame (market_<key>/sentiment_<key> columns).
+
+        The columns are used as arrays directly; a missing value is treated like an absent key.
+        """
+        context = context or self.get_feature_context()
+        n = len(frame)
+
+        def column(name, default):
+            if name not in frame:
+                return np.full(n, float(default))
+            return frame[name].astype(np.float64).fillna(default).to_numpy()
+
+        market = {key: column(f'market_{key}', default) for key, default in MARKET_DEFAULTS.items()}
+        sentiment = {key: column(f'sentiment_{key}', 0) for key in SENTIMENT_KEYS}
+        return pd.DataFrame(self._feature_array(market, sentiment, context, n), columns=FEATURE_SCHEMA.names)
+
+    def _training_features(self, data):
+        """Feature matrix for training rows, from flat snapshot columns or market_data/sentiment_data dicts"""
+        context = self.get_feature_context()
+        if 'market_data' in data:
+            return self.engineer_feature_matrix(data[['market_data', 'sentiment_data']].to_dict('records'), context)
+        return self.engineer_column_matrix(data, context)
+    
+    def _feature_array(self, market, sentiment, context, n):
+        """(n, features) array filled by schema index; market and sentiment values may be scalars or arrays"""
+        index = FEATURE_SCHEMA.index
+        X = FEATURE_SCHEMA.empty(n)
+        
+        # Scenario-independent features from the historical context; anything a fetch did not
+        # return keeps its default
+        for group in CONTEXT_GROUPS:
+            for name, value in (context.get(group) or {}).items():
+                if name in index:
+                    X[:, index[name]] = _to_float(value)
+        
+        # Basic market features
+        X[:, index['spy_price']] = market['spy']
+        X[:, index['vix']] = market['vix']
+        X[:, index['dxy']] = market['dxy']
+        X[:, index['ten_year']] = market['ten_year']
+        
+        # Sentiment features
+        X[:, index['reddit_sentiment']] = sentiment['reddit']
+        X[:, index['news_sentiment']] = sentiment['news']
+        X[:, index['twitter_sentiment']] = sentiment['twitter']
+        avg_sentiment = (sentiment['reddit'] + sentiment['news'] + sentiment['twitter']) / 3
+        X[:, index['avg_sentiment']] = avg_sentiment
+        
+        # Interaction features (key insight from the PDF)
+        volatility = (context.get('technical') or {}).get('volatility_20d', 1)
+        X[:, index['vix_yield_interaction']] = market['vix'] * market['ten_year']
+        X[:, index['sentiment_volatility_interaction']] = avg_sentiment * _to_float(volatility)
+        X[:, index['dxy_vix_interaction']] = market['dxy'] * market['vix']
+        
+        # Missing or unparseable values fall back to the schema defaults
+        missing = np.isnan(X)
+        if missing.any():
+            X[missing] = np.broadcast_to(FEATURE_SCHEMA.defaults, X.shape)[missing]
+        return X
+    
+    def build_feature_context(self, lookback_days=252):
+        """Scenario-independent features: SPY technicals, sectors, FRED, breadth and options"""
+        history, fred_features = self._fetch_feature_data(self._feature_data_plan(lookback_days))
+        return {
+            'technical': self._get_technical_features(history['SPY']),
+            'sector': self._get_sector_performance(history),
+            'economic': fred_features,
+            'breadth': self._get_market_breadth(history),
+            'options': self._get_options_features(history)
+        }
+    
+    def _feature_data_plan(self, lookback_days):
+        """Calendar days of daily bars needed per symbol, one entry per symbol.
+
+        SPY serves both the technicals and the breadth ratio, so it is fetched once over the
+        longest window; everything else needs a few weeks at most and is sliced locally.
+        """
+        plan = {'SPY': int(lookback_days * 365 / 252) + 10, 'IWM': 40, '^VIX': 14, '^VIX9D': 14}
+        for sector in FEATURE_SECTORS:
+            plan[sector] = 14
+        return plan
+    
+    def _fetch_feature_data(self, plan):
+        """Daily bars for every planned symbol plus the FRED features, fetched concurrently"""
+        with ThreadPoolExecutor(max_workers=min(FEATURE_FETCH_WORKERS, len(plan) + 1),
+                                thread_name_prefix='feature-fetch') as pool:
+            fred = pool.submit(self._get_fred_features)
+            futures = {symbol: pool.submit(self._get_historical_data, symbol, days) for symbol, days in plan.items()}
+            history = {symbol: future.result() for symbol, future in futures.items()}
+            return history, fred.result()
+    
+    def _get_technical_features(self, spy_data):
+        """RSI, moving averages, volatility, volume, momentum and Bollinger position of SPY"""
+        technical = {}
+        if len(spy_data) > 20:
+            # RSI
+            technical['rsi_14'] = self._calculate_rsi(spy_data['Close'], 14)
+            technical['rsi_30'] = self._calculate_rsi(spy_data['Close'], 30)
+            
+            # Moving averages
+            technical['sma_20'] = spy_data['Close'].rolling(20).mean().iloc[-1]
+            technical['sma_50'] = spy_data['Close'].rolling(50).mean().iloc[-1]
+            technical['sma_200'] = spy_data['Close'].rolling(200).mean().iloc[-1]
+            
+            # Price position relative to MAs
+            current_price = spy_data['Close'].iloc[-1]
+            technical['price_vs_sma20'] = (current_price - technical['sma_20']) / technical['sma_20']
+            technical['price_vs_sma50'] = (current_price - technical['sma_50']) / technical['sma_50']
+            technical['price_vs_sma200'] = (current_price - technical['sma_200']) / technical['sma_200']
+            
+            # Volatility features (latest annualized value of the rolling window)
+            technical['volatility_20d'] = spy_data['Close'].pct_change().rolling(20).std().iloc[-1] * np.sqrt(252)
+            technical['volatility_60d'] = spy_data['Close'].pct_change().rolling(60).std().iloc[-1] * np.sqrt(252)
+            
+            # Volume analysis
+            if 'Volume' in spy_data.columns:
+                technical['volume_ratio'] = spy_data['Volume'].iloc[-1] / spy_data['Volume'].rolling(20).mean().iloc[-1]
+                technical['volume_trend'] = spy_data['Volume'].rolling(5).mean().iloc[-1] / spy_data['Volume'].rolling(20).mean().iloc[-1]
+            
+            # Momentum indicators
+            technical['momentum_1d'] = spy_data['Close'].pct_change(1).iloc[-1]
+            technical['momentum_5d'] = spy_data['Close'].pct_change(5).iloc[-1]
+            technical['momentum_20d'] = spy_data['Close'].pct_change(20).iloc[-1]
+            
+            # Bollinger Bands
+            bb_middle = spy_data['Close'].rolling(20).mean()
+            bb_std = spy_data['Close'].rolling(20).std()
+            bb_upper = bb_middle + (bb_std * 2)
+            bb_lower = bb_middle - (bb_std * 2)
+            technical['bb_position'] = (current_price - bb_lower.iloc[-1]) / (bb_upper.iloc[-1] - bb_lower.iloc[-1])
+        return technical
+    
+    def get_feature_context(self, max_age=None):
+        """Feature context reused across calls until it is max_age seconds old.
+
+        The context the monitoring cycle published to shared memory is used while it is
+        fresh enough, so only this process's own fallback ever downloads history.
+        """
+        max_age = FEATURE_CONTEXT_TTL if max_age is None else max_age
+        snapshot = self.shared_context.attach()
+        if snapshot is not None and snapshot.age() <= max_age:
+            return snapshot.context
+        with self._context_lock:
+            if self._context is None or time.monotonic() - self._context_built > max_age:
+                self._context = self.build_feature_context()
+                self._context_built = time.monotonic()
+            return self._context
     
     def _calculate_rsi(self, prices, period=14):
         """Calculate RSI indicator"""
@@ -151,25 +296,14 @@ class MLRiskScorer:
             logging.error(f"Error getting historical data for {symbol}: {e}")
             return pd.DataFrame()
     
-    def _get_sector_performance(self):
-        """Get sector ETF performance"""
-        try:
-            sectors = ['XLF', 'XLK', 'XLV', 'XLE', 'XLI', 'XLU', 'XLB', 'XLRE', 'XLP', 'XLY']
-            sector_features = {}
-            
-            for sector in sectors[:5]:  # Limit to avoid API limits
-                try:
-                    ticker = yf.Ticker(sector)
-                    hist = ticker.history(period='5d')
-                    if not hist.empty:
-                        sector_features[f'{sector.lower()}_5d_return'] = hist['Close'].pct_change(4).iloc[-1]
-                except:
-                    sector_features[f'{sector.lower()}_5d_return'] = 0
-            
-            return sector_features
-        except Exception as e:
-            logging.error(f"Error getting sector performance: {e}")
-            return {}
+    def _get_sector_performance(self, history):
+        """5-day return of each sector ETF"""
+        sector_features = {}
+        for sector in FEATURE_SECTORS:
+            closes = history[sector]['Close'].tail(5) if 'Close' in history[sector] else pd.Series(dtype=float)
+            if len(closes) == 5:
+                sector_features[f'{sector.lower()}_5d_return'] = closes.iloc[-1] / closes.iloc[0] - 1
+        return sector_features
     
     def _get_fred_features(self):
         """Get economic indicators from FRED API"""
@@ -215,15 +349,15 @@ class MLRiskScorer:
                 'real_gdp_growth': 2.0
             }
     
-    def _get_market_breadth(self):
+    def _get_market_breadth(self, history):
         """Calculate market breadth indicators"""
         try:
             # Use free market breadth approximation
             breadth_features = {}
             
-            # Get Russell 2000 vs S&P 500 ratio (small cap vs large cap)
-            spy_data = yf.Ticker('SPY').history(period='20d')
-            iwm_data = yf.Ticker('IWM').history(period='20d')
+            # Russell 2000 vs S&P 500 20-day returns (small cap vs large cap)
+            spy_data = history['SPY'].tail(20)
+            iwm_data = history['IWM'].tail(20)
             
             if not spy_data.empty and not iwm_data.empty:
                 spy_return = spy_data['Close'].pct_change(19).iloc[-1]
@@ -238,14 +372,14 @@ class MLRiskScorer:
             logging.error(f"Error calculating market breadth: {e}")
             return {'small_large_ratio': 1}
     
-    def _get_options_features(self):
+    def _get_options_features(self, history):
         """Get options market indicators"""
         try:
             options_features = {}
             
             # VIX term structure (free from CBOE)
-            vix_data = yf.Ticker('^VIX').history(period='5d')
-            vix9d_data = yf.Ticker('^VIX9D').history(period='5d')
+            vix_data = history['^VIX']
+            vix9d_data = history['^VIX9D']
             
             if not vix_data.empty:
                 current_vix = vix_data['Close'].iloc[-1]
@@ -266,8 +400,12 @@ class MLRiskScorer:
             logging.error(f"Error getting options features: {e}")
             return {'vix_level': 20, 'vix_term_structure': 1}
     
-    def train_models(self, training_data, retrain=False):
-        """Train all ML models with comprehensive feature engineering"""
+    def train_models(self, training_data, retrain=False, progress_callback=None):
+        """Train all ML models with comprehensive feature engineering.
+
+        progress_callback, if given, is called as progress_callback(fraction, message)
+        after feature engineering and after each model is fitted.
+        """
         try:
             logging.info("Starting ML model training with advanced features...")
             
@@ -275,28 +413,16 @@ class MLRiskScorer:
                 logging.warning("Insufficient training data, using synthetic data generation")
                 training_data = self._generate_synthetic_training_data()
             
-            # Prepare features and targets
-            X = []
-            y_crash_1d, y_crash_3d, y_crash_7d, y_crash_14d, y_crash_30d = [], [], [], [], []
-            y_risk_score, y_sentiment = [], []
+            # Prepare features in one pass over all rows, sharing one historical context;
+            # targets come from the data's own label columns when it has them
+            feature_matrix = self._training_features(training_data)
+            X = feature_matrix.to_numpy()
+            feature_names = feature_matrix.columns.tolist()
+            self.feature_names = feature_names
+            targets = self._build_targets(training_data)
             
-            for i, row in training_data.iterrows():
-                # Engineer features for this data point
-                features = self.engineer_features(row.get('market_data', {}), row.get('sentiment_data', {}))
-                X.append(features.values)
-                
-                # Create target variables
-                y_crash_1d.append(self._calculate_crash_probability(row, 1))
-                y_crash_3d.append(self._calculate_crash_probability(row, 3))
-                y_crash_7d.append(self._calculate_crash_probability(row, 7))
-                y_crash_14d.append(self._calculate_crash_probability(row, 14))
-                y_crash_30d.append(self._calculate_crash_probability(row, 30))
-                
-                y_risk_score.append(row.get('risk_score', 50))
-                y_sentiment.append(row.get('market_direction', 0))
-            
-            X = np.array(X)
-            feature_names = features.index.tolist()
+            if progress_callback:
+                progress_callback(0.1, f"Engineered features for {len(X)} samples")
             
             # Scale features
             scaler = RobustScaler()  # More robust to outliers than StandardScaler
@@ -305,18 +431,27 @@ class MLRiskScorer:
             
             # Train models for each prediction horizon
             models_to_train = {
-                'crash_predictor_1d': y_crash_1d,
-                'crash_predictor_3d': y_crash_3d,
-                'crash_predictor_7d': y_crash_7d,
-                'crash_predictor_14d': y_crash_14d,
-                'crash_predictor_30d': y_crash_30d,
-                'risk_scorer': y_risk_score,
-                'sentiment_analyzer': y_sentiment
+                'crash_predictor_1d': targets['crash_1d'],
+                'crash_predictor_3d': targets['crash_3d'],
+                'crash_predictor_7d': targets['crash_7d'],
+                'crash_predictor_14d': targets['crash_14d'],
+                'crash_predictor_30d': targets['crash_30d'],
+                'risk_scorer': targets['risk_score'],
+                'sentiment_analyzer': targets['market_direction']
             }
             
-            for model_name, y_target in models_to_train.items():
+            for model_index, (model_name, y_target) in enumerate(models_to_train.items()):
                 logging.info(f"Training {model_name}...")
                 
+                # Rows whose horizon has not played out yet have no label
+                labelled = ~np.isnan(y_target)
+                X_target, y_target = X_scaled[labelled], y_target[labelled]
+                if len(y_target) < 50:
+                    logging.warning(f"Skipping {model_name}: only {len(y_target)} labelled rows")
+                    if progress_callback:
+                        progress_callback(0.1 + 0.9 * (model_index + 1) / len(models_to_train), f"Skipped {model_name}")
+                    continue
+                
                 # Try multiple algorithms and select best
                 algorithms = [
                     ('RandomForest', RandomForestRegressor(n_estimators=100, random_state=42, max_depth=10)),
@@ -333,7 +468,7 @@ class MLRiskScorer:
                 
                 for algo_name, algorithm in algorithms:
                     try:
-                        scores = cross_val_score(algorithm, X_scaled, y_target, cv=tscv, scoring='r2')
+                        scores = cross_val_score(algorithm, X_target, y_target, cv=tscv, scoring='r2')
                         avg_score = np.mean(scores)
                         
                         if avg_score > best_score:
@@ -347,7 +482,7 @@ class MLRiskScorer:
                 
                 if best_model is not None:
                     # Train final model on all data
-                    best_model.fit(X_scaled, y_target)
+                    best_model.fit(X_target, y_target)
                     self.models[model_name] = best_model
                     
                     # Calculate feature importance
@@ -365,6 +500,18 @@ class MLRiskScorer:
                     logging.info(f"{model_name} trained successfully with {best_algorithm} (R² = {best_score:.3f})")
                 else:
                     logging.error(f"Failed to train {model_name}")
+                
+                if progress_callback:
+                    progress_callback(0.1 + 0.9 * (model_index + 1) / len(models_to_train), f"Trained {model_name}")
+            
+            self._compile_models()
+            self._build_explainers()
+            self.training_state = {'full_fit_at': datetime.utcnow().isoformat(), 'online_updates': 0,
+                                   'data_through_id': self._max_row_id(training_data)}
+            
+            # Start the online replay window from the rows this fit saw
+            self.replay = ReplayBuffer().clear(len(feature_names))
+            self.replay.append(self._row_ids(training_data), X, targets)
             
             # Save models
             self._save_models()
@@ -376,21 +523,31 @@ class MLRiskScorer:
             logging.error(f"Error training ML models: {e}")
             return False
     
-    def _calculate_crash_probability(self, row, days_ahead):
-        """Calculate crash probability for given time horizon"""
-        # Simplified crash probability based on risk components
-        vix = row.get('market_data', {}).get('vix', 20)
-        sentiment = row.get('sentiment_data', {}).get('reddit', 0)
-        
-        # Higher VIX and negative sentiment increase crash probability
-        base_prob = min(0.9, max(0.1, (vix - 10) / 50))
-        sentiment_adj = max(-0.3, min(0.3, sentiment * -10))  # Negative sentiment increases risk
-        
-        # Adjust for time horizon (longer periods have higher probability)
-        time_factor = min(2.0, 1 + (days_ahead - 1) * 0.1)
-        
-        crash_prob = min(0.95, max(0.05, (base_prob + sentiment_adj) * time_factor))
-        return crash_prob
+    def _build_targets(self, training_data):
+        """Target arrays for every model, computed for all rows at once.
+
+        Crash targets are the realized forward-drawdown labels from services.training_targets
+        when the data carries them, and the VIX/sentiment heuristic otherwise (synthetic data
+        has no price history to look ahead in).
+        """
+        n = len(training_data)
+        crash_columns = [f'crash_{h}d' for h in HORIZONS]
+        if all(column in training_data for column in crash_columns):
+            targets = {column: training_data[column].to_numpy(dtype=np.float64) for column in crash_columns}
+        else:
+            if 'market_data' in training_data:
+                vix = [(m or {}).get('vix', 20) for m in training_data['market_data']]
+                reddit = [(s or {}).get('reddit', 0) for s in training_data.get('sentiment_data', [{}] * n)]
+            else:
+                vix = training_data.get('market_vix', pd.Series(20.0, index=training_data.index)).fillna(20.0)
+                reddit = training_data.get('sentiment_reddit', pd.Series(0.0, index=training_data.index)).fillna(0.0)
+            heuristic = heuristic_crash_targets(np.array(vix, dtype=np.float64), np.array(reddit, dtype=np.float64))
+            targets = {column: heuristic[column].to_numpy() for column in crash_columns}
+
+        for column, default in (('risk_score', 50.0), ('market_direction', 0.0)):
+            values = training_data[column] if column in training_data else pd.Series(default, index=training_data.index)
+            targets[column] = values.to_numpy(dtype=np.float64)
+        return targets
     
     def _generate_synthetic_training_data(self, n_samples=1000):
         """Generate synthetic training data for initial model training"""
@@ -430,60 +587,97 @@ class MLRiskScorer:
         
         return pd.DataFrame(training_data)
     
-    def predict_market_risks(self, market_data, sentiment_data):
-        """Generate ML-based risk predictions"""
+    @instrumented('ml_inference')
+    def predict_market_risks(self, market_data, sentiment_data, features=None):
+        """Generate ML-based risk predictions; features, if given, is an engineer_features Series"""
         try:
-            # Engineer features
-            features = self.engineer_features(market_data, sentiment_data)
-            
             if 'features' not in self.scalers:
                 logging.warning("Models not trained yet, using fallback scoring")
                 return self._fallback_predictions(market_data, sentiment_data)
+            if not self.schema_matches():
+                logging.error("Trained models use a different feature layout, using fallback scoring until they are retrained")
+                return self._fallback_predictions(market_data, sentiment_data)
             
-            # Scale features
-            X = self.scalers['features'].transform([features.values])
+            # Engineer features, unless they were already built for this tick
+            x = self._as_vector(features)
+            if x is None:
+                x = self.engineer_vector(market_data, sentiment_data, context=self.get_feature_context())
             
             predictions = {}
             
-            # Generate predictions from each model
-            for model_name, model in self.models.items():
-                if model is not None:
-                    try:
-                        pred = model.predict(X)[0]
-                        predictions[model_name] = max(0, min(1 if 'crash' in model_name else 100, pred))
-                    except Exception as e:
-                        logging.error(f"Error predicting with {model_name}: {e}")
-                        predictions[model_name] = 0.5 if 'crash' in model_name else 50
-            
-            # Calculate composite risk score
-            crash_scores = [v for k, v in predictions.items() if 'crash' in k]
-            ml_risk_score = predictions.get('risk_scorer', 50)
-            
-            # Weight recent predictions more heavily
-            weighted_crash_prob = (
-                predictions.get('crash_predictor_1d', 0.5) * 0.4 +
-                predictions.get('crash_predictor_3d', 0.5) * 0.3 +
-                predictions.get('crash_predictor_7d', 0.5) * 0.2 +
-                predictions.get('crash_predictor_14d', 0.5) * 0.1
-            )
+            if self.compiled is not None:
+                # One pass through the compiled artifact instead of seven sklearn predict() calls
+                for model_name, pred in self.compiled.predict(x).items():
+                    predictions[model_name] = max(0, min(1 if 'crash' in model_name else 100, pred))
+            else:
+                # Scale features
+                X = self.scalers['features'].transform(x.reshape(1, -1))
+                
+                # Generate predictions from each model
+                for model_name, model in self.models.items():
+                    if model is not None:
+                        try:
+                            pred = model.predict(X)[0]
+                            predictions[model_name] = max(0, min(1 if 'crash' in model_name else 100, pred))
+                        except Exception as e:
+                            logging.error(f"Error predicting with {model_name}: {e}")
+                            predictions[model_name] = 0.5 if 'crash' in model_name else 50
             
             return {
-                'ml_risk_score': ml_risk_score,
-                'crash_probability_1d': predictions.get('crash_predictor_1d', 0.5),
-                'crash_probability_3d': predictions.get('crash_predictor_3d', 0.5),
-                'crash_probability_7d': predictions.get('crash_predictor_7d', 0.5),
-                'crash_probability_14d': predictions.get('crash_predictor_14d', 0.5),
-                'crash_probability_30d': predictions.get('crash_predictor_30d', 0.5),
-                'weighted_crash_probability': weighted_crash_prob,
-                'market_sentiment_prediction': predictions.get('sentiment_analyzer', 0),
-                'confidence_score': self._calculate_prediction_confidence(features),
-                'feature_contributions': self._get_feature_contributions(features, model_name='risk_scorer')
+                **self._summarize_predictions(predictions),
+                'confidence_score': self._calculate_prediction_confidence(x),
+                'feature_contributions': self._get_feature_contributions(x, model_name='risk_scorer')
             }
             
         except Exception as e:
             logging.error(f"Error in ML risk prediction: {e}")
             return self._fallback_predictions(market_data, sentiment_data)
     
+    def predict_batch(self, scenarios, context=None):
+        """Columnar predictions for many market_data/sentiment_data scenarios.
+
+        All rows share one feature context and go through the scaler and each model in a
+        single call; the result maps each prediction name to a list with one value per scenario.
+        """
+        if 'features' not in self.scalers:
+            logging.warning("Models not trained yet, using fallback scoring")
+            rows = [self._fallback_predictions(s.get('market_data') or {}, s.get('sentiment_data') or {})
+                    for s in scenarios]
+            return {key: [row[key] for row in rows] for key in rows[0] if key != 'feature_contributions'} if rows else {}
+        if not self.schema_matches():
+            raise FeatureSchemaError(f"Trained models do not use feature schema {FEATURE_SCHEMA.fingerprint}, retrain them")
+        
+        features = self.engineer_feature_matrix(scenarios, context)
+        X = features.to_numpy()
+        n = len(X)
+        
+        if self.compiled is not None:
+            raw = self.compiled.predict_batch(X)
+        else:
+            X_scaled = self.scalers['features'].transform(X)
+            raw = {name: model.predict(X_scaled) for name, model in self.models.items() if model is not None}
+        
+        predictions = {name: np.clip(values, 0, 1 if 'crash' in name else 100) for name, values in raw.items()}
+        summary = self._summarize_predictions(predictions)
+        summary['confidence_score'] = np.minimum(1.0, (X != 0).sum(axis=1) / X.shape[1]) if X.shape[1] else 0.5
+        return {key: np.broadcast_to(np.asarray(value, dtype=np.float64), n).tolist() for key, value in summary.items()}
+    
+    def _summarize_predictions(self, predictions):
+        """Named outputs from per-model predictions (scalars or arrays)"""
+        # Weight recent predictions more heavily
+        weighted_crash_prob = sum(predictions.get(name, 0.5) * weight for name, weight in CRASH_WEIGHTS.items())
+        
+        return {
+            'ml_risk_score': predictions.get('risk_scorer', 50),
+            'crash_probability_1d': predictions.get('crash_predictor_1d', 0.5),
+            'crash_probability_3d': predictions.get('crash_predictor_3d', 0.5),
+            'crash_probability_7d': predictions.get('crash_predictor_7d', 0.5),
+            'crash_probability_14d': predictions.get('crash_predictor_14d', 0.5),
+            'crash_probability_30d': predictions.get('crash_predictor_30d', 0.5),
+            'weighted_crash_probability': weighted_crash_prob,
+            'market_sentiment_prediction': predictions.get('sentiment_analyzer', 0)
+        }
+    
     def _fallback_predictions(self, market_data, sentiment_data):
         """Fallback predictions when ML models aren't available"""
         vix = market_data.get('vix', 20)
@@ -506,62 +700,125 @@ class MLRiskScorer:
             'feature_contributions': {}
         }
     
-    def _calculate_prediction_confidence(self, features):
+    def _calculate_prediction_confidence(self, x):
         """Calculate confidence in predictions based on feature quality"""
         try:
             # Simple confidence calculation based on data completeness
-            non_zero_features = sum(1 for x in features.values if x != 0)
-            total_features = len(features)
-            return min(1.0, non_zero_features / total_features)
+            return min(1.0, np.count_nonzero(x) / len(x))
         except:
             return 0.5
     
-    def _get_feature_contributions(self, features, model_name):
+    def schema_matches(self):
+        """True if the loaded models were trained on the current FEATURE_SCHEMA"""
+        if self.feature_names is not None:
+            return FEATURE_SCHEMA.matches(self.feature_names)
+        scaler = self.scalers.get('features')
+        return getattr(scaler, 'n_features_in_', None) == len(FEATURE_SCHEMA)
+    
+    def _as_vector(self, features):
+        """Schema-ordered array from an engineer_features Series or vector, or None if it has another layout"""
+        if features is None:
+            return None
+        if isinstance(features, pd.Series):
+            if not FEATURE_SCHEMA.matches(features.index):
+                return None
+            features = features.to_numpy()
+        x = np.asarray(features, dtype=np.float64)
+        return x if x.shape == (len(FEATURE_SCHEMA),) else None
+    
+    def explain(self, features, model_names=None):
+        """Per-prediction TreeSHAP attributions for a feature Series (or vector) from engineer_features.
+
+        Returns {model name: {'expected_value', 'contributions'}}; contributions plus the
+        expected value add up to the model's raw prediction.
+        """
+        if self.explainer is None or 'features' not in self.scalers:
+            return {}
+        x = self._as_vector(features)
+        if x is None or not FEATURE_SCHEMA.matches(self.explainer.feature_names):
+            logging.warning("Feature layout differs from the trained models, skipping explanations")
+            return {}
+        
+        x_scaled = self.scalers['features'].transform(x.reshape(1, -1))[0]
+        return self.explainer.explain(x_scaled, model_names)
+    
+    def _get_feature_contributions(self, x, model_name):
         """Get feature contributions to the prediction"""
         try:
+            explanation = self.explain(x, [model_name])
+            if model_name in explanation:
+                return explanation[model_name]['contributions']
+            
+            # Models without an explainer fall back to global importance times the feature value
             if model_name in self.feature_importance:
                 importance = self.feature_importance[model_name]
                 contributions = {}
-                for i, feature_name in enumerate(features.index):
+                for i, feature_name in enumerate(FEATURE_SCHEMA.names):
                     if feature_name in importance:
-                        contributions[feature_name] = importance[feature_name] * features.values[i]
+                        contributions[feature_name] = importance[feature_name] * x[i]
                 return contributions
             return {}
         except:
             return {}
     
-    def _save_models(self):
-        """Save trained models and scalers"""
+    def _compile_models(self):
+        """Build the NumPy inference artifact from the trained models and scaler"""
         try:
-            model_dir = 'models'
-            os.makedirs(model_dir, exist_ok=True)
-            
-            # Save models
-            for name, model in self.models.items():
-                if model is not None:
-                    joblib.dump(model, f'{model_dir}/{name}.pkl')
-            
-            # Save scalers
-            for name, scaler in self.scalers.items():
-                joblib.dump(scaler, f'{model_dir}/scaler_{name}.pkl')
-            
-            # Save metadata
-            metadata = {
-                'feature_importance': self.feature_importance,
-                'performance_metrics': self.performance_metrics,
-                'trained_at': datetime.now().isoformat()
-            }
-            joblib.dump(metadata, f'{model_dir}/metadata.pkl')
-            
-            logging.info("Models saved successfully")
-            
+            self.compiled = CompiledEnsemble.compile(self.models, self.scalers['features'])
+        except Exception as e:
+            logging.warning(f"Could not compile models, using sklearn predict: {e}")
+            self.compiled = None
+    
+    def _build_explainers(self):
+        """Precompute TreeSHAP path tables for the tree-based tick models"""
+        try:
+            self.explainer = ExplanationSet.build(self.models, self.feature_names)
         except Exception as e:
-            logging.error(f"Error saving models: {e}")
+            logging.warning(f"Could not build model explainers: {e}")
+            self.explainer = None
+    
+    def _save_models(self):
+        """Publish trained models and scalers as a new version in the model store.
+
+        Publish errors propagate, so train_models/update_models report failure instead of the
+        caller recording the previous artifact_version as the new model.
+        """
+        self.artifact_version = self.store.publish(self._write_models)
+    
+    def _write_models(self, model_dir):
+        # Save models
+        for name, model in self.models.items():
+            if model is not None:
+                joblib.dump(model, f'{model_dir}/{name}.pkl')
+        
+        # Save scalers
+        for name, scaler in self.scalers.items():
+            joblib.dump(scaler, f'{model_dir}/scaler_{name}.pkl')
+        
+        if self.compiled is not None:
+            self.compiled.save(f'{model_dir}/compiled.npz')
+        if self.explainer is not None:
+            self.explainer.save(f'{model_dir}/explainer.npz')
+        if self.replay is not None:
+            self.replay.save(f'{model_dir}/{REPLAY_BUFFER_FILE}')
+        
+        # Save metadata
+        metadata = {
+            'feature_importance': self.feature_importance,
+            'performance_metrics': self.performance_metrics,
+            'feature_names': self.feature_names,
+            'training_state': self.training_state,
+            'trained_at': datetime.now().isoformat()
+        }
+        joblib.dump(metadata, f'{model_dir}/metadata.pkl')
     
-    def load_models(self):
-        """Load trained models and scalers"""
+    def load_models(self, version=None):
+        """Load trained models and scalers from the current (or given) store version"""
         try:
-            model_dir = 'models'
+            # Resolved once, so every file comes from the same published version;
+            # models saved before the store existed sit directly in models/
+            version = version or self.store.current_version()
+            model_dir = self.store.version_dir(version) if version else 'models'
             
             # Load models
             for name in self.models.keys():
@@ -574,14 +831,30 @@ class MLRiskScorer:
             if os.path.exists(scaler_path):
                 self.scalers['features'] = joblib.load(scaler_path)
             
+            # Load the compiled artifact, or build it from models saved before it existed
+            compiled_path = f'{model_dir}/compiled.npz'
+            if os.path.exists(compiled_path):
+                self.compiled = CompiledEnsemble.load(compiled_path)
+                self.compiled.fallbacks = {name: model for name, model in self.models.items()
+                                           if model is not None and name not in self.compiled.predictors}
+            elif 'features' in self.scalers:
+                self._compile_models()
+            
+            explainer_path = f'{model_dir}/explainer.npz'
+            if os.path.exists(explainer_path):
+                self.explainer = ExplanationSet.load(explainer_path)
+            
             # Load metadata
             metadata_path = f'{model_dir}/metadata.pkl'
             if os.path.exists(metadata_path):
                 metadata = joblib.load(metadata_path)
                 self.feature_importance = metadata.get('feature_importance', {})
                 self.performance_metrics = metadata.get('performance_metrics', {})
+                self.feature_names = metadata.get('feature_names')
+                self.training_state = metadata.get('training_state', {})
             
-            logging.info("Models loaded successfully")
+            self.artifact_version = version
+            logging.info(f"Models loaded successfully (version {version or 'legacy'})")
             return True
             
         except Exception as e:
@@ -589,10 +862,93 @@ class MLRiskScorer:
             return False
     
     def retrain_models(self, new_data):
-        """Retrain models with new data"""
+        """Retrain models with new data: folded in incrementally once models exist"""
         logging.info("Starting model retraining...")
+        if 'features' not in self.scalers:
+            self.load_models()
+        if 'features' in self.scalers and self.feature_names and not self.needs_full_refit():
+            return self.update_models(new_data)
         return self.train_models(new_data, retrain=True)
     
+    def needs_full_refit(self, max_age_days=None):
+        """True when the last full fit is older than ML_FULL_REFIT_DAYS (or unknown)"""
+        max_age_days = FULL_REFIT_DAYS if max_age_days is None else max_age_days
+        full_fit_at = self.training_state.get('full_fit_at')
+        if not full_fit_at or not self.schema_matches():
+            return True
+        return datetime.utcnow() - datetime.fromisoformat(full_fit_at) > timedelta(days=max_age_days)
+    
+    def update_models(self, new_data, labels=None, progress_callback=None):
+        """Fold new observations into the trained models instead of refitting from scratch.
+
+        New rows join the rolling replay window saved with the loaded version; every model is then
+        updated on the labelled rows of that window with services.online_learning. labels, a
+        frame with an id column, refreshes targets of buffered rows whose horizon has since
+        played out. The scaler and feature layout stay fixed until the next full refit.
+        """
+        try:
+            if 'features' not in self.scalers:
+                self.load_models()
+            if 'features' not in self.scalers or not self.schema_matches():
+                logging.warning("No trained models in the current feature layout to update, running a full fit")
+                return self.train_models(new_data, progress_callback=progress_callback)
+            
+            start_time = time.perf_counter()
+            # The window belongs to the version being updated, so a rollback brings back its own
+            model_dir = self.store.version_dir(self.artifact_version) if self.artifact_version else None
+            replay = ReplayBuffer(os.path.join(model_dir, REPLAY_BUFFER_FILE) if model_dir else None)
+            replay.load(len(self.feature_names))
+            if len(new_data):
+                X_new = self._training_features(new_data).to_numpy()
+                replay.append(self._row_ids(new_data), X_new, self._build_targets(new_data))
+            replay.relabel(labels)
+            
+            X_scaled = self.scalers['features'].transform(replay.X)
+            targets = {'crash_predictor_1d': 'crash_1d', 'crash_predictor_3d': 'crash_3d', 'crash_predictor_7d': 'crash_7d',
+                       'crash_predictor_14d': 'crash_14d', 'crash_predictor_30d': 'crash_30d',
+                       'risk_scorer': 'risk_score', 'sentiment_analyzer': 'market_direction'}
+            
+            updated = {}
+            for model_index, (model_name, target) in enumerate(targets.items()):
+                model = self.models.get(model_name)
+                y = replay.targets.get(target)
+                if model is not None and y is not None:
+                    labelled = ~np.isnan(y)
+                    if labelled.sum() >= MIN_UPDATE_ROWS:
+                        action = update_estimator(model, X_scaled[labelled], y[labelled], random_state=model_index)
+                        if action:
+                            updated[model_name] = action
+                            self.performance_metrics.setdefault(model_name, {})['updated_at'] = datetime.now().isoformat()
+                if progress_callback:
+                    progress_callback(0.1 + 0.8 * (model_index + 1) / len(targets), f"Updated {model_name}")
+            
+            self.replay = replay
+            self._compile_models()
+            self._build_explainers()
+            self.training_state.update({
+                'updated_at': datetime.utcnow().isoformat(),
+                'online_updates': self.training_state.get('online_updates', 0) + 1,
+                'data_through_id': max(self.training_state.get('data_through_id') or 0, self._max_row_id(new_data))
+            })
+            self._save_models()
+            
+            logging.info(f"🔁 Online model update in {time.perf_counter() - start_time:.1f}s "
+                         f"({len(new_data)} new rows, {len(replay)} in window): {updated}")
+            return True
+            
+        except Exception as e:
+            logging.error(f"Error updating ML models: {e}")
+            return False
+    
+    def _row_ids(self, data):
+        if 'id' in data:
+            return data['id'].fillna(-1).to_numpy(dtype=np.int64)
+        return np.full(len(data), -1, dtype=np.int64)
+    
+    def _max_row_id(self, data):
+        ids = self._row_ids(data)
+        return int(ids.max()) if len(ids) and ids.max() >= 0 else None
+    
     def get_model_performance(self):
         """Get current model performance metrics"""
         return self.performance_metrics
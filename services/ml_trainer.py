@@ -7,6 +7,7 @@ from sklearn.metrics import accuracy_score, classification_report
 import joblib
 import logging
 from datetime import datetime, timedelta
+from services.online_learning import update_estimator
 
 class MLTrainer:
     def __init__(self):
@@ -110,20 +111,22 @@ class MLTrainer:
             return self._generate_training_data()
     
     def retrain_model(self, new_data):
-        """Retrain model with new data"""
+        """Retrain model with new data, growing the existing forest rather than replacing it"""
         try:
-            # Load existing model
+            # Prepare new data
+            X_new = np.asarray(new_data['features'])
+            y_new = np.asarray(new_data['labels'])
+            
+            # An existing model keeps its trees and gains new ones fitted on the new rows;
+            # without one, the new rows are all there is to fit on
+            action = None
             if os.path.exists(self.model_path):
                 model = joblib.load(self.model_path)
+                action = update_estimator(model, X_new, y_new, random_state=42)
             else:
                 model = RandomForestClassifier(n_estimators=100, random_state=42)
-            
-            # Prepare new data
-            X_new = new_data['features']
-            y_new = new_data['labels']
-            
-            # Retrain model
-            model.fit(X_new, y_new)
+            if action is None:
+                model.fit(X_new, y_new)
             
             # Save updated model
             joblib.dump(model, self.model_path)
@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+from datetime import datetime
+
+# Published versions kept on disk besides the current one
+MODEL_VERSIONS_KEEP = int(os.getenv('MODEL_VERSIONS_KEEP', '5'))
+
+# Staging directories older than this are left over from a crashed publish
+STALE_STAGING_SECONDS = 3600
+
+
+class ModelStore:
+    """Versioned, immutable directories of model artifacts with an atomically swapped pointer.
+
+    publish() has a writer fill a private staging directory, hashes and fsyncs every file,
+    renames the directory to versions/<timestamp>-<content hash> and only then replaces
+    current.json, so a reader resolving the current version sees either the old set of
+    files or the new one, never a mix. Versions are never modified after publishing:
+    rolling back is activate() of an older version, and gc() removes all but the newest few.
+    """
+
+    def __init__(self, root='models', keep=None):
+        self.root = root
+        self.keep = MODEL_VERSIONS_KEEP if keep is None else keep
+        self.versions_dir = os.path.join(root, 'versions')
+        self.pointer_path = os.path.join(root, 'current.json')
+
+    def current(self):
+        """Pointer to the published version ({'version', 'digest', 'published_at'}), or None"""
+        try:
+            with open(self.pointer_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def current_version(self):
+        pointer = self.current()
+        return pointer['version'] if pointer else None
+
+    def version_dir(self, version=None):
+        """Directory of a version (the current one by default), or None if nothing is published"""
+        version = version or self.current_version()
+        return os.path.join(self.versions_dir, version) if version else None
+
+    def versions(self):
+        """Published versions, oldest first"""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(name for name in os.listdir(self.versions_dir) if not name.startswith('.'))
+
+    def publish(self, write):
+        """Call write(directory) to produce a new version, then make it current; returns its id"""
+        os.makedirs(self.versions_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=self.versions_dir)
+        try:
+            write(staging)
+            files = {name: _file_digest(os.path.join(staging, name)) for name in sorted(os.listdir(staging))}
+            digest = hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()
+
+            # Identical content is already published under an existing version
+            for version in self.versions():
+                if version.endswith(f'-{digest[:12]}'):
+                    shutil.rmtree(staging)
+                    self._point_to(version, digest)
+                    return version
+
+            with open(os.path.join(staging, 'MANIFEST.json'), 'w') as f:
+                json.dump({'digest': digest, 'files': files}, f, indent=2)
+            for name in os.listdir(staging):
+                _fsync_file(os.path.join(staging, name))
+            _fsync_dir(staging)
+
+            version = f"{datetime.utcnow():%Y%m%d%H%M%S%f}-{digest[:12]}"
+            os.rename(staging, os.path.join(self.versions_dir, version))
+            _fsync_dir(self.versions_dir)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self._point_to(version, digest)
+        logging.info(f"📦 Published model version {version}")
+        self.gc()
+        return version
+
+    def activate(self, version):
+        """Point current.json at an already published version (rollback)"""
+        if not self.verify(version):
+            raise ValueError(f"Model version {version} is missing or corrupted")
+        with open(os.path.join(self.version_dir(version), 'MANIFEST.json')) as f:
+            self._point_to(version, json.load(f)['digest'])
+
+    def verify(self, version):
+        """True if every file of the version still matches the hash recorded at publish time"""
+        directory = self.version_dir(version)
+        try:
+            with open(os.path.join(directory, 'MANIFEST.json')) as f:
+                files = json.load(f)['files']
+            return all(_file_digest(os.path.join(directory, name)) == digest for name, digest in files.items())
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def gc(self):
+        """Remove old versions beyond keep, never the current one, and abandoned staging dirs"""
+        current = self.current_version()
+        removable = [v for v in self.versions() if v != current]
+        for version in removable[:max(0, len(removable) - self.keep)]:
+            shutil.rmtree(os.path.join(self.versions_dir, version), ignore_errors=True)
+
+        now = time.time()
+        for name in os.listdir(self.versions_dir):
+            path = os.path.join(self.versions_dir, name)
+            if name.startswith('.staging-') and now - os.path.getmtime(path) > STALE_STAGING_SECONDS:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _point_to(self, version, digest):
+        pointer = {'version': version, 'digest': digest, 'published_at': datetime.utcnow().isoformat()}
+        tmp_path = f'{self.pointer_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(pointer, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.pointer_path)
+        _fsync_dir(self.root)
+
+
+def _file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _fsync_file(path):
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+
+
+def _fsync_dir(path):
+    # Directory fsync makes renames durable; not every platform allows opening a directory
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
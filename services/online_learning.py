@@ -0,0 +1,133 @@
+import os
+import logging
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier, GradientBoostingRegressor
+
+# Trees (or boosting stages) added per incremental update, and the cap on forest size
+ONLINE_TREES_PER_UPDATE = int(os.getenv('ONLINE_TREES_PER_UPDATE', '10'))
+ONLINE_MAX_TREES = int(os.getenv('ONLINE_MAX_TREES', '200'))
+ONLINE_MAX_STAGES = int(os.getenv('ONLINE_MAX_STAGES', '300'))
+
+# Passes over the replay window for partial_fit models
+ONLINE_EPOCHS = int(os.getenv('ONLINE_EPOCHS', '3'))
+
+# Fewer labelled rows than this and a model is left as it is
+MIN_UPDATE_ROWS = 20
+
+
+class ReplayBuffer:
+    """Rolling window of recent feature rows and targets, persisted between updates.
+
+    Rows keep their RiskScore id when they have one, so targets can be refreshed from a newer
+    label matrix: forward-looking labels only resolve once their horizon has passed, and a
+    row seen today gets its 7-day label in a later update.
+    """
+
+    def __init__(self, path=None, max_rows=None):
+        self.path = path
+        self.max_rows = max_rows or int(os.getenv('REPLAY_BUFFER_ROWS', '20000'))
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.X = None
+        self.targets = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def load(self, n_features):
+        """Read the saved window; a window with a different feature layout is discarded"""
+        if self.path and os.path.exists(self.path):
+            with np.load(self.path, allow_pickle=False) as data:
+                if data['X'].shape[1] == n_features:
+                    self.ids = data['ids']
+                    self.X = data['X']
+                    self.targets = {key[len('target_'):]: data[key] for key in data.files if key.startswith('target_')}
+                    return self
+                logging.info("Replay buffer has a different feature layout, starting a new one")
+        return self.clear(n_features)
+
+    def clear(self, n_features):
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.X = np.zeros((0, n_features))
+        self.targets = {}
+        return self
+
+    def append(self, ids, X, targets):
+        """Add rows, replacing any with the same id, and keep only the newest max_rows"""
+        X = np.asarray(X, dtype=np.float64)
+        ids = np.asarray(ids, dtype=np.int64)
+        keep = ~np.isin(self.ids, ids[ids >= 0])
+        self.ids = np.concatenate([self.ids[keep], ids])[-self.max_rows:]
+        self.X = np.concatenate([self.X[keep], X])[-self.max_rows:]
+        names = set(self.targets) | set(targets)
+        self.targets = {
+            name: np.concatenate([
+                self.targets.get(name, np.full(int(keep.size), np.nan))[keep],
+                np.asarray(targets.get(name, np.full(len(ids), np.nan)), dtype=np.float64)
+            ])[-self.max_rows:]
+            for name in names
+        }
+
+    def relabel(self, labels):
+        """Refresh targets of buffered rows from a label frame with an id column"""
+        if labels is None or not len(labels) or not len(self.ids):
+            return
+        indexed = labels.set_index('id')
+        present = np.isin(self.ids, indexed.index.to_numpy())
+        for name in indexed.columns:
+            if name in self.targets:
+                fresh = indexed[name].reindex(self.ids[present]).to_numpy(dtype=np.float64)
+                current = self.targets[name][present]
+                self.targets[name][present] = np.where(np.isnan(fresh), current, fresh)
+
+    def save(self, path=None):
+        """Write the window to path (the path it was loaded from by default)"""
+        path = path or self.path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        arrays = {'ids': self.ids, 'X': self.X, **{f'target_{k}': v for k, v in self.targets.items()}}
+        with open(f'{path}.tmp', 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(f'{path}.tmp', path)
+
+
+def update_estimator(model, X, y, random_state=None):
+    """Fold rows into a fitted estimator without discarding what it has learned.
+
+    Forests grow ONLINE_TREES_PER_UPDATE trees on the rows and drop their oldest trees beyond
+    ONLINE_MAX_TREES. Each update reseeds the forest from random_state and a count of the
+    trees it has ever grown (online_trees_grown_, kept on the model), since warm_start seeds
+    trees by position and a trimmed forest would otherwise regrow the same seeds. Gradient boosting adds stages fitted to its residuals on the rows, up to
+    ONLINE_MAX_STAGES; anything with partial_fit (MLP, SGD) takes ONLINE_EPOCHS passes.
+    Returns a short description of what was done, or None if the model cannot be updated.
+    """
+    rng = np.random.default_rng(random_state)
+
+    if isinstance(model, (RandomForestRegressor, RandomForestClassifier)):
+        if isinstance(model, RandomForestClassifier) and set(np.unique(y)) != set(model.classes_):
+            return None  # New trees must see every class the forest already predicts
+        grown_total = getattr(model, 'online_trees_grown_', len(model.estimators_))
+        seed = int(np.random.default_rng([random_state or 0, grown_total]).integers(2 ** 31 - 1))
+        grown = len(model.estimators_) + ONLINE_TREES_PER_UPDATE
+        model.set_params(warm_start=True, n_estimators=grown, random_state=seed)
+        model.fit(X, y)
+        model.online_trees_grown_ = grown_total + ONLINE_TREES_PER_UPDATE
+        if len(model.estimators_) > ONLINE_MAX_TREES:
+            model.estimators_ = model.estimators_[-ONLINE_MAX_TREES:]
+            model.set_params(n_estimators=ONLINE_MAX_TREES)
+        return f"{ONLINE_TREES_PER_UPDATE} trees added ({len(model.estimators_)} total)"
+
+    if isinstance(model, GradientBoostingRegressor):
+        stages = model.n_estimators_
+        if stages >= ONLINE_MAX_STAGES:
+            return None
+        model.set_params(warm_start=True, n_estimators=min(ONLINE_MAX_STAGES, stages + ONLINE_TREES_PER_UPDATE))
+        model.fit(X, y)
+        return f"{model.n_estimators_ - stages} boosting stages added ({model.n_estimators_} total)"
+
+    if hasattr(model, 'partial_fit'):
+        for _ in range(ONLINE_EPOCHS):
+            order = rng.permutation(len(X))
+            model.partial_fit(X[order], y[order])
+        return f"{ONLINE_EPOCHS} partial_fit epochs"
+
+    return None
@@ -0,0 +1,163 @@
+import os
+import time
+import threading
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+# Seconds a chain snapshot (and the expiry list) is reused before it is fetched again
+OPTIONS_CHAIN_TTL = int(os.getenv('OPTIONS_CHAIN_TTL', '300'))
+OPTIONS_EXPIRATIONS_TTL = int(os.getenv('OPTIONS_EXPIRATIONS_TTL', '3600'))
+
+# Nearest expiries included in the analytics
+OPTIONS_EXPIRIES = int(os.getenv('OPTIONS_EXPIRIES', '4'))
+
+# Strike / spot ranges whose mean implied volatility is reported, per side
+MONEYNESS_BUCKETS = {
+    'put_80_90': (0.80, 0.90, True),
+    'put_90_95': (0.90, 0.95, True),
+    'atm': (0.98, 1.02, None),
+    'call_105_110': (1.05, 1.10, False),
+    'call_110_120': (1.10, 1.20, False)
+}
+
+CHAIN_COLUMNS = ('strike', 'volume', 'openInterest', 'impliedVolatility')
+
+
+class OptionsChainCache:
+    """Option chain snapshots for the nearest expiries of one underlying, refreshed per expiry on a TTL.
+
+    The monitoring cycle asks for the chains every minute, but volumes and implied vols move
+    slowly enough that a few minutes' old snapshot serves the same signals; each expiry is
+    only fetched again once its snapshot has expired. Shared by every DataCollector in the
+    process.
+    """
+
+    def __init__(self, symbol='SPY', ttl=None, expiries=None, ticker_factory=None):
+        self.symbol = symbol
+        self.ttl = OPTIONS_CHAIN_TTL if ttl is None else ttl
+        self.expiries = expiries or OPTIONS_EXPIRIES
+        self.ticker_factory = ticker_factory
+        self._expirations = (None, ())
+        self._chains = {}  # expiry -> (fetched at, frame)
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        """One frame of the nearest expiries' puts and calls with expiry and is_put columns"""
+        with self._lock:
+            ticker = None
+            now = time.monotonic()
+            if self._expirations[0] is None or now - self._expirations[0] > OPTIONS_EXPIRATIONS_TTL:
+                ticker = self._ticker()
+                self._expirations = (now, tuple(ticker.options or ()))
+            expirations = self._expirations[1][:self.expiries]
+
+            frames = []
+            for expiry in expirations:
+                fetched_at, frame = self._chains.get(expiry, (None, None))
+                if frame is None or now - fetched_at > self.ttl:
+                    ticker = ticker or self._ticker()
+                    frame = _chain_frame(ticker.option_chain(expiry), expiry)
+                    self._chains[expiry] = (now, frame)
+                frames.append(frame)
+
+            # Expired contracts drop out of the cache with the expiry list
+            for expiry in set(self._chains) - set(expirations):
+                del self._chains[expiry]
+
+        if not frames:
+            return pd.DataFrame(columns=list(CHAIN_COLUMNS) + ['expiry', 'is_put'])
+        return pd.concat(frames, ignore_index=True)
+
+    def _ticker(self):
+        # Looked up per call so patched yfinance.Ticker (benchmarks, tests) is honoured
+        return (self.ticker_factory or yf.Ticker)(self.symbol)
+
+    def clear(self):
+        with self._lock:
+            self._expirations = (None, ())
+            self._chains = {}
+
+
+def _chain_frame(chain, expiry):
+    frames = []
+    for side, is_put in ((chain.calls, False), (chain.puts, True)):
+        frame = pd.DataFrame({column: pd.to_numeric(side[column], errors='coerce') if column in side else np.nan
+                              for column in CHAIN_COLUMNS}, index=range(len(side)))
+        frame['expiry'] = expiry
+        frame['is_put'] = is_put
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def analyze_chain(chain, spot):
+    """Put/call ratios, skew, moneyness-bucket IVs and ATM term structure in one pass.
+
+    chain is an OptionsChainCache snapshot, spot the underlying's latest price. put_call_ratio
+    and skew keep their original definitions on the front expiry (put over call volume; mean
+    IV of puts below 95% of spot minus calls above 105%); the other ratios span every cached
+    expiry. Values that cannot be computed are None.
+    """
+    if chain.empty:
+        return {}
+
+    # Codes in snapshot order, nearest expiry first
+    code, expiries = pd.factorize(chain['expiry'])
+    n_expiries = len(expiries)
+    is_put = chain['is_put'].to_numpy(dtype=bool)
+    volume = np.nan_to_num(chain['volume'].to_numpy(dtype=np.float64))
+    open_interest = np.nan_to_num(chain['openInterest'].to_numpy(dtype=np.float64))
+    iv = chain['impliedVolatility'].to_numpy(dtype=np.float64)
+    valid_iv = np.isfinite(iv)
+
+    def per_expiry(mask, values=None):
+        """Sum of values (or count) where mask holds, for each expiry"""
+        weights = mask.astype(np.float64) if values is None else np.where(mask, values, 0.0)
+        return np.bincount(code, weights=weights, minlength=n_expiries)
+
+    def mean_iv(mask):
+        count = per_expiry(mask & valid_iv)
+        total = per_expiry(mask & valid_iv, iv)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(count > 0, total / count, np.nan)
+
+    put_volume, call_volume = per_expiry(is_put, volume), per_expiry(~is_put, volume)
+    put_oi, call_oi = open_interest[is_put].sum(), open_interest[~is_put].sum()
+    analytics = {
+        'put_call_ratio': _ratio(put_volume[0], call_volume[0]),
+        'put_call_ratio_all': _ratio(put_volume.sum(), call_volume.sum()),
+        'put_call_oi_ratio': _ratio(put_oi, call_oi),
+        'options_expiries': int(n_expiries)
+    }
+
+    if spot:
+        moneyness = chain['strike'].to_numpy(dtype=np.float64) / float(spot)
+        skew = mean_iv(is_put & (moneyness < 0.95)) - mean_iv(~is_put & (moneyness > 1.05))
+        analytics['skew'] = _value(skew[0])
+        analytics['skew_back'] = _value(skew[-1])
+
+        buckets = {}
+        for name, (lo, hi, side) in MONEYNESS_BUCKETS.items():
+            in_bucket = (moneyness > lo) & (moneyness <= hi)
+            if side is not None:
+                in_bucket &= is_put if side else ~is_put
+            buckets[name] = mean_iv(in_bucket)
+            analytics[f'iv_{name}'] = _value(buckets[name][0])
+
+        atm = buckets['atm']
+        analytics['atm_iv'] = _value(atm[0])
+        analytics['iv_term_structure'] = _ratio(atm[-1], atm[0]) if n_expiries > 1 else None
+
+    return analytics
+
+
+def _value(x):
+    return float(x) if np.isfinite(x) else None
+
+
+def _ratio(numerator, denominator):
+    return float(numerator / denominator) if denominator and np.isfinite(denominator) and np.isfinite(numerator) else None
+
+
+spy_options = OptionsChainCache('SPY')
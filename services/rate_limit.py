@@ -0,0 +1,81 @@
+import time
+import logging
+import threading
+
+# Window assumed when a 429 arrives without reset headers (Twitter's windows are 15 minutes)
+DEFAULT_WINDOW_SECONDS = 900
+
+
+class RateLimitGovernor:
+    """Client-side pacing for an API that reports x-rate-limit-* headers.
+
+    Every response's limit/remaining/reset headers are recorded, and the remaining quota is
+    spread evenly over what is left of the window: after a call, the next one is allowed
+    (reset - now) / remaining seconds later, so the quota lasts until the reset instead of
+    being burnt in the first minutes. After a 429 no call is allowed until the reset time.
+    acquire() is the only check callers need before a request.
+    """
+
+    def __init__(self, name, default_window=DEFAULT_WINDOW_SECONDS, clock=None):
+        self.name = name
+        self.default_window = default_window
+        self.clock = clock or time.time
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+        self.next_allowed = 0.0
+        self.last_value = None  # Result of the last successful call, for callers to serve while paced
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """True if a request may be sent now; reserves the slot until the response is recorded"""
+        with self._lock:
+            now = self.clock()
+            if now < self.next_allowed:
+                return False
+            # Hold further calls for one paced interval until update() knows the real quota
+            self.next_allowed = now + self._interval(now)
+            return True
+
+    def update(self, headers):
+        """Record the rate-limit headers of a successful response"""
+        with self._lock:
+            now = self.clock()
+            self._read_headers(headers)
+            if self.remaining is not None and self.reset_at is not None:
+                self.next_allowed = self.reset_at if self.remaining <= 0 else now + self._interval(now)
+
+    def rate_limited(self, headers=None):
+        """Record a 429: block until the reported reset, or a default window without one"""
+        with self._lock:
+            now = self.clock()
+            self._read_headers(headers or {})
+            self.remaining = 0
+            if self.reset_at is None or self.reset_at <= now:
+                self.reset_at = now + self.default_window
+            self.next_allowed = self.reset_at
+            logging.warning(f"{self.name} rate limited until {time.strftime('%H:%M:%S', time.gmtime(self.reset_at))} UTC")
+
+    def wait_seconds(self):
+        """Seconds until acquire() will next succeed"""
+        with self._lock:
+            return max(0.0, self.next_allowed - self.clock())
+
+    def _interval(self, now):
+        if self.reset_at is None or now >= self.reset_at:
+            # Window rolled over (or never seen): nothing known to pace against
+            return 0.0
+        if not self.remaining:
+            return self.reset_at - now
+        return (self.reset_at - now) / self.remaining
+
+    def _read_headers(self, headers):
+        headers = {str(k).lower(): v for k, v in (headers or {}).items()}
+        for attr, header, cast in (('limit', 'x-rate-limit-limit', int),
+                                   ('remaining', 'x-rate-limit-remaining', int),
+                                   ('reset_at', 'x-rate-limit-reset', float)):
+            try:
+                if header in headers:
+                    setattr(self, attr, cast(headers[header]))
+            except (TypeError, ValueError):
+                pass
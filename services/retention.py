@@ -0,0 +1,381 @@
+import os
+import json
+import time
+import logging
+import importlib.util
+from datetime import datetime, timedelta
+
+import pandas as pd
+from app import db, sqlite_profile
+from models import RiskScore, RiskScoreAggregate, SystemLog, SeenTextItem
+
+# Bucket width per aggregate resolution
+RESOLUTIONS = {'hour': 'h', 'day': 'D'}
+
+
+class RetentionManager:
+    """Retention policies for the append-only tables.
+
+    RiskScore: raw minute rows older than raw_days are archived, folded into hourly
+    RiskScoreAggregate rows and deleted; hourly aggregates older than hourly_days are folded
+    into daily ones. SystemLog: rows older than log_days are archived and deleted.
+    SeenTextItem: dedup records older than days are deleted without archiving.
+
+    Archives are one file per table, day and batch under archive_dir/<table>/date=YYYY-MM-DD/,
+    written as zstd parquet (pyarrow is a declared dependency); gzip CSV is only a logged
+    fallback for installs where no parquet engine can be imported.
+    Every batch is its own short transaction on the sqlite_profile write queue, and a run
+    stops after max_batches so the database is never held for long; later runs pick up
+    where it left off. Batches are read and archived in the caller's session.
+    """
+
+    def __init__(self, archive_dir=None, batch_size=None, max_batches=None):
+        self.archive_dir = archive_dir or os.getenv('ARCHIVE_DIR', os.path.join('data', 'archive'))
+        self.batch_size = batch_size or int(os.getenv('RETENTION_BATCH_SIZE', '2000'))
+        self.max_batches = max_batches or int(os.getenv('RETENTION_MAX_BATCHES', '50'))
+        self.policies = {
+            'risk_score': {
+                'raw_days': int(os.getenv('RISK_SCORE_RAW_DAYS', '30')),
+                'hourly_days': int(os.getenv('RISK_SCORE_HOURLY_DAYS', '365'))
+            },
+            'system_log': {
+                'log_days': int(os.getenv('SYSTEM_LOG_RETENTION_DAYS', '30'))
+            },
+            'seen_text': {
+                'days': int(os.getenv('SEEN_TEXT_RETENTION_DAYS', '14'))
+            }
+        }
+        self.parquet_available = any(importlib.util.find_spec(engine) for engine in ('pyarrow', 'fastparquet'))
+        if not self.parquet_available:
+            logging.warning("⚠️ No parquet engine importable (pyarrow missing?); retention archives fall back to gzip CSV")
+
+    def run(self, now=None):
+        """Apply every policy once, within the batch budget"""
+        now = now or datetime.utcnow()
+        start_time = time.perf_counter()
+        summary = {
+            'risk_scores_compacted': self.compact_risk_scores(now),
+            'hourly_aggregates_rolled_up': self.rollup_hourly_aggregates(now),
+            'system_logs_archived': self.archive_system_logs(now),
+            'seen_text_pruned': self.prune_seen_text(now)
+        }
+        summary['elapsed_seconds'] = round(time.perf_counter() - start_time, 3)
+        if any(v for k, v in summary.items() if k != 'elapsed_seconds'):
+            logging.info(f"🗄️ Retention run: {summary}")
+        return summary
+
+    def compact_risk_scores(self, now=None):
+        """Archive, aggregate hourly and delete raw RiskScore rows past the raw window"""
+        cutoff = (now or datetime.utcnow()) - timedelta(days=self.policies['risk_score']['raw_days'])
+        total = 0
+
+        for _ in range(self.max_batches):
+            rows = (RiskScore.query.filter(RiskScore.timestamp < cutoff)
+                    .order_by(RiskScore.timestamp, RiskScore.id)
+                    .limit(self.batch_size).all())
+            if not rows:
+                break
+
+            frame = pd.DataFrame([{
+                'id': r.id,
+                'timestamp': r.timestamp,
+                'score': r.score,
+                'level': r.level,
+                'market_data': json.dumps(r.market_data) if r.market_data is not None else None,
+                'sentiment_data': json.dumps(r.sentiment_data) if r.sentiment_data is not None else None
+            } for r in rows])
+
+            def write():
+                self._merge_aggregates('hour', self._aggregate_raw(frame, 'hour'))
+                RiskScore.query.filter(RiskScore.id.in_(frame['id'].tolist())).delete(synchronize_session=False)
+                db.session.commit()
+
+            try:
+                self._write_partitions('risk_score', frame)
+                self._write(write)
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"Error compacting RiskScore rows: {e}")
+                break
+
+            total += len(frame)
+            if len(rows) < self.batch_size:
+                break
+
+        return total
+
+    def rollup_hourly_aggregates(self, now=None):
+        """Fold hourly aggregates past the hourly window into daily ones"""
+        cutoff = (now or datetime.utcnow()) - timedelta(days=self.policies['risk_score']['hourly_days'])
+        total = 0
+
+        for _ in range(self.max_batches):
+            rows = (RiskScoreAggregate.query
+                    .filter(RiskScoreAggregate.resolution == 'hour', RiskScoreAggregate.bucket_start < cutoff)
+                    .order_by(RiskScoreAggregate.bucket_start)
+                    .limit(self.batch_size).all())
+            if not rows:
+                break
+
+            parts = self._rebucket([self._aggregate_to_dict(r) for r in rows], 'day')
+            ids = [r.id for r in rows]
+
+            def write():
+                self._merge_aggregates('day', parts)
+                RiskScoreAggregate.query.filter(RiskScoreAggregate.id.in_(ids)).delete(synchronize_session=False)
+                db.session.commit()
+
+            try:
+                self._write(write)
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"Error rolling up hourly aggregates: {e}")
+                break
+
+            total += len(rows)
+            if len(rows) < self.batch_size:
+                break
+
+        return total
+
+    def archive_system_logs(self, now=None):
+        """Archive and delete SystemLog rows past the retention window"""
+        cutoff = (now or datetime.utcnow()) - timedelta(days=self.policies['system_log']['log_days'])
+        total = 0
+
+        for _ in range(self.max_batches):
+            rows = (db.session.query(SystemLog.id, SystemLog.timestamp, SystemLog.level, SystemLog.message, SystemLog.component)
+                    .filter(SystemLog.timestamp < cutoff)
+                    .order_by(SystemLog.timestamp, SystemLog.id)
+                    .limit(self.batch_size).all())
+            if not rows:
+                break
+
+            frame = pd.DataFrame(rows, columns=['id', 'timestamp', 'level', 'message', 'component'])
+            def write():
+                SystemLog.query.filter(SystemLog.id.in_(frame['id'].tolist())).delete(synchronize_session=False)
+                db.session.commit()
+
+            try:
+                self._write_partitions('system_log', frame)
+                self._write(write)
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"Error archiving SystemLog rows: {e}")
+                break
+
+            total += len(frame)
+            if len(rows) < self.batch_size:
+                break
+
+        return total
+
+    def prune_seen_text(self, now=None):
+        """Delete text ingestion dedup records past the retention window"""
+        cutoff = (now or datetime.utcnow()) - timedelta(days=self.policies['seen_text']['days'])
+        total = 0
+
+        for _ in range(self.max_batches):
+            ids = [row_id for (row_id,) in db.session.query(SeenTextItem.id)
+                   .filter(SeenTextItem.seen_at < cutoff).limit(self.batch_size)]
+            if not ids:
+                break
+
+            def write():
+                SeenTextItem.query.filter(SeenTextItem.id.in_(ids)).delete(synchronize_session=False)
+                db.session.commit()
+
+            try:
+                self._write(write)
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"Error pruning SeenTextItem rows: {e}")
+                break
+
+            total += len(ids)
+            if len(ids) < self.batch_size:
+                break
+
+        if total:
+            # The dedup filter cannot forget keys; rebuild it from the rows that remain
+            from services.text_ingestion import text_ingestor
+            text_ingestor.rebuild()
+        return total
+
+    def _write(self, func):
+        """Run one batch's writes on the write queue"""
+        try:
+            sqlite_profile.writes.run(func)
+        finally:
+            # End the caller's read transaction so the next batch sees the committed deletes
+            db.session.rollback()
+
+    def read_archive(self, table, start, end):
+        """Archived rows of a table with start <= timestamp < end, oldest first"""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        table_dir = os.path.join(self.archive_dir, table)
+        if not os.path.isdir(table_dir):
+            return pd.DataFrame()
+
+        frames = []
+        for partition in sorted(os.listdir(table_dir)):
+            if not partition.startswith('date='):
+                continue
+            day = pd.Timestamp(partition[len('date='):])
+            if day + pd.Timedelta(days=1) <= start or day >= end:
+                continue
+            partition_dir = os.path.join(table_dir, partition)
+            for name in sorted(os.listdir(partition_dir)):
+                frames.append(self._read_file(os.path.join(partition_dir, name)))
+
+        if not frames:
+            return pd.DataFrame()
+
+        frame = pd.concat(frames, ignore_index=True)
+        frame['timestamp'] = pd.to_datetime(frame['timestamp'])
+        frame = frame[(frame['timestamp'] >= start) & (frame['timestamp'] < end)]
+        # A batch re-archived after an interrupted run shows up twice; ids are unique
+        return frame.drop_duplicates('id').sort_values(['timestamp', 'id']).reset_index(drop=True)
+
+    def risk_history(self, start, end, resolution='auto', session=None):
+        """Risk score history across raw rows, aggregates and archives.
+
+        resolution is 'raw', 'hour', 'day' or 'auto' (raw up to 2 days, hourly up to 90).
+        Aggregated points carry the mean score plus min, max and sample count. Pass a
+        read-only session to keep history queries off the write connection.
+        """
+        session = session or db.session
+        start, end = pd.Timestamp(start).to_pydatetime(), pd.Timestamp(end).to_pydatetime()
+        if resolution == 'auto':
+            span = end - start
+            resolution = 'raw' if span <= timedelta(days=2) else 'hour' if span <= timedelta(days=90) else 'day'
+
+        raw = pd.DataFrame(
+            session.query(RiskScore.id, RiskScore.timestamp, RiskScore.score, RiskScore.level)
+            .filter(RiskScore.timestamp >= start, RiskScore.timestamp < end)
+            .order_by(RiskScore.timestamp).all(),
+            columns=['id', 'timestamp', 'score', 'level']
+        )
+
+        if resolution == 'raw':
+            archived = self.read_archive('risk_score', start, end)
+            if not archived.empty:
+                raw = pd.concat([archived[['id', 'timestamp', 'score', 'level']], raw], ignore_index=True)
+            raw = raw.sort_values('timestamp')
+            return [{'timestamp': ts.isoformat(), 'score': float(score), 'level': level}
+                    for ts, score, level in zip(pd.to_datetime(raw['timestamp']), raw['score'], raw['level'])]
+
+        # Aggregates are disjoint in time from raw rows except where a bucket straddles the
+        # compaction cutoff, so partial buckets from every source are simply combined
+        # (days already rolled up to daily aggregates appear as one point at midnight)
+        first_bucket = pd.Timestamp(start).floor(RESOLUTIONS[resolution]).to_pydatetime()
+        stored = session.query(RiskScoreAggregate).filter(
+            RiskScoreAggregate.bucket_start >= first_bucket - timedelta(days=1),
+            RiskScoreAggregate.bucket_start < end
+        ).all()
+        parts = [self._aggregate_to_dict(r) for r in stored]
+        if not raw.empty:
+            parts.extend(self._aggregate_raw(raw, resolution))
+
+        buckets = self._rebucket(parts, resolution)
+        return [{
+            'timestamp': b['bucket_start'].isoformat(),
+            'score': round(b['score_mean'], 2),
+            'score_min': b['score_min'],
+            'score_max': b['score_max'],
+            'samples': b['sample_count'],
+            'level': b['level']
+        } for b in buckets if first_bucket <= b['bucket_start'] < end]
+
+    def _aggregate_raw(self, frame, resolution):
+        """Partial aggregates (as dicts) of raw rows per bucket"""
+        frame = frame.sort_values(['timestamp', 'id'])
+        bucket = pd.to_datetime(frame['timestamp']).dt.floor(RESOLUTIONS[resolution])
+        parts = []
+        for bucket_start, group in frame.groupby(bucket, sort=True):
+            last = group.iloc[-1]
+            parts.append({
+                'bucket_start': bucket_start.to_pydatetime(),
+                'sample_count': len(group),
+                'score_mean': float(group['score'].mean()),
+                'score_min': float(group['score'].min()),
+                'score_max': float(group['score'].max()),
+                'score_last': float(last['score']),
+                'last_timestamp': pd.Timestamp(last['timestamp']).to_pydatetime(),
+                'level': last['level'],
+                'market_data': json.loads(last['market_data']) if isinstance(last.get('market_data'), str) else None,
+                'sentiment_data': json.loads(last['sentiment_data']) if isinstance(last.get('sentiment_data'), str) else None
+            })
+        return parts
+
+    def _aggregate_to_dict(self, row):
+        return {name: getattr(row, name) for name in (
+            'bucket_start', 'sample_count', 'score_mean', 'score_min', 'score_max', 'score_last',
+            'last_timestamp', 'level', 'market_data', 'sentiment_data')}
+
+    def _rebucket(self, parts, resolution):
+        """Combine partial aggregates into buckets of the given resolution"""
+        buckets = {}
+        for part in sorted(parts, key=lambda p: p['last_timestamp'] or p['bucket_start']):
+            key = pd.Timestamp(part['bucket_start']).floor(RESOLUTIONS[resolution]).to_pydatetime()
+            buckets[key] = self._combine(buckets.get(key), {**part, 'bucket_start': key})
+        return [buckets[key] for key in sorted(buckets)]
+
+    def _combine(self, current, part):
+        """Merge two partial aggregates of the same bucket; the later one supplies the 'last' fields"""
+        if current is None:
+            return dict(part)
+        count = current['sample_count'] + part['sample_count']
+        later = part if (part['last_timestamp'] or datetime.min) >= (current['last_timestamp'] or datetime.min) else current
+        return {
+            'bucket_start': current['bucket_start'],
+            'sample_count': count,
+            'score_mean': (current['score_mean'] * current['sample_count'] + part['score_mean'] * part['sample_count']) / count,
+            'score_min': min(current['score_min'], part['score_min']),
+            'score_max': max(current['score_max'], part['score_max']),
+            'score_last': later['score_last'],
+            'last_timestamp': later['last_timestamp'],
+            'level': later['level'],
+            'market_data': later['market_data'],
+            'sentiment_data': later['sentiment_data']
+        }
+
+    def _merge_aggregates(self, resolution, parts):
+        """Upsert partial aggregates into RiskScoreAggregate (caller commits)"""
+        if not parts:
+            return
+        existing = {
+            row.bucket_start: row for row in RiskScoreAggregate.query.filter(
+                RiskScoreAggregate.resolution == resolution,
+                RiskScoreAggregate.bucket_start.in_([p['bucket_start'] for p in parts])
+            )
+        }
+        for part in parts:
+            row = existing.get(part['bucket_start'])
+            if row is None:
+                db.session.add(RiskScoreAggregate(resolution=resolution, **part))
+                continue
+            for name, value in self._combine(self._aggregate_to_dict(row), part).items():
+                setattr(row, name, value)
+
+    def _write_partitions(self, table, frame):
+        """Write one archive file per day present in the frame"""
+        days = pd.to_datetime(frame['timestamp']).dt.strftime('%Y-%m-%d')
+        for day, group in frame.groupby(days):
+            partition_dir = os.path.join(self.archive_dir, table, f'date={day}')
+            os.makedirs(partition_dir, exist_ok=True)
+            name = f"part-{group['id'].min()}-{group['id'].max()}"
+            if self.parquet_available:
+                path = os.path.join(partition_dir, f'{name}.parquet')
+                group.to_parquet(f'{path}.tmp', index=False, compression='zstd')
+            else:
+                path = os.path.join(partition_dir, f'{name}.csv.gz')
+                group.to_csv(f'{path}.tmp', index=False, compression='gzip')
+            os.replace(f'{path}.tmp', path)
+
+    def _read_file(self, path):
+        if path.endswith('.parquet'):
+            return pd.read_parquet(path)
+        if path.endswith('.csv.gz'):
+            return pd.read_csv(path, compression='gzip')
+        return pd.DataFrame()
@@ -8,6 +8,18 @@ class RiskCalculator:
         self.dxy_baseline = 100.0  # Normal DXY level
         self.spy_ma_period = 20  # Moving average period
         
+        # Component weights, in the order they are summed
+        self.weights = {
+            'vix': 0.20,           # VIX gets 20% weight
+            'sentiment': 0.15,     # Sentiment gets 15% weight
+            'dxy': 0.15,           # Dollar strength gets 15% weight
+            'momentum': 0.15,      # Momentum gets 15% weight
+            'credit': 0.15,        # Credit spreads get 15% weight
+            'yield_curve': 0.10,   # Yield curve gets 10% weight
+            'options': 0.05,       # Options flow gets 5% weight
+            'economic': 0.05       # Economic indicators get 5% weight
+        }
+        
     def calculate_risk_score(self, market_data, sentiment_data):
         """Calculate comprehensive risk score using enhanced data sources"""
         try:
@@ -24,16 +36,16 @@ class RiskCalculator:
             economic_score = self._calculate_economic_risk_score(market_data)
             
             # Enhanced weighted combination
-            raw_score = (
-                vix_score * 0.20 +           # VIX gets 20% weight
-                sentiment_score * 0.15 +     # Sentiment gets 15% weight
-                dxy_score * 0.15 +          # Dollar strength gets 15% weight
-                momentum_score * 0.15 +      # Momentum gets 15% weight
-                credit_score * 0.15 +        # Credit spreads get 15% weight
-                yield_curve_score * 0.10 +   # Yield curve gets 10% weight
-                options_score * 0.05 +       # Options flow gets 5% weight
-                economic_score * 0.05        # Economic indicators get 5% weight
-            )
+            raw_score = self._combine_components({
+                'vix': vix_score,
+                'sentiment': sentiment_score,
+                'dxy': dxy_score,
+                'momentum': momentum_score,
+                'credit': credit_score,
+                'yield_curve': yield_curve_score,
+                'options': options_score,
+                'economic': economic_score
+            })
             
             # Normalize to 0-100 scale
             score = min(100, max(0, raw_score))
@@ -67,7 +79,78 @@ class RiskCalculator:
                 'components': {},
                 'timestamp': datetime.utcnow().isoformat()
             }
-    
+
+    def calculate_risk_score_array(self, market_data, sentiment_data, weights=None):
+        """Vectorized risk score over arrays of SPY/VIX/DXY and sentiment observations.
+
+        Mirrors calculate_risk_score element-wise (including its 2-decimal rounding) so
+        columnar callers such as the backtester get identical scores without a per-row
+        Python call. Components that are not passed as arrays (credit, yield curve,
+        options, economic) are evaluated once from their scalar defaults.
+        """
+        components = self.calculate_component_arrays(market_data, sentiment_data)
+        return self.combine_component_arrays(components, weights)
+
+    def calculate_component_arrays(self, market_data, sentiment_data):
+        """Score every risk component over array inputs, before weighting"""
+        vix = np.asarray(market_data.get('vix', 20), dtype=float)
+        dxy = np.asarray(market_data.get('dxy', 100), dtype=float)
+        spy = np.asarray(market_data.get('spy', 440), dtype=float)
+        reddit = np.asarray(sentiment_data.get('reddit', 0), dtype=float)
+        twitter = np.asarray(sentiment_data.get('twitter', 0), dtype=float)
+        news = np.asarray(sentiment_data.get('news', 0), dtype=float)
+
+        vix_score = np.select(
+            [vix < 15, vix < 20, vix < 25, vix < 30, vix < 35],
+            [10, 20, 40, 60, 80], default=100
+        )
+        avg_sentiment = (reddit + twitter + news) / 3
+        sentiment_score = np.select(
+            [avg_sentiment >= 0.1, avg_sentiment >= 0.05, avg_sentiment >= -0.05, avg_sentiment >= -0.1],
+            [20, 30, 50, 70], default=90
+        )
+        dxy_score = np.select(
+            [dxy < 95, dxy < 100, dxy < 105, dxy < 110],
+            [20, 30, 40, 60], default=80
+        )
+        momentum_score = np.select(
+            [spy > 450, spy > 430, spy > 410, spy > 390],
+            [30, 40, 50, 60], default=70
+        )
+
+        # Macro components only depend on scalar inputs here
+        scalar_data = {k: v for k, v in market_data.items() if np.ndim(v) == 0}
+
+        return {
+            'vix': vix_score,
+            'sentiment': sentiment_score,
+            'dxy': dxy_score,
+            'momentum': momentum_score,
+            'credit': self._calculate_credit_risk_score(scalar_data),
+            'yield_curve': self._calculate_yield_curve_score(scalar_data),
+            'options': self._calculate_options_risk_score(scalar_data),
+            'economic': self._calculate_economic_risk_score(scalar_data)
+        }
+
+    def combine_component_arrays(self, components, weights=None):
+        """Weight, clip and round component arrays into final 0-100 scores"""
+        raw_score = self._combine_components(components, weights)
+        score = np.minimum(100, np.maximum(0, raw_score))
+
+        # Scores take only a handful of distinct values, so Python's round() on the
+        # unique set matches the scalar path exactly at negligible cost
+        unique_scores, inverse = np.unique(score, return_inverse=True)
+        rounded = np.array([round(float(v), 2) for v in unique_scores])
+        return rounded[inverse].reshape(score.shape)
+
+    def _combine_components(self, components, weights=None):
+        """Weighted sum of component scores, accumulated in self.weights order"""
+        weights = {**self.weights, **(weights or {})}
+        raw_score = 0
+        for name in self.weights:
+            raw_score = raw_score + components[name] * weights[name]
+        return raw_score
+
     def _calculate_vix_score(self, vix_value):
         """Calculate VIX-based risk score"""
         if vix_value < 15:
@@ -0,0 +1,224 @@
+import time
+import logging
+import numpy as np
+from scipy.signal import lfilter
+from services.backtesting import Backtester
+
+# Percentiles reported for every simulated metric
+PERCENTILES = [1, 5, 10, 25, 50, 75, 90, 95, 99]
+
+
+class ScenarioEngine:
+    """Monte Carlo stress testing for the risk-threshold strategy.
+
+    Paths for SPY, VIX, DXY and the three sentiment feeds are generated in chunks with one
+    vectorized pass per chunk: a two-state (calm/stress) regime process sets drift and
+    volatility, correlated Student-t shocks drive every series, and VIX follows an exact
+    Ornstein-Uhlenbeck discretization evaluated as a linear filter instead of a loop.
+    The strategy then runs across all paths of a chunk at once.
+    """
+
+    def __init__(self):
+        self.backtester = Backtester()
+        self.regimes = {
+            # Daily drift/volatility per regime and mean stay length in days
+            'calm': {'spy_drift': 0.0005, 'spy_vol': 0.009, 'vix_mean': 16.0, 'vix_vol': 1.2,
+                     'dxy_vol': 0.004, 'sentiment_mean': 0.03, 'mean_duration': 120},
+            'stress': {'spy_drift': -0.0015, 'spy_vol': 0.025, 'vix_mean': 35.0, 'vix_vol': 3.5,
+                       'dxy_vol': 0.007, 'sentiment_mean': -0.08, 'mean_duration': 25}
+        }
+        self.vix_reversion = 0.08   # OU speed per day
+        self.degrees_of_freedom = 4  # Student-t tail heaviness
+        # Shock correlations: SPY, VIX, DXY, sentiment
+        self.correlation = np.array([
+            [1.00, -0.75, -0.20, 0.40],
+            [-0.75, 1.00, 0.15, -0.35],
+            [-0.20, 0.15, 1.00, -0.10],
+            [0.40, -0.35, -0.10, 1.00]
+        ])
+
+    def run_scenarios(self, parameters, progress_callback=None):
+        """Simulate the strategy over many stressed paths and summarize the outcome distributions"""
+        try:
+            start_time = time.perf_counter()
+
+            n_paths = int(parameters.get('n_paths', 5000))
+            n_days = int(parameters.get('n_days', 252))
+            chunk_size = int(parameters.get('chunk_size', 1000))
+            initial_capital = parameters.get('initial_capital', 100000)
+            risk_threshold = parameters.get('risk_threshold', 60)
+            reentry_ratio = parameters.get('reentry_ratio', 0.7)
+            weights = parameters.get('weights')
+            rng = np.random.default_rng(parameters.get('seed', 42))
+
+            metrics = {name: [] for name in ('total_return', 'max_drawdown', 'sharpe_ratio', 'volatility',
+                                             'num_trades', 'time_in_market', 'buy_hold_return', 'buy_hold_drawdown')}
+
+            for start in range(0, n_paths, chunk_size):
+                size = min(chunk_size, n_paths - start)
+                paths = self.generate_paths(size, n_days, rng, parameters)
+                chunk_metrics = self._run_strategy(paths, initial_capital, risk_threshold, reentry_ratio, weights)
+                for name, values in chunk_metrics.items():
+                    metrics[name].append(values)
+
+                if progress_callback:
+                    progress_callback((start + size) / n_paths, f"Simulated {start + size} of {n_paths} paths")
+
+            metrics = {name: np.concatenate(values) for name, values in metrics.items()}
+            elapsed = time.perf_counter() - start_time
+
+            logging.info(f"✅ Stress scenarios completed: {n_paths} paths x {n_days} days in {elapsed:.2f}s")
+
+            return {
+                'n_paths': n_paths,
+                'n_days': n_days,
+                'elapsed_seconds': elapsed,
+                'distributions': {name: self._describe(values) for name, values in metrics.items()},
+                'tail_risk': self._tail_risk(metrics)
+            }
+
+        except Exception as e:
+            logging.error(f"❌ Error running stress scenarios: {e}")
+            raise
+
+    def generate_paths(self, n_paths, n_days, rng, parameters=None):
+        """Correlated regime-switching paths, each array shaped (n_paths, n_days)"""
+        parameters = parameters or {}
+        calm, stress = self.regimes['calm'], self.regimes['stress']
+        in_stress = self._regime_paths(n_paths, n_days, rng)
+
+        def by_regime(key):
+            return np.where(in_stress, stress[key], calm[key])
+
+        shocks = self._correlated_shocks(n_paths, n_days, rng)
+        spy_shock, vix_shock, dxy_shock, sentiment_shock = np.moveaxis(shocks, -1, 0)
+
+        # SPY and DXY: geometric random walks with regime-dependent drift and volatility
+        spy_returns = by_regime('spy_drift') + by_regime('spy_vol') * spy_shock
+        spy = parameters.get('spy_start', 440.0) * np.exp(np.cumsum(spy_returns, axis=1))
+        dxy = parameters.get('dxy_start', 100.0) * np.exp(np.cumsum(by_regime('dxy_vol') * dxy_shock, axis=1))
+
+        # VIX: exact OU step x_t = a*x_{t-1} + (1-a)*mu_t + sigma_t*eps_t, run as an IIR filter
+        decay = np.exp(-self.vix_reversion)
+        vix_input = (1 - decay) * by_regime('vix_mean') + by_regime('vix_vol') * vix_shock
+        vix_start = np.full((n_paths, 1), parameters.get('vix_start', 20.0)) * decay
+        vix, _ = lfilter([1.0], [1.0, -decay], vix_input, axis=1, zi=vix_start)
+        vix = np.clip(vix, 9, 90)
+
+        # Sentiment: regime mean plus a common shock shared by all feeds and per-feed noise
+        common = by_regime('sentiment_mean') + 0.05 * sentiment_shock
+        noise = rng.standard_normal((3, n_paths, n_days)) * 0.05
+
+        return {
+            'spy': spy,
+            'vix': vix,
+            'dxy': dxy,
+            'reddit': common + noise[0],
+            'twitter': common + noise[1],
+            'news': common + noise[2],
+            'in_stress': in_stress
+        }
+
+    def _regime_paths(self, n_paths, n_days, rng):
+        """Boolean stress indicator built from alternating geometric stay lengths"""
+        calm_days = self.regimes['calm']['mean_duration']
+        stress_days = self.regimes['stress']['mean_duration']
+
+        # Start each path in calm or stress according to the stationary mix
+        starts_stressed = rng.random(n_paths) < stress_days / (calm_days + stress_days)
+
+        # Enough alternating spells to cover the horizon in all but astronomically unlikely cases
+        n_spells = 2 * (n_days // min(calm_days, stress_days) + 4)
+        spell_stressed = (np.arange(n_spells) % 2 == 1) ^ starts_stressed[:, None]
+        durations = rng.geometric(1.0 / np.where(spell_stressed, stress_days, calm_days))
+        boundaries = np.cumsum(durations, axis=1)
+
+        switches = np.zeros((n_paths, n_days + 1), dtype=np.int32)
+        rows = np.repeat(np.arange(n_paths), n_spells)
+        np.add.at(switches, (rows, np.minimum(boundaries, n_days).ravel()), 1)
+        spell_index = np.cumsum(switches[:, :n_days], axis=1)
+
+        return (spell_index % 2 == 1) ^ starts_stressed[:, None]
+
+    def _correlated_shocks(self, n_paths, n_days, rng):
+        """Unit-variance multivariate Student-t shocks, shaped (n_paths, n_days, 4)"""
+        df = self.degrees_of_freedom
+        cholesky = np.linalg.cholesky(self.correlation)
+        normal = rng.standard_normal((n_paths, n_days, len(self.correlation))) @ cholesky.T
+        mixing = np.sqrt(df / rng.chisquare(df, size=(n_paths, n_days, 1)))
+        return normal * mixing * np.sqrt((df - 2) / df)
+
+    def _run_strategy(self, paths, initial_capital, risk_threshold, reentry_ratio, weights):
+        """Threshold strategy across every path of a chunk at once"""
+        spy = paths['spy']
+        risk_scores = self.backtester.risk_calculator.calculate_risk_score_array(
+            {'spy': spy, 'vix': paths['vix'], 'dxy': paths['dxy']},
+            {'reddit': paths['reddit'], 'twitter': paths['twitter'], 'news': paths['news']},
+            weights
+        )
+        in_position = self._latch_positions_2d(risk_scores < risk_threshold * reentry_ratio, risk_scores > risk_threshold)
+
+        # A position held at the close of day t-1 earns the SPY move into day t
+        growth = spy[:, 1:] / spy[:, :-1]
+        strategy_growth = np.where(in_position[:, :-1], growth, 1.0)
+        values = initial_capital * np.concatenate([np.ones((len(spy), 1)), np.cumprod(strategy_growth, axis=1)], axis=1)
+        buy_hold = spy / spy[:, :1]
+
+        daily_returns = strategy_growth - 1
+        volatility = daily_returns.std(axis=1, ddof=1) * np.sqrt(252)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe_ratio = np.where(volatility > 0, daily_returns.mean(axis=1) * 252 / volatility, 0.0)
+
+        previous = np.concatenate([np.zeros((len(spy), 1), dtype=bool), in_position[:, :-1]], axis=1)
+
+        return {
+            'total_return': values[:, -1] / initial_capital - 1,
+            'max_drawdown': self._max_drawdown_2d(values),
+            'sharpe_ratio': sharpe_ratio,
+            'volatility': volatility,
+            'num_trades': (in_position != previous).sum(axis=1),
+            'time_in_market': in_position.mean(axis=1),
+            'buy_hold_return': buy_hold[:, -1] - 1,
+            'buy_hold_drawdown': self._max_drawdown_2d(buy_hold)
+        }
+
+    def _latch_positions_2d(self, buy, sell):
+        """Row-wise version of Backtester._latch_positions"""
+        if np.any(buy & sell):
+            in_position = np.zeros(buy.shape, dtype=bool)
+            held = np.zeros(len(buy), dtype=bool)
+            for t in range(buy.shape[1]):
+                held = np.where(held, ~sell[:, t], buy[:, t])
+                in_position[:, t] = held
+            return in_position
+
+        last_trigger = np.where(buy | sell, np.arange(buy.shape[1]), -1)
+        last_trigger = np.maximum.accumulate(last_trigger, axis=1)
+        latched = np.take_along_axis(buy, np.maximum(last_trigger, 0), axis=1)
+        return np.where(last_trigger >= 0, latched, False)
+
+    def _max_drawdown_2d(self, values):
+        """Per-path maximum drawdown"""
+        peak = np.maximum.accumulate(values, axis=1)
+        return ((values - peak) / peak).min(axis=1)
+
+    def _describe(self, values):
+        """Mean, spread and percentiles of one metric"""
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return {}
+        summary = {'mean': float(values.mean()), 'std': float(values.std())}
+        summary.update({f'p{p}': float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))})
+        return summary
+
+    def _tail_risk(self, metrics):
+        """Headline tail statistics for the strategy"""
+        returns = metrics['total_return']
+        var_5 = np.percentile(returns, 5)
+        return {
+            'value_at_risk_5pct': float(var_5),
+            'expected_shortfall_5pct': float(returns[returns <= var_5].mean()),
+            'probability_of_loss': float((returns < 0).mean()),
+            'probability_drawdown_over_20pct': float((metrics['max_drawdown'] < -0.20).mean()),
+            'buy_hold_probability_drawdown_over_20pct': float((metrics['buy_hold_drawdown'] < -0.20).mean())
+        }
@@ -0,0 +1,136 @@
+import os
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+# Applied to every write connection. WAL lets readers run alongside the single writer,
+# synchronous=NORMAL is durable across application crashes in WAL mode, and busy_timeout
+# makes a connection wait for the write lock instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_BYTES', str(256 * 1024 * 1024))),
+    'cache_size': -int(os.getenv('SQLITE_CACHE_KB', '65536')),  # Negative values are KiB
+    'temp_store': 'MEMORY'
+}
+
+# Read connections refuse writes outright
+READ_ONLY_PRAGMAS = {**{k: v for k, v in SQLITE_PRAGMAS.items() if k != 'journal_mode'}, 'query_only': 'ON'}
+
+
+def is_sqlite(uri):
+    return str(uri).startswith('sqlite')
+
+
+def _pragma_listener(pragmas):
+    def apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+    return apply
+
+
+class WriteQueue:
+    """Serializes database writes through one thread, so writers queue in-process instead of
+    contending for the SQLite write lock. Each job runs in its own app context and session
+    and is responsible for its own commit; the session is removed afterwards.
+    """
+
+    def __init__(self, app, db, enabled=True, maxsize=1000):
+        self.app = app
+        self.db = db
+        self.enabled = enabled
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, func):
+        """Queue a write; returns a Future with its result"""
+        if not self.enabled or threading.current_thread() is self._thread:
+            # Other databases handle concurrent writers themselves; nested writes run inline
+            future = Future()
+            try:
+                future.set_result(func())
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._ensure_started()
+        future = Future()
+        self._queue.put((func, future))
+        return future
+
+    def run(self, func, timeout=30):
+        """Queue a write and wait for it"""
+        return self.submit(func).result(timeout)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name='db-writer', daemon=True)
+                self._thread.start()
+
+    def _worker(self):
+        while True:
+            func, future = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self.app.app_context():
+                try:
+                    future.set_result(func())
+                except Exception as e:
+                    self.db.session.rollback()
+                    future.set_exception(e)
+                finally:
+                    self.db.session.remove()
+
+
+class SQLiteProfile:
+    """Connection management for the default SQLite database.
+
+    Write connections get the WAL/performance pragmas, writes can be funnelled through a
+    single-writer queue, and query endpoints can use a separate read-only engine whose
+    connections never take the write lock. On any other database the profile is inert:
+    read_session() yields db.session and writes run inline.
+    """
+
+    def __init__(self, app, db):
+        self.app = app
+        self.db = db
+        self.enabled = is_sqlite(app.config.get('SQLALCHEMY_DATABASE_URI', ''))
+        self.read_engine = None
+        self.writes = WriteQueue(app, db, enabled=self.enabled)
+
+        if self.enabled:
+            with app.app_context():
+                event.listen(db.engine, 'connect', _pragma_listener(SQLITE_PRAGMAS))
+                db.engine.dispose()  # Reopen any pooled connections with the pragmas applied
+                if db.engine.url.database in (None, '', ':memory:'):
+                    return  # A second engine would see a different in-memory database
+                self.read_engine = create_engine(
+                    db.engine.url,
+                    connect_args={'check_same_thread': False, 'timeout': 30},
+                    pool_pre_ping=True
+                )
+                event.listen(self.read_engine, 'connect', _pragma_listener(READ_ONLY_PRAGMAS))
+            logging.info("SQLite profile enabled: WAL journal, single writer queue, read-only query engine")
+
+    @contextmanager
+    def read_session(self):
+        """Session for query endpoints; on SQLite it is backed by read-only connections"""
+        if self.read_engine is None:
+            yield self.db.session
+            return
+        session = Session(bind=self.read_engine)
+        try:
+            yield session
+        finally:
+            session.close()
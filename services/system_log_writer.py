@@ -0,0 +1,214 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+from sqlalchemy import insert
+from services.metrics import registry, timed
+
+SYSTEM_LOG_WRITES = registry.counter(
+    'risk_monitor_system_log_entries_total',
+    'SystemLog entries by outcome: written, sampled out or dropped.',
+    ('outcome',)
+)
+SYSTEM_LOG_BATCHES = registry.counter(
+    'risk_monitor_system_log_batches_total',
+    'SystemLog bulk inserts by outcome.',
+    ('status',)
+)
+
+# Failures inside the writer are reported here; this logger is never routed back into SystemLog
+logger = logging.getLogger(__name__)
+
+
+class SystemLogWriter:
+    """Buffers SystemLog rows in a bounded queue and bulk-inserts them from one background thread.
+
+    A batch is written when batch_size entries are waiting or flush_interval seconds have
+    passed, so the database sees one commit per batch instead of one per event. Once the
+    queue passes the high-water mark only every sample_rate-th INFO/DEBUG entry is kept
+    (warnings and errors always are); when it is full, new entries are dropped and counted.
+    """
+
+    def __init__(self, app, db, model, batch_size=None, flush_interval=None, max_queue=None, sample_rate=10, write_queue=None):
+        self.app = app
+        self.db = db
+        self.model = model
+        self.write_queue = write_queue
+        self.batch_size = batch_size or int(os.getenv('SYSTEM_LOG_BATCH_SIZE', '100'))
+        self.flush_interval = flush_interval or float(os.getenv('SYSTEM_LOG_FLUSH_SECONDS', '5'))
+        self.max_queue = max_queue or int(os.getenv('SYSTEM_LOG_QUEUE_SIZE', '10000'))
+        self.high_water = int(self.max_queue * 0.8)
+        self.sample_rate = sample_rate
+        self.max_retries = 3
+
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._flush_requested = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._sample_counter = 0
+        self._dropped = 0
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='system-log-writer', daemon=True)
+                self._thread.start()
+        return self
+
+    def write(self, level, message, component=None, timestamp=None):
+        """Queue one SystemLog row; never blocks and never raises"""
+        entry = {
+            'timestamp': timestamp or datetime.utcnow(),
+            'level': level,
+            'message': message,
+            'component': component
+        }
+
+        if self._queue.qsize() >= self.high_water and level in ('DEBUG', 'INFO'):
+            with self._lock:
+                self._sample_counter += 1
+                keep = self._sample_counter % self.sample_rate == 0
+            if not keep:
+                SYSTEM_LOG_WRITES.inc(outcome='sampled')
+                return False
+
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            SYSTEM_LOG_WRITES.inc(outcome='dropped')
+            return False
+
+        if self._queue.qsize() >= self.batch_size:
+            self._flush_requested.set()
+        return True
+
+    def flush(self, timeout=5.0):
+        """Ask the writer thread to write everything queued so far and wait for it"""
+        if self._thread is None or not self._thread.is_alive():
+            self._drain()
+            return
+        self._flush_requested.set()
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def stop(self, timeout=5.0):
+        """Flush what is queued and stop the writer thread"""
+        self._stopping.set()
+        self._flush_requested.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._drain()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._flush_requested.wait(self.flush_interval)
+            self._flush_requested.clear()
+            self._drain()
+
+    def _drain(self):
+        """Write queued entries in batches until the queue is empty"""
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+
+            queued = len(batch)
+            with self._lock:
+                dropped, self._dropped = self._dropped, 0
+            if dropped:
+                batch.append({'timestamp': datetime.utcnow(), 'level': 'WARNING', 'component': 'logging',
+                              'message': f"Dropped {dropped} log entries under backpressure"})
+
+            self._insert(batch)
+            for _ in range(queued):
+                self._queue.task_done()
+
+    def _execute_insert(self, batch):
+        with self.app.app_context():
+            self.db.session.execute(insert(self.model), batch)
+            self.db.session.commit()
+
+    def _insert(self, batch):
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                with timed('db_system_log_batch'):
+                    if self.write_queue is not None:
+                        self.write_queue.run(lambda: self._execute_insert(batch))
+                    else:
+                        self._execute_insert(batch)
+                SYSTEM_LOG_WRITES.inc(len(batch), outcome='written')
+                SYSTEM_LOG_BATCHES.inc(status='success')
+                return True
+            except Exception as e:
+                SYSTEM_LOG_BATCHES.inc(status='failed')
+                logger.warning(f"SystemLog batch insert failed (attempt {attempt}): {e}")
+                try:
+                    with self.app.app_context():
+                        self.db.session.rollback()
+                except Exception:
+                    pass
+                if attempt < self.max_retries:
+                    time.sleep(0.1 * 2 ** attempt)
+
+        SYSTEM_LOG_WRITES.inc(len(batch), outcome='dropped')
+        logger.error(f"Dropped {len(batch)} SystemLog entries after {self.max_retries} failed inserts")
+        return False
+
+
+class SystemLogHandler(logging.Handler):
+    """logging.Handler that hands records to a SystemLogWriter"""
+
+    def __init__(self, writer, level=logging.NOTSET, default_component='system'):
+        super().__init__(level)
+        self.writer = writer
+        self.default_component = default_component
+
+    def emit(self, record):
+        if record.name == logger.name:
+            return
+        try:
+            component = getattr(record, 'component', None) or self.default_component
+            self.writer.write(record.levelname, self.format(record), component,
+                              datetime.utcfromtimestamp(record.created))
+        except Exception:
+            self.handleError(record)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_system_log_writer():
+    """Process-wide writer, started on first use and flushed at interpreter exit"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            from app import app, db, sqlite_profile
+            from models import SystemLog
+
+            _writer = SystemLogWriter(app, db, SystemLog, write_queue=sqlite_profile.writes).start()
+            atexit.register(_writer.stop)
+        return _writer
+
+
+def get_system_event_logger():
+    """Logger whose records become SystemLog rows via the shared writer"""
+    events = logging.getLogger('risk_monitor.system_events')
+    if not any(isinstance(h, SystemLogHandler) for h in events.handlers):
+        events.addHandler(SystemLogHandler(get_system_log_writer()))
+        events.setLevel(logging.DEBUG)
+        events.propagate = False
+    return events
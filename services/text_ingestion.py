@@ -0,0 +1,245 @@
+import os
+import math
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from services.keyword_sentiment import keyword_sentiment
+
+# Items scored per source are remembered this long (the SeenTextItem retention window)
+SEEN_TEXT_RETENTION_DAYS = int(os.getenv('SEEN_TEXT_RETENTION_DAYS', '14'))
+
+# Expected distinct items within the retention window, and the Bloom filter's false-positive rate
+SEEN_TEXT_CAPACITY = int(os.getenv('SEEN_TEXT_CAPACITY', '500000'))
+SEEN_TEXT_FALSE_POSITIVE_RATE = float(os.getenv('SEEN_TEXT_FALSE_POSITIVE_RATE', '0.0001'))
+
+# An item's weight in the running sentiment halves every this many minutes after it was published
+SENTIMENT_HALF_LIFE_MINUTES = float(os.getenv('SENTIMENT_HALF_LIFE_MINUTES', '360'))
+
+# Newest-first listings stop paging after this many consecutive already-seen items
+STOP_AFTER_SEEN = int(os.getenv('TEXT_INGEST_STOP_AFTER_SEEN', '25'))
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys, sized for capacity at the given error rate"""
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, key):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class DecayedSentiment:
+    """Weighted mean of item scores whose weights decay exponentially with item age.
+
+    The sums are decayed in place when time advances, so adding new items never revisits
+    old ones.
+    """
+
+    def __init__(self, half_life_minutes=None):
+        half_life = SENTIMENT_HALF_LIFE_MINUTES if half_life_minutes is None else half_life_minutes
+        self.rate = math.log(2) / (half_life * 60)
+        self.weighted_sum = 0.0
+        self.weight = 0.0
+        self.updated_at = None
+
+    def advance(self, now):
+        if self.updated_at is not None and now > self.updated_at:
+            decay = math.exp(-self.rate * (now - self.updated_at).total_seconds())
+            self.weighted_sum *= decay
+            self.weight *= decay
+        self.updated_at = max(now, self.updated_at or now)
+
+    def add(self, scores, timestamps, now):
+        """Fold in items scored now, weighted by how long ago each was published"""
+        self.advance(now)
+        ages = np.array([max(0.0, (now - t).total_seconds()) for t in timestamps])
+        weights = np.exp(-self.rate * ages)
+        self.weighted_sum += float(np.dot(weights, scores))
+        self.weight += float(weights.sum())
+
+    def value(self, now=None):
+        if now is not None:
+            self.advance(now)
+        return self.weighted_sum / self.weight if self.weight > 1e-9 else 0.0
+
+
+class TextIngestor:
+    """Deduplicated sentiment ingestion for high-volume text sources.
+
+    Collectors page through as many posts or articles as they like and hand each batch to
+    ingest(). Keys already seen are dropped by an in-memory Bloom filter without touching
+    the database; the remaining items are checked against SeenTextItem in one query, scored
+    together by the keyword engine, recorded, and folded into a per-source time-decayed
+    aggregate. The filter and the aggregates are rebuilt from SeenTextItem the first time
+    a process ingests, so restarts neither rescore old items nor lose the running signal.
+
+    A Bloom filter cannot forget keys, so it is rebuilt from the retained rows after
+    retention prunes SeenTextItem, and whenever its inserts pass the capacity it was sized
+    for. A rebuild sizes the filter for at least twice the retained rows.
+    """
+
+    def __init__(self, capacity=None, error_rate=None, half_life_minutes=None):
+        self.capacity = capacity or SEEN_TEXT_CAPACITY
+        self.error_rate = error_rate or SEEN_TEXT_FALSE_POSITIVE_RATE
+        self.half_life_minutes = half_life_minutes
+        self.seen = None
+        self.seen_capacity = 0
+        self.inserted = 0
+        self.aggregates = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def item_key(item_id=None, text=''):
+        """The upstream id when there is one, otherwise a hash of the normalized text.
+
+        Ids longer than the 64-character key column are hashed rather than truncated, so
+        ids sharing a long prefix (URLs above all) stay distinct.
+        """
+        if item_id:
+            item_id = str(item_id)
+            return item_id if len(item_id) <= 64 else hashlib.sha1(item_id.encode()).hexdigest()
+        return hashlib.sha1(' '.join(text.lower().split()).encode()).hexdigest()
+
+    def is_seen(self, source, key):
+        self._ensure_loaded()
+        return f'{source}:{key}' in self.seen
+
+    def collect(self, source, items, now=None, stop_after_seen=None):
+        """Ingest a newest-first stream, stopping once stop_after_seen consecutive items were seen.
+
+        items is typically a generator that fetches pages lazily, so a listing is only paged
+        back as far as the last cycle got.
+        """
+        stop_after_seen = stop_after_seen or STOP_AFTER_SEEN
+        batch, seen_run = [], 0
+        for key, text, published_at in items:
+            if self.is_seen(source, key):
+                seen_run += 1
+                if seen_run >= stop_after_seen:
+                    break
+                continue
+            seen_run = 0
+            batch.append((key, text, published_at))
+        return self.ingest(source, batch, now)
+
+    def ingest(self, source, items, now=None):
+        """Score and record the unseen items of (key, text, published_at) tuples; returns the new count"""
+        from app import db, sqlite_profile
+        from models import SeenTextItem
+
+        now = now or datetime.utcnow()
+        with self._lock:
+            self._ensure_loaded()
+            fresh = {}
+            for key, text, published_at in items:
+                if f'{source}:{key}' not in self.seen and key not in fresh:
+                    fresh[key] = (text, published_at)
+            if not fresh:
+                return 0
+
+            # Bloom misses are certainly new to this process; another process may have stored them
+            stored = {key for (key,) in db.session.query(SeenTextItem.item_key).filter(
+                SeenTextItem.source == source, SeenTextItem.item_key.in_(list(fresh)))}
+            for key in stored:
+                self.seen.add(f'{source}:{key}')
+                del fresh[key]
+            if not fresh:
+                return 0
+
+            keys = list(fresh)
+            scores = keyword_sentiment.score_texts([fresh[key][0] for key in keys])['scores']
+            published = [min(fresh[key][1] or now, now) for key in keys]
+
+            def record():
+                db.session.add_all(SeenTextItem(source=source, item_key=key, seen_at=now, published_at=fresh[key][1],
+                                                sentiment=float(score)) for key, score in zip(keys, scores))
+                db.session.commit()
+
+            try:
+                sqlite_profile.writes.run(record)
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"Error recording ingested {source} items: {e}")
+                return 0
+
+            for key in keys:
+                self.seen.add(f'{source}:{key}')
+            self.inserted += len(keys)
+            self._aggregate(source).add(scores, published, now)
+            if self.inserted > self.seen_capacity:
+                logging.info(f"Text ingestion filter passed its capacity of {self.seen_capacity}, rebuilding")
+                self._invalidate()
+            return len(keys)
+
+    def sentiment(self, source, now=None):
+        """Time-decayed mean sentiment of everything ingested from source"""
+        with self._lock:
+            self._ensure_loaded()
+            return self._aggregate(source).value(now or datetime.utcnow())
+
+    def _aggregate(self, source):
+        if source not in self.aggregates:
+            self.aggregates[source] = DecayedSentiment(self.half_life_minutes)
+        return self.aggregates[source]
+
+    def _ensure_loaded(self):
+        if self.seen is not None:
+            return
+        from app import db
+        from models import SeenTextItem
+
+        now = datetime.utcnow()
+        cutoff = now - timedelta(days=SEEN_TEXT_RETENTION_DAYS)
+        rows = db.session.query(SeenTextItem.source, SeenTextItem.item_key, SeenTextItem.seen_at,
+                                SeenTextItem.published_at, SeenTextItem.sentiment).filter(SeenTextItem.seen_at >= cutoff)
+        keys, by_source = [], {}
+        for source, key, seen_at, published_at, score in rows.yield_per(5000):
+            keys.append(f'{source}:{key}')
+            scores, timestamps = by_source.setdefault(source, ([], []))
+            scores.append(score)
+            timestamps.append(min(published_at or seen_at, now))
+
+        self.seen_capacity = max(self.capacity, 2 * len(keys))
+        self.seen = BloomFilter(self.seen_capacity, self.error_rate)
+        for key in keys:
+            self.seen.add(key)
+        self.inserted = len(keys)
+
+        self.aggregates = {}
+        for source, (scores, timestamps) in by_source.items():
+            self._aggregate(source).add(np.asarray(scores), timestamps, now)
+        if keys:
+            logging.info(f"Text ingestion state restored: {len(keys)} seen items")
+
+    def _invalidate(self):
+        # Rebuilt from SeenTextItem on next use
+        self.seen = None
+        self.aggregates = {}
+
+    def rebuild(self):
+        """Drop the filter and aggregates so they are rebuilt from the retained rows, e.g. after pruning"""
+        with self._lock:
+            self._invalidate()
+
+    def reset(self):
+        self.rebuild()
+
+
+text_ingestor = TextIngestor()
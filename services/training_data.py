@@ -0,0 +1,230 @@
+import os
+import json
+import logging
+import importlib.util
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from app import db
+from models import RiskScore
+from services.training_targets import TargetBuilder
+
+# Fields flattened out of the RiskScore JSON columns, as collected by DataCollector
+MARKET_FIELDS = (
+    'spy', 'vix', 'dxy', 'qqq', 'tnx', 'tlt', 'hyg', 'lqd', 'gld', 'gdx', 'uso', 'xlre', 'vnq', 'iyr',
+    'three_month', 'two_year', 'five_year', 'ten_year', 'thirty_year',
+    'fed_funds_rate', 'ten_year_yield', 'credit_spread', 'dollar_index', 'unemployment', 'cpi', 'gdp',
+    'consumer_confidence', 'put_call_ratio', 'skew'
+)
+SENTIMENT_FIELDS = ('reddit', 'twitter', 'news')
+
+# Bump whenever the field lists change; a new version starts a fresh snapshot directory
+SCHEMA_VERSION = 1
+
+# Most recent rows a full training run reads when the caller does not say (about six months of minutes)
+TRAINING_MAX_ROWS = int(os.getenv('TRAINING_MAX_ROWS', '250000'))
+
+COLUMNS = (['id', 'timestamp', 'score', 'level']
+           + [f'market_{name}' for name in MARKET_FIELDS]
+           + [f'sentiment_{name}' for name in SENTIMENT_FIELDS])
+
+
+class TrainingDataLoader:
+    """Extracts RiskScore history into a columnar snapshot for model training.
+
+    Rows are streamed in id order with yield_per (a server-side cursor on PostgreSQL), and the
+    JSON market/sentiment fields are flattened into float64 columns one chunk at a time, so
+    memory stays bounded by chunk_size. Each chunk becomes one part file under
+    snapshot_dir/v<SCHEMA_VERSION>/ and manifest.json records the last extracted id; later
+    refreshes only read rows added since then. Parts are zstd parquet (pyarrow is a declared
+    dependency); gzip CSV is only a logged fallback when no parquet engine imports. Rows
+    already in the snapshot are kept even after retention has compacted them out of the database.
+    """
+
+    def __init__(self, snapshot_dir=None, chunk_size=None):
+        self.snapshot_dir = snapshot_dir or os.getenv('TRAINING_SNAPSHOT_DIR', os.path.join('data', 'training'))
+        self.chunk_size = chunk_size or int(os.getenv('TRAINING_CHUNK_SIZE', '50000'))
+        self.version_dir = os.path.join(self.snapshot_dir, f'v{SCHEMA_VERSION}')
+        self.manifest_path = os.path.join(self.version_dir, 'manifest.json')
+        self.parquet_available = any(importlib.util.find_spec(engine) for engine in ('pyarrow', 'fastparquet'))
+        if not self.parquet_available:
+            logging.warning("⚠️ No parquet engine importable (pyarrow missing?); training snapshots fall back to gzip CSV")
+
+    def manifest(self):
+        """Snapshot state: last extracted id, row count and part files"""
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        return {'schema_version': SCHEMA_VERSION, 'columns': COLUMNS, 'last_id': 0, 'rows': 0, 'parts': []}
+
+    def refresh(self, session=None):
+        """Append RiskScore rows newer than the snapshot; returns the number of rows added"""
+        session = session or db.session
+        manifest = self.manifest()
+        query = (session.query(RiskScore.id, RiskScore.timestamp, RiskScore.score, RiskScore.level,
+                               RiskScore.market_data, RiskScore.sentiment_data)
+                 .filter(RiskScore.id > manifest['last_id'])
+                 .order_by(RiskScore.id)
+                 .yield_per(self.chunk_size))
+
+        added = 0
+        chunk = []
+        for row in query:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                added += self._write_part(manifest, chunk)
+                chunk = []
+        if chunk:
+            added += self._write_part(manifest, chunk)
+
+        if added:
+            logging.info(f"📦 Training snapshot: {added} new rows, {manifest['rows']} total")
+        return added
+
+    def iter_chunks(self, columns=None):
+        """Yield the snapshot one part at a time, oldest first"""
+        for part in self.manifest()['parts']:
+            yield self._read_part(part['file'], columns)
+
+    def load(self, columns=None, max_rows=None):
+        """Snapshot as one DataFrame; with max_rows only the most recent rows are read"""
+        frames = []
+        remaining = max_rows
+        for part in reversed(self.manifest()['parts']):
+            frame = self._read_part(part['file'], columns)
+            if remaining is not None:
+                frame = frame.iloc[-remaining:] if remaining else frame.iloc[:0]
+                remaining -= len(frame)
+            frames.append(frame)
+            if remaining is not None and remaining <= 0:
+                break
+
+        if not frames:
+            return _flatten([])[list(columns or COLUMNS)]
+        return pd.concat(reversed(frames), ignore_index=True)
+
+    def load_since(self, last_id, columns=None):
+        """Rows with an id above last_id, reading only the parts that contain them"""
+        columns = list(columns or COLUMNS)
+        frames = [self._read_part(part['file'], columns) for part in self.manifest()['parts']
+                  if part['last_id'] > (last_id or 0)]
+        if not frames:
+            return _flatten([])[columns]
+        frame = pd.concat(frames, ignore_index=True)
+        if 'id' in frame:
+            frame = frame[frame['id'] > (last_id or 0)].reset_index(drop=True)
+        return frame
+
+    def labels(self, builder=None):
+        """Forward-looking label matrix for the whole snapshot, with an id column to join on.
+
+        Labels are built from the SPY series in one vectorized pass and cached next to the
+        parts, keyed by the label definition and the snapshot's last id. The tail rows change
+        as new prices arrive, so a refreshed snapshot replaces the cache.
+        """
+        builder = builder or TargetBuilder()
+        name = f"labels-{builder.version}-{self.manifest()['last_id']:012d}"
+        for existing in (f'{name}.parquet', f'{name}.csv.gz'):
+            if os.path.exists(os.path.join(self.version_dir, existing)):
+                return self._read_frame(existing)
+
+        prices = self.load(['id', 'timestamp', 'market_spy'])
+        labels = builder.build(prices['timestamp'], prices['market_spy'])
+        labels.insert(0, 'id', prices['id'].to_numpy())
+        if len(labels):
+            written = self._write_frame(labels, name)
+            for stale in os.listdir(self.version_dir):
+                if stale.startswith('labels-') and stale != written:
+                    os.remove(os.path.join(self.version_dir, stale))
+        return labels
+
+    def _write_frame(self, frame, name):
+        os.makedirs(self.version_dir, exist_ok=True)
+        if self.parquet_available:
+            path = os.path.join(self.version_dir, f'{name}.parquet')
+            frame.to_parquet(f'{path}.tmp', index=False, compression='zstd')
+        else:
+            path = os.path.join(self.version_dir, f'{name}.csv.gz')
+            frame.to_csv(f'{path}.tmp', index=False, compression='gzip')
+        os.replace(f'{path}.tmp', path)
+        return os.path.basename(path)
+
+    def _read_frame(self, name):
+        path = os.path.join(self.version_dir, name)
+        if name.endswith('.parquet'):
+            return pd.read_parquet(path)
+        return pd.read_csv(path, compression='gzip', dtype={'id': 'int64'})
+
+    def _write_part(self, manifest, rows):
+        frame = _flatten(rows)
+        first_id, last_id = int(frame['id'].iat[0]), int(frame['id'].iat[-1])
+        written = self._write_frame(frame, f'part-{first_id:012d}-{last_id:012d}')
+
+        # The manifest is rewritten after every part, so an interrupted extract resumes from here
+        manifest['parts'].append({'file': written, 'rows': len(frame),
+                                  'first_id': first_id, 'last_id': last_id})
+        manifest['last_id'] = last_id
+        manifest['rows'] += len(frame)
+        manifest['updated_at'] = datetime.utcnow().isoformat()
+        with open(f'{self.manifest_path}.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(f'{self.manifest_path}.tmp', self.manifest_path)
+        return len(frame)
+
+    def _read_part(self, name, columns=None):
+        path = os.path.join(self.version_dir, name)
+        columns = list(columns or COLUMNS)
+        if name.endswith('.parquet'):
+            return pd.read_parquet(path, columns=columns)
+        frame = pd.read_csv(path, compression='gzip', usecols=columns,
+                            dtype={c: _dtype(c) for c in columns if c != 'timestamp'})
+        if 'timestamp' in frame:
+            frame['timestamp'] = pd.to_datetime(frame['timestamp'])
+        return frame[columns]
+
+
+def to_training_frame(frame):
+    """Snapshot rows as train_models/update_models input.
+
+    The flat market_*/sentiment_* columns stay as they are (the feature matrix is built from
+    them directly); score becomes the risk_score target and, when labels are joined,
+    return_1d the market_direction target.
+    """
+    training = frame.rename(columns={'score': 'risk_score'})
+    if 'return_1d' in training:
+        training['market_direction'] = training['return_1d']
+    return training
+
+
+def _flatten(rows):
+    """Typed columns from (id, timestamp, score, level, market_data, sentiment_data) tuples"""
+    n = len(rows)
+    columns = {
+        'id': np.fromiter((r[0] for r in rows), np.int64, n),
+        'timestamp': pd.to_datetime([r[1] for r in rows]),
+        'score': np.fromiter((r[2] for r in rows), np.float64, n),
+        'level': pd.array([r[3] for r in rows], dtype='string')
+    }
+    markets = [r[4] or {} for r in rows]
+    sentiments = [r[5] or {} for r in rows]
+    for name in MARKET_FIELDS:
+        columns[f'market_{name}'] = np.fromiter((_to_float(m.get(name)) for m in markets), np.float64, n)
+    for name in SENTIMENT_FIELDS:
+        columns[f'sentiment_{name}'] = np.fromiter((_to_float(s.get(name)) for s in sentiments), np.float64, n)
+    return pd.DataFrame(columns)
+
+
+def _to_float(value):
+    try:
+        return float(value) if value is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _dtype(column):
+    if column == 'id':
+        return 'int64'
+    if column == 'level':
+        return 'string'
+    return 'float64'
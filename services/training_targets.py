@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+# Prediction horizons in days, matching the crash_predictor_<n>d models
+HORIZONS = (1, 3, 7, 14, 30)
+
+# Forward drawdown that counts as a crash within each horizon
+CRASH_THRESHOLDS = {1: 0.03, 3: 0.05, 7: 0.07, 14: 0.10, 30: 0.15}
+
+
+class TargetBuilder:
+    """Labels from what the market actually did after each row.
+
+    For every row and horizon h: the forward return to the last price at or before t + h,
+    the forward drawdown (lowest price in [t, t + h] against the price at t) and a crash
+    flag when that drawdown breaches the horizon's threshold. All rows are computed at once
+    with a time-based rolling minimum over the reversed series, so irregular spacing (minute
+    rows with gaps, compacted history) is handled. Rows whose horizon extends past the last
+    observation are NaN, since their outcome is not known yet.
+    """
+
+    def __init__(self, horizons=HORIZONS, thresholds=None):
+        self.horizons = tuple(horizons)
+        self.thresholds = {**CRASH_THRESHOLDS, **(thresholds or {})}
+
+    @property
+    def version(self):
+        """Identifies the label definition, for caching"""
+        parts = [f"{h}d{self.thresholds[h]:g}" for h in self.horizons]
+        return '-'.join(parts)
+
+    def columns(self):
+        return ([f'crash_{h}d' for h in self.horizons]
+                + [f'drawdown_{h}d' for h in self.horizons]
+                + [f'return_{h}d' for h in self.horizons])
+
+    def build(self, timestamps, prices):
+        """Label matrix for prices observed at timestamps (both in ascending time order)"""
+        timestamps = pd.DatetimeIndex(pd.to_datetime(timestamps)).as_unit('ns')
+        prices = np.asarray(prices, dtype=np.float64)
+        labels = {}
+        if len(prices) == 0:
+            return pd.DataFrame({name: np.array([], dtype=np.float64) for name in self.columns()})
+
+        # Gaps in the price series are filled forward so a missing quote never reads as a crash
+        prices = pd.Series(prices).ffill().to_numpy()
+        ns = timestamps.asi8
+        last = ns[-1]
+
+        # Reversed time axis: a trailing window on it is a forward window on the original one
+        reversed_prices = pd.Series(prices[::-1], index=pd.to_datetime(last - ns[::-1]))
+
+        for h in self.horizons:
+            span = pd.Timedelta(days=h)
+            complete = ns + span.value <= last
+
+            forward_min = reversed_prices.rolling(span + pd.Timedelta(1, 'ns'), min_periods=1).min().to_numpy()[::-1]
+            drawdown = np.where(complete, forward_min / prices - 1, np.nan)
+
+            end = np.searchsorted(ns, ns + span.value, side='right') - 1
+            forward_return = np.where(complete, prices[end] / prices - 1, np.nan)
+
+            crash = np.where(np.isnan(drawdown), np.nan, (drawdown <= -self.thresholds[h]).astype(np.float64))
+            labels[f'crash_{h}d'] = crash
+            labels[f'drawdown_{h}d'] = drawdown
+            labels[f'return_{h}d'] = forward_return
+
+        return pd.DataFrame(labels)[self.columns()]
+
+
+def heuristic_crash_targets(vix, reddit, horizons=HORIZONS):
+    """Crash probabilities from VIX and Reddit sentiment, for data without a price history.
+
+    Vectorized form of the original per-row rule: higher VIX and negative sentiment raise
+    the probability, longer horizons scale it up.
+    """
+    vix = np.nan_to_num(np.asarray(vix, dtype=np.float64), nan=20.0)
+    reddit = np.nan_to_num(np.asarray(reddit, dtype=np.float64), nan=0.0)
+
+    base_prob = np.clip((vix - 10) / 50, 0.1, 0.9)
+    sentiment_adj = np.clip(reddit * -10, -0.3, 0.3)  # Negative sentiment increases risk
+
+    targets = {}
+    for h in horizons:
+        time_factor = min(2.0, 1 + (h - 1) * 0.1)
+        targets[f'crash_{h}d'] = np.clip((base_prob + sentiment_adj) * time_factor, 0.05, 0.95)
+    return pd.DataFrame(targets)
@@ -0,0 +1,217 @@
+import json
+import math
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+
+# Models whose predictions are explained per tick
+EXPLAINED_MODELS = ('risk_scorer', 'crash_predictor_1d', 'crash_predictor_3d', 'crash_predictor_7d',
+                    'crash_predictor_14d', 'crash_predictor_30d')
+
+# Upper bound on rows * leaves * path length evaluated at once
+CHUNK_ELEMENTS = 4_000_000
+
+
+class TreeExplainer:
+    """Path-dependent TreeSHAP attributions for a tree ensemble.
+
+    At build time every root-to-leaf path is reduced to its distinct features, each with the
+    interval (lo, hi] the path allows and the fraction of training cover that follows it (z).
+    A leaf then contributes v * (o_j - z_j) * sum_S w(|S|) prod_{k in S} o_k prod_{k not in S} z_k
+    to feature j, where o_k says whether x falls inside feature k's interval. For each leaf
+    that sum comes from the polynomial prod_k (z_k + o_k y), divided by feature j's factor, which
+    takes O(depth^2) operations. Leaves are grouped by path length and evaluated for all leaves
+    and rows at once.
+    """
+
+    def __init__(self, groups, expected_value, n_features):
+        self.groups = groups  # {path length: {'value', 'feature', 'lo', 'hi', 'z'}}
+        self.expected_value = float(expected_value)
+        self.n_features = int(n_features)
+
+    @classmethod
+    def from_model(cls, model):
+        """Explainer for a fitted forest or squared-error boosting model, or None"""
+        if isinstance(model, RandomForestRegressor):
+            trees, scale, offset = model.estimators_, 1.0 / len(model.estimators_), 0.0
+        elif isinstance(model, GradientBoostingRegressor) and model.loss == 'squared_error' and hasattr(model.init_, 'constant_'):
+            trees, scale, offset = model.estimators_[:, 0], model.learning_rate, float(np.ravel(model.init_.constant_)[0])
+        else:
+            return None
+
+        leaves = {}
+        expected_value = offset
+        for estimator in trees:
+            for value, cover, path in _leaf_paths(estimator.tree_):
+                expected_value += value * scale * cover
+                leaves.setdefault(len(path), []).append((value * scale, path))
+
+        groups = {}
+        for depth, items in sorted(leaves.items()):
+            groups[depth] = {
+                'value': np.array([value for value, _ in items], dtype=np.float64),
+                'feature': np.array([[f for f, _, _, _ in path] for _, path in items], dtype=np.intp).reshape(len(items), depth),
+                'lo': np.array([[lo for _, lo, _, _ in path] for _, path in items], dtype=np.float64).reshape(len(items), depth),
+                'hi': np.array([[hi for _, _, hi, _ in path] for _, path in items], dtype=np.float64).reshape(len(items), depth),
+                'z': np.array([[z for _, _, _, z in path] for _, path in items], dtype=np.float64).reshape(len(items), depth)
+            }
+        return cls(groups, expected_value, model.n_features_in_)
+
+    def shap_values(self, X):
+        """Attributions of shape (rows, features); each row sums to prediction - expected_value"""
+        # Thresholds were learned on float32 inputs
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32)).astype(np.float64)
+        phi = np.zeros((len(X), self.n_features))
+        for depth, group in self.groups.items():
+            if depth == 0:
+                continue
+            rows = max(1, CHUNK_ELEMENTS // (len(group['value']) * depth))
+            for start in range(0, len(X), rows):
+                phi[start:start + rows] += self._group_values(X[start:start + rows], depth, group)
+        return phi
+
+    def _group_values(self, X, depth, group):
+        n_rows = len(X)
+        feature, z, value = group['feature'], group['z'], group['value']
+        x = X[:, feature]
+        o = ((x > group['lo']) & (x <= group['hi'])).astype(np.float64)  # (rows, leaves, depth)
+
+        # Coefficients of prod_k (z_k + o_k y), lowest degree first
+        poly = np.zeros(o.shape[:2] + (depth + 1,))
+        poly[..., 0] = 1.0
+        for k in range(depth):
+            shifted = poly[..., :k + 1] * o[..., k, None]
+            poly[..., :k + 1] *= z[:, k, None]
+            poly[..., 1:k + 2] += shifted
+
+        weights = np.array([math.factorial(s) * math.factorial(depth - 1 - s) / math.factorial(depth)
+                            for s in range(depth)])
+        row_offset = (np.arange(n_rows) * self.n_features)[:, None]
+        phi = np.zeros(n_rows * self.n_features)
+        for j in range(depth):
+            z_j = z[:, j]
+            o_j = o[..., j]
+
+            # Feature j outside its interval: its factor is the constant z_j
+            total_out = (poly[..., :depth] @ weights) / z_j
+
+            # Feature j inside: divide by (y + z_j), from the highest coefficient down
+            coefficient = poly[..., depth]
+            total_in = weights[depth - 1] * coefficient
+            for s in range(depth - 1, 0, -1):
+                coefficient = poly[..., s] - z_j * coefficient
+                total_in = total_in + weights[s - 1] * coefficient
+
+            contribution = value * (o_j - z_j) * np.where(o_j > 0, total_in, total_out)
+            phi += np.bincount((row_offset + feature[:, j]).ravel(), contribution.ravel(), minlength=len(phi))
+        return phi.reshape(n_rows, self.n_features)
+
+
+def _leaf_paths(tree):
+    """(leaf value, leaf cover fraction, [(feature, lo, hi, z), ...]) for every leaf"""
+    left, right = tree.children_left, tree.children_right
+    feature, threshold = tree.feature, tree.threshold
+    cover = tree.weighted_n_node_samples
+    value = tree.value.reshape(tree.node_count, -1)[:, 0]
+
+    stack = [(0, {})]
+    while stack:
+        node, conditions = stack.pop()
+        if left[node] == -1:
+            path = [(f, lo, hi, z) for f, (lo, hi, z) in conditions.items()]
+            yield float(value[node]), float(cover[node] / cover[0]), path
+            continue
+
+        f, t = int(feature[node]), float(threshold[node])
+        lo, hi, z = conditions.get(f, (-np.inf, np.inf, 1.0))
+        stack.append((left[node], {**conditions, f: (lo, min(hi, t), z * cover[left[node]] / cover[node])}))
+        stack.append((right[node], {**conditions, f: (max(lo, t), hi, z * cover[right[node]] / cover[node])}))
+
+
+class ExplanationSet:
+    """TreeSHAP explainers for the tick-level models, built once when the models are trained.
+
+    explain() takes one scaled feature row and returns attributions for the requested models;
+    each model's result for the most recent rows is cached, so one market snapshot is only
+    explained once per model however many callers ask for it. Models that are not tree ensembles (an MLP won the selection) have no
+    explainer. Saved next to the compiled models as a single .npz file.
+    """
+
+    def __init__(self, explainers, feature_names, cache_size=32):
+        self.explainers = explainers
+        self.feature_names = list(feature_names)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, models, feature_names):
+        explainers = {}
+        for name in EXPLAINED_MODELS:
+            model = models.get(name)
+            explainer = TreeExplainer.from_model(model) if model is not None else None
+            if explainer is not None:
+                explainers[name] = explainer
+            elif model is not None:
+                logging.info(f"No TreeSHAP explainer for {name} ({type(model).__name__})")
+        return cls(explainers, feature_names)
+
+    def explain(self, x_scaled, model_names=None):
+        """{model name: {'expected_value', 'contributions': {feature: attribution}}} for one row.
+
+        Only the models in model_names (all explained models by default) are computed.
+        """
+        x_scaled = np.asarray(x_scaled, dtype=np.float64).ravel()
+        row = x_scaled.tobytes()
+        names = [name for name in self.explainers if model_names is None or name in model_names]
+
+        explanation, missing = {}, []
+        with self._lock:
+            for name in names:
+                if (row, name) in self._cache:
+                    self._cache.move_to_end((row, name))
+                    explanation[name] = self._cache[(row, name)]
+                else:
+                    missing.append(name)
+
+        for name in missing:
+            explainer = self.explainers[name]
+            values = explainer.shap_values(x_scaled)[0]
+            explanation[name] = {
+                'expected_value': explainer.expected_value,
+                'contributions': dict(zip(self.feature_names, values.tolist()))
+            }
+
+        if missing:
+            with self._lock:
+                for name in missing:
+                    self._cache[(row, name)] = explanation[name]
+                while len(self._cache) > self.cache_size * max(1, len(self.explainers)):
+                    self._cache.popitem(last=False)
+        return {name: explanation[name] for name in names}
+
+    def save(self, path):
+        header = {'feature_names': self.feature_names, 'models': {}}
+        arrays = {}
+        for name, explainer in self.explainers.items():
+            header['models'][name] = {'expected_value': explainer.expected_value, 'n_features': explainer.n_features,
+                                      'depths': sorted(explainer.groups)}
+            for depth, group in explainer.groups.items():
+                for key, array in group.items():
+                    arrays[f'{name}.{depth}.{key}'] = array
+        with open(path, 'wb') as f:
+            np.savez(f, header=np.array(json.dumps(header)), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            header = json.loads(str(data['header']))
+            explainers = {}
+            for name, spec in header['models'].items():
+                groups = {depth: {key: data[f'{name}.{depth}.{key}'] for key in ('value', 'feature', 'lo', 'hi', 'z')}
+                          for depth in spec['depths']}
+                explainers[name] = TreeExplainer(groups, spec['expected_value'], spec['n_features'])
+            return cls(explainers, header['feature_names'])
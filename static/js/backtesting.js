@@ -24,13 +24,15 @@ function runBacktest() {
     // Get form data
     const formData = {
         name: document.getElementById('backtest-name').value,
-        start_date: document.getElementById('start-date').value,
-        end_date: document.getElementById('end-date').value,
-        initial_capital: parseFloat(document.getElementById('initial-capital').value),
-        risk_threshold: parseFloat(document.getElementById('risk-threshold').value)
+        parameters: {
+            start_date: document.getElementById('start-date').value,
+            end_date: document.getElementById('end-date').value,
+            initial_capital: parseFloat(document.getElementById('initial-capital').value),
+            risk_threshold: parseFloat(document.getElementById('risk-threshold').value)
+        }
     };
     
-    // Send request
+    // Queue the backtest, wait for the job, then load the stored result
     fetch('/api/run_backtest', {
         method: 'POST',
         headers: {
@@ -40,15 +42,24 @@ function runBacktest() {
     })
     .then(response => response.json())
     .then(data => {
-        if (data.success) {
-            displayResults(data.results);
-        } else {
-            alert('Error running backtest: ' + data.error);
+        if (!data.success) {
+            throw new Error(data.error);
+        }
+        return waitForJob(data.job_id, job => {
+            btn.innerHTML = `<i data-feather="loader"></i> Running... ${Math.round(job.progress * 100)}%`;
+        });
+    })
+    .then(job => fetch(`/api/backtest_results/${job.result.backtest_result_id}`))
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) {
+            throw new Error(data.error);
         }
+        displayResults(data.backtest_result.results);
     })
     .catch(error => {
         console.error('Error:', error);
-        alert('Error running backtest');
+        alert('Error running backtest: ' + error.message);
     })
     .finally(() => {
         btn.disabled = false;
@@ -58,8 +69,8 @@ function runBacktest() {
 }
 
 function displayResults(results) {
-    document.getElementById('total-return').textContent = results.total_return.toFixed(2) + '%';
+    document.getElementById('total-return').textContent = (results.total_return * 100).toFixed(2) + '%';
     document.getElementById('sharpe-ratio').textContent = results.sharpe_ratio.toFixed(2);
-    document.getElementById('max-drawdown').textContent = results.max_drawdown.toFixed(2) + '%';
-    document.getElementById('num-trades').textContent = results.trades;
+    document.getElementById('max-drawdown').textContent = (results.max_drawdown * 100).toFixed(2) + '%';
+    document.getElementById('num-trades').textContent = results.num_trades;
 }
\ No newline at end of file
@@ -0,0 +1,28 @@
+// Background job polling shared by pages that queue long-running work
+function waitForJob(jobId, onProgress) {
+    return new Promise((resolve, reject) => {
+        function poll() {
+            fetch(`/api/jobs/${jobId}`)
+                .then(response => response.json())
+                .then(data => {
+                    if (!data.success) {
+                        reject(new Error(data.error || 'Job not found'));
+                        return;
+                    }
+                    const job = data.job;
+                    if (job.status === 'completed') {
+                        resolve(job);
+                    } else if (job.status === 'failed' || job.status === 'cancelled') {
+                        reject(new Error(job.error || job.message || job.status));
+                    } else {
+                        if (onProgress) {
+                            onProgress(job);
+                        }
+                        setTimeout(poll, 1000);
+                    }
+                })
+                .catch(reject);
+        }
+        poll();
+    });
+}
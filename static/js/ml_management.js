@@ -24,25 +24,25 @@ function trainModel() {
         model_type: document.getElementById('model-type').value
     };
     
-    // Send request
-    fetch('/api/train_model', {
+    // Queue training and wait for the job to finish
+    fetch('/api/train_ml_model', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
         },
-        body: JSON.stringify(formData)
+        body: JSON.stringify({name: formData.model_name, ...formData})
     })
     .then(response => response.json())
     .then(data => {
-        if (data.success) {
-            displayTrainingResults(data.results);
-        } else {
-            alert('Error training model: ' + data.error);
+        if (!data.success) {
+            throw new Error(data.error);
         }
+        return waitForJob(data.job_id);
     })
+    .then(job => displayTrainingResults(job.result))
     .catch(error => {
         console.error('Error:', error);
-        alert('Error training model');
+        alert('Error training model: ' + error.message);
     })
     .finally(() => {
         btn.disabled = false;
@@ -53,10 +53,9 @@ function trainModel() {
 }
 
 function displayTrainingResults(results) {
-    document.getElementById('model-accuracy').textContent = results.accuracy.toFixed(1) + '%';
-    document.getElementById('model-precision').textContent = results.validation_accuracy.toFixed(1) + '%';
-    document.getElementById('model-recall').textContent = results.training_time.toFixed(1) + 's';
+    const accuracy = results.accuracy * 100;
+    document.getElementById('model-accuracy').textContent = accuracy.toFixed(1) + '%';
     
     // Show success message
-    alert(`Model trained successfully!\nAccuracy: ${results.accuracy.toFixed(1)}%\nTraining Time: ${results.training_time.toFixed(1)}s`);
-}
\ No newline at end of file
+    alert(`Model trained successfully!\nAccuracy: ${accuracy.toFixed(1)}%`);
+}
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Parity checks for the vectorized backtest engine against the original row-by-row loop
+"""
+import os
+import sys
+sys.path.append('.')
+
+import numpy as np
+import pandas as pd
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+from services.backtesting import Backtester
+from services.backtest_sweep import BacktestSweep
+from services.market_replay import MarketReplay
+from services.scenario_engine import ScenarioEngine
+
+
+def reference_backtest(data, initial_capital, risk_threshold):
+    """Day-by-day loop the columnar engine replaced"""
+    calculator = Backtester().risk_calculator
+    cash = initial_capital
+    positions = 0
+    values, scores, trades = [], [], []
+
+    for _, row in data.iterrows():
+        risk_score = calculator.calculate_risk_score(
+            {'spy': row['spy'], 'vix': row['vix'], 'dxy': row['dxy']},
+            {'reddit': row['reddit_sentiment'], 'twitter': row['twitter_sentiment'], 'news': row['news_sentiment']}
+        )['value']
+
+        if risk_score > risk_threshold and positions > 0:
+            cash = positions * row['spy']
+            positions = 0
+            trades.append(('SELL', row['spy']))
+        elif risk_score < risk_threshold * 0.7 and positions == 0:
+            positions = cash / row['spy']
+            cash = 0
+            trades.append(('BUY', row['spy']))
+
+        values.append(cash + positions * row['spy'])
+        scores.append(risk_score)
+
+    values = pd.Series(values)
+    daily_returns = values.pct_change().dropna()
+    volatility = daily_returns.std() * np.sqrt(252)
+    peak = values.expanding().max()
+
+    return {
+        'values': values.to_numpy(),
+        'scores': np.array(scores),
+        'trades': trades,
+        'volatility': volatility,
+        'sharpe_ratio': (daily_returns.mean() * 252) / volatility if volatility > 0 else 0,
+        'max_drawdown': ((values - peak) / peak).min()
+    }
+
+
+def test_vectorized_backtest_matches_reference():
+    backtester = Backtester()
+    data = backtester._generate_historical_data('2020-01-01', '2021-12-31')
+
+    for threshold in (40, 45, 48, 50, 55, 60):
+        expected = reference_backtest(data, 100000, threshold)
+        results = backtester._execute_backtest(data, 100000, threshold)
+
+        np.testing.assert_array_equal(results['portfolio_history']['value'], expected['values'])
+        np.testing.assert_array_equal(results['portfolio_history']['risk_score'], expected['scores'])
+        assert list(zip(results['trades']['action'], results['trades']['price'])) == expected['trades']
+        assert results['final_value'] == expected['values'][-1]
+        assert results['max_drawdown'] == expected['max_drawdown']
+        assert np.isclose(results['volatility'], expected['volatility'], rtol=1e-12)
+        assert np.isclose(results['sharpe_ratio'], expected['sharpe_ratio'], rtol=1e-12)
+
+
+def test_serialized_results_are_plain_lists():
+    backtester = Backtester()
+    results = backtester.run_backtest({'start_date': '2022-01-01', 'end_date': '2022-03-31', 'risk_threshold': 50})
+    serialized = backtester.serialize_results(results)
+
+    assert isinstance(serialized['portfolio_history']['value'], list)
+    assert serialized['portfolio_history']['date'][0] == '2022-01-01T00:00:00'
+    assert len(serialized['trades']['action']) == serialized['num_trades']
+
+
+def test_sweep_rows_match_single_backtests():
+    parameters = {
+        'start_date': '2020-01-01',
+        'end_date': '2021-12-31',
+        'risk_threshold': {'start': 45, 'stop': 55, 'step': 2.5},
+        'reentry_ratio': [0.7, 0.9],
+        'weights': {'vix': [0.2, 0.3]}
+    }
+    serial = BacktestSweep(max_workers=1).run_sweep(parameters)
+    parallel = BacktestSweep(max_workers=2)
+    parallel.min_parallel_combinations = 0
+
+    assert serial['combinations'] == 20
+    assert parallel.run_sweep(parameters)['ranking'] == serial['ranking']
+
+    backtester = Backtester()
+    data = backtester._generate_historical_data('2020-01-01', '2021-12-31')
+    for row in serial['ranking'][:3]:
+        results = backtester._execute_backtest(data, 100000, row['risk_threshold'], row['reentry_ratio'], row['weights'])
+        assert results['final_value'] == row['final_value']
+        assert results['num_trades'] == row['num_trades']
+
+
+def test_concurrent_local_sweeps_keep_their_own_data():
+    early = {'start_date': '2020-01-01', 'end_date': '2020-12-31', 'risk_threshold': [45, 50], 'reentry_ratio': [0.8]}
+    late = {'start_date': '2022-01-01', 'end_date': '2023-12-31', 'risk_threshold': [45, 50], 'reentry_ratio': [0.8]}
+    expected = [BacktestSweep(max_workers=1).run_sweep(p)['ranking'] for p in (early, late)]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(BacktestSweep(max_workers=1).run_sweep, p) for p in (early, late) * 4]
+    assert [f.result()['ranking'] for f in futures] == expected * 4
+
+
+def test_sweep_rejects_unknown_rank_metric():
+    with pytest.raises(ValueError):
+        BacktestSweep(max_workers=1).run_sweep({'risk_threshold': [50], 'rank_by': 'profit'})
+
+
+@pytest.mark.parametrize('parameters', [
+    {'risk_threshold': {'start': 40, 'stop': 60, 'step': 0}},
+    {'risk_threshold': {'start': 40, 'stop': 60, 'step': -5}},
+    {'reentry_ratio': {'start': 0.9, 'stop': 0.5, 'step': 0.1}},
+    {'reentry_ratio': {'stop': 0.9}},
+    {'risk_threshold': []},
+    {'weights': {'vix': [0.2, 0.3], 'volatility': [0.1]}},
+    {'weights': {'vix': {'start': 0.1, 'stop': 0.3, 'step': 0}}},
+])
+def test_sweep_rejects_bad_grids(parameters):
+    sweep = BacktestSweep(max_workers=1)
+    with pytest.raises(ValueError):
+        sweep.expand_grid(parameters)
+    with pytest.raises(ValueError):
+        sweep.run_sweep(parameters)
+
+
+def test_sweep_expands_ranges_and_known_weights():
+    rank_by, thresholds, reentry_ratios, weight_sets = BacktestSweep(max_workers=1).expand_grid({
+        'risk_threshold': {'start': 40, 'stop': 50, 'step': 5},
+        'reentry_ratio': 0.7,
+        'weights': {'vix': [0.2, 0.3], 'credit': {'start': 0.1, 'stop': 0.2, 'step': 0.1}}
+    })
+    assert rank_by == 'sharpe_ratio'
+    assert thresholds == [40.0, 45.0, 50.0] and reentry_ratios == [0.7]
+    assert weight_sets == [{'vix': 0.2, 'credit': 0.1}, {'vix': 0.2, 'credit': 0.2},
+                           {'vix': 0.3, 'credit': 0.1}, {'vix': 0.3, 'credit': 0.2}]
+
+
+def test_replay_aligns_cached_series(tmp_path):
+    replay = MarketReplay(store_dir=str(tmp_path))
+    days = np.arange(np.datetime64('2021-01-01'), np.datetime64('2021-01-11'))
+    trading_days = days[np.isin((days.astype(int) + 3) % 7, [0, 1, 2, 3, 4])]
+
+    replay._merge('bars_spy', trading_days, np.linspace(400, 410, len(trading_days)))
+    replay._merge('bars_vix', days[::2], np.arange(len(days[::2]), dtype=float) + 20)
+    replay._merge('obs_news_sentiment', days[5:6], np.array([-0.2]))
+
+    data = replay.load('2021-01-04', '2021-01-08', sync_observations=False)
+
+    assert list(data['date'].dt.strftime('%Y-%m-%d')) == [str(d) for d in trading_days if '2021-01-04' <= str(d) <= '2021-01-08']
+    np.testing.assert_array_equal(data['vix'], [21, 22, 22, 23, 23])
+    np.testing.assert_array_equal(data['news_sentiment'], [0, 0, -0.2, -0.2, -0.2])
+    assert (data['dxy'] == 100).all()
+
+    # Later writes win on overlapping dates; a series mapped before the write keeps its snapshot
+    before = replay._read('bars_vix')
+    replay._merge('bars_vix', days[4:5], np.array([35.0]))
+    assert replay.load('2021-01-05', '2021-01-05', sync_observations=False)['vix'].iloc[0] == 35
+    assert len(before[0]) == 5 and 35 not in before[1]
+
+    # Each series is a single file, so one rename publishes dates and values together
+    assert sorted(os.listdir(tmp_path)) == ['bars_spy.npy', 'bars_vix.npy', 'obs_news_sentiment.npy']
+
+
+def test_scenario_strategy_matches_single_path_backtest():
+    engine = ScenarioEngine()
+    paths = engine.generate_paths(3, 300, np.random.default_rng(7))
+    metrics = engine._run_strategy(paths, 100000, 50, 0.7, None)
+
+    backtester = Backtester()
+    for i in range(3):
+        risk_scores = backtester.risk_calculator.calculate_risk_score_array(
+            {name: paths[name][i] for name in ('spy', 'vix', 'dxy')},
+            {name: paths[name][i] for name in ('reddit', 'twitter', 'news')}
+        )
+        _, trade_idx, values = backtester._simulate(paths['spy'][i], risk_scores, 100000, 50)
+        assert metrics['num_trades'][i] == len(trade_idx)
+        assert np.isclose(metrics['total_return'][i], values[-1] / 100000 - 1, rtol=1e-9)
+        assert np.isclose(metrics['max_drawdown'][i], backtester._calculate_max_drawdown(values), rtol=1e-9)
+
+
+if __name__ == "__main__":
+    test_vectorized_backtest_matches_reference()
+    test_serialized_results_are_plain_lists()
+    test_sweep_rows_match_single_backtests()
+    test_scenario_strategy_matches_single_path_backtest()
+    print("Backtest parity checks passed!")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test that the compiled inference artifact matches sklearn predictions
+"""
+import sys
+sys.path.append('.')
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.neural_network import MLPRegressor
+from sklearn.preprocessing import RobustScaler
+from sklearn.svm import SVR
+
+from services.compiled_models import CompiledEnsemble
+
+
+def _fitted_models():
+    rng = np.random.default_rng(7)
+    X = rng.normal(size=(400, 12)) * rng.uniform(0.5, 20, 12)
+    y = 0.3 * X[:, 0] - np.abs(X[:, 1]) + np.sin(X[:, 2]) + rng.normal(0, 0.1, 400)
+    scaler = RobustScaler().fit(X)
+    X_scaled = scaler.transform(X)
+    models = {
+        'forest': RandomForestRegressor(n_estimators=30, max_depth=10, random_state=0).fit(X_scaled, y),
+        'boosting': GradientBoostingRegressor(n_estimators=40, max_depth=6, random_state=0).fit(X_scaled, y),
+        'mlp': MLPRegressor(hidden_layer_sizes=(32, 16), max_iter=300, random_state=0).fit(X_scaled, y),
+        'svr': SVR().fit(X_scaled, y),
+        'untrained': None
+    }
+    return models, scaler, rng.normal(size=(250, 12)) * 15
+
+
+def test_compiled_predictions_match_sklearn(tmp_path):
+    models, scaler, X_test = _fitted_models()
+    compiled = CompiledEnsemble.compile(models, scaler)
+    assert set(compiled.predictors) == {'forest', 'boosting', 'mlp'}
+    assert set(compiled.fallbacks) == {'svr'}
+
+    expected = {name: model.predict(scaler.transform(X_test)) for name, model in models.items() if model is not None}
+    batch = compiled.predict_batch(X_test)
+    for name, values in expected.items():
+        assert np.allclose(batch[name], values, rtol=0, atol=1e-9)
+
+    for i in range(40):
+        single = compiled.predict(X_test[i])
+        for name, values in expected.items():
+            assert abs(single[name] - values[i]) <= 1e-9
+
+    # Missing values follow each tree's learned direction, as in sklearn's forests
+    X_missing = X_test[:20].copy()
+    X_missing[::2, 3] = np.nan
+    assert np.allclose(compiled.predictors['forest'].predict(compiled.transform(X_missing)),
+                       models['forest'].predict(scaler.transform(X_missing)), rtol=0, atol=1e-9)
+
+    # The saved artifact holds only the compiled models and reproduces them exactly
+    path = tmp_path / 'compiled.npz'
+    compiled.save(path)
+    loaded = CompiledEnsemble.load(path)
+    assert set(loaded.predictors) == {'forest', 'boosting', 'mlp'}
+    reloaded = loaded.predict_batch(X_test)
+    for name in ('forest', 'boosting', 'mlp'):
+        assert np.array_equal(reloaded[name], batch[name])
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, '-q']))
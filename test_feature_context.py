@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test publishing the per-tick feature context and reading it from another process
+"""
+import sys
+import subprocess
+sys.path.append('.')
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.feature_context import SharedFeatureContext
+from services.ml_risk_scorer import MLRiskScorer
+
+CONTEXT = {
+    'technical': {'rsi_14': 41.0, 'volatility_20d': 0.24},
+    'sector': {'xlf_5d_return': -0.02},
+    'economic': {'fed_funds_rate': 5.0, 'cpi_yoy': np.float64(3.0)},
+    'breadth': {'small_large_ratio': 0.8},
+    'options': {'vix_level': 22.0, 'vix_term_structure': 1.1}
+}
+
+
+def test_publish_and_attach(tmp_path):
+    path = str(tmp_path / 'context')
+    writer, reader = SharedFeatureContext(path), SharedFeatureContext(path)
+    assert reader.attach() is None
+
+    features = pd.Series([440.0, 22.0, 0.5], index=['spy_price', 'vix', 'bb_position'])
+    assert writer.publish(CONTEXT, {'spy': 440.0}, {'reddit': -0.1}, features) == 1
+    snapshot = reader.attach()
+    assert snapshot.context == {group: {k: float(v) for k, v in values.items()} for group, values in CONTEXT.items()}
+    assert snapshot.features.equals(features)
+    assert snapshot.market_data == {'spy': 440.0}
+    assert not snapshot.values.flags.writeable  # A view into the mapping, not a copy
+    assert reader.attach() is snapshot  # Not remapped until the next publish
+
+    writer.publish({**CONTEXT, 'breadth': {'small_large_ratio': 1.2}})
+    latest = reader.attach()
+    assert latest.sequence == 2 and latest.features is None
+    assert latest.context['breadth'] == {'small_large_ratio': 1.2}
+    assert snapshot.features['vix'] == 22.0  # The old mapping stays intact after the file is replaced
+
+    script = (f"from services.feature_context import SharedFeatureContext; "
+              f"print(SharedFeatureContext({path!r}).attach().context['breadth']['small_large_ratio'])")
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == '1.2'
+
+
+def test_scorer_uses_fresh_shared_context(tmp_path):
+    scorer = MLRiskScorer()
+    scorer.shared_context = SharedFeatureContext(str(tmp_path / 'context'))
+    built = []
+    scorer.build_feature_context = lambda lookback_days=252: built.append(1) or {**CONTEXT, 'breadth': {}}
+
+    scorer.shared_context.publish(CONTEXT)
+    assert scorer.get_feature_context(max_age=60)['options']['vix_level'] == 22.0
+    assert not built
+
+    assert scorer.get_feature_context(max_age=-1)['breadth'] == {}  # Too old: built locally
+    assert built == [1]
+
+
+
+def test_context_fetches_each_symbol_once(tmp_path):
+    scorer = MLRiskScorer()
+    calls = []
+
+    def history(symbol, days):
+        calls.append(symbol)
+        rows = 260 if symbol == 'SPY' else 25
+        index = pd.bdate_range(end='2026-10-16', periods=rows)
+        close = 100 + np.arange(rows, dtype=float) * (0.5 if symbol == 'IWM' else 0.1)
+        return pd.DataFrame({'Close': close, 'Volume': np.full(rows, 1e6)}, index=index)
+
+    scorer._get_historical_data = history
+    context = scorer.build_feature_context()
+
+    assert sorted(calls) == sorted(set(calls)) and 'SPY' in calls
+    assert len(context['sector']) == 10
+    closes = history('XLF', 14)['Close']
+    assert context['sector']['xlf_5d_return'] == pytest.approx(closes.pct_change(4).iloc[-1])
+    spy, iwm = history('SPY', 0)['Close'].tail(20), history('IWM', 0)['Close'].tail(20)
+    assert context['breadth']['small_large_ratio'] == pytest.approx(
+        iwm.pct_change(19).iloc[-1] / spy.pct_change(19).iloc[-1])
+    assert context['technical']['sma_200'] == pytest.approx(history('SPY', 0)['Close'].tail(200).mean())
+
+    scorer._get_historical_data = lambda symbol, days: pd.DataFrame()
+    assert scorer.build_feature_context()['sector'] == {}
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, '-q']))
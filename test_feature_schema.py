@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test that feature vectors always follow the declared schema
+"""
+import sys
+sys.path.append('.')
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import RobustScaler
+
+from services.feature_schema import FEATURE_SCHEMA, FeatureSchemaError
+from services.ml_risk_scorer import MLRiskScorer
+
+FULL_CONTEXT = {
+    'technical': {'rsi_14': 41.0, 'volatility_20d': 0.24, 'volume_ratio': 1.3},
+    'sector': {'xlf_5d_return': -0.02, 'xlk_5d_return': 0.01},
+    'economic': {'fed_funds_rate': 5.25},
+    'breadth': {'small_large_ratio': 0.8},
+    'options': {'vix_level': 22.0, 'vix_term_structure': 1.1}
+}
+MARKET = {'spy': 500.0, 'vix': 25.0, 'dxy': 104.0, 'ten_year': 4.2}
+SENTIMENT = {'reddit': -0.1, 'news': 0.05}
+
+
+def test_layout_is_fixed_when_fetches_fail():
+    scorer = MLRiskScorer()
+    partial = {**FULL_CONTEXT, 'technical': {'rsi_14': float('nan')}, 'sector': {}, 'economic': None}
+    full = scorer.engineer_features(MARKET, SENTIMENT, context=FULL_CONTEXT)
+    degraded = scorer.engineer_features(MARKET, SENTIMENT, context=partial)
+
+    assert tuple(full.index) == tuple(degraded.index) == FEATURE_SCHEMA.names
+    index = FEATURE_SCHEMA.index
+    assert degraded.iloc[index['rsi_14']] == 50.0  # NaN falls back to the default
+    assert degraded.iloc[index['volume_ratio']] == 1.0
+    assert degraded.iloc[index['vix_level']] == full.iloc[index['vix_level']] == 22.0
+    assert full.iloc[index['sentiment_volatility_interaction']] == pytest.approx((-0.1 + 0.05) / 3 * 0.24)
+
+    vector = scorer.engineer_vector(MARKET, SENTIMENT, context=FULL_CONTEXT)
+    assert vector.dtype == np.float64 and np.array_equal(vector, full.to_numpy())
+    matrix = scorer.engineer_feature_matrix([{'market_data': MARKET, 'sentiment_data': SENTIMENT}], FULL_CONTEXT)
+    assert np.array_equal(matrix.to_numpy()[0], vector)
+
+
+def test_snapshot_columns_match_scenario_dicts():
+    scorer = MLRiskScorer()
+    frame = pd.DataFrame({'market_spy': [500.0, np.nan], 'market_vix': [25.0, 30.0], 'market_dxy': [104.0, 101.0],
+                          'sentiment_reddit': [-0.1, np.nan], 'sentiment_news': [0.05, 0.2]})
+    scenarios = [{'market_data': {'spy': 500.0, 'vix': 25.0, 'dxy': 104.0}, 'sentiment_data': {'reddit': -0.1, 'news': 0.05}},
+                 {'market_data': {'vix': 30.0, 'dxy': 101.0}, 'sentiment_data': {'news': 0.2}}]
+    columns = scorer.engineer_column_matrix(frame, FULL_CONTEXT)
+    assert columns.equals(scorer.engineer_feature_matrix(scenarios, FULL_CONTEXT))
+
+
+def test_models_with_another_layout_are_not_used():
+    scorer = MLRiskScorer()
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(60, len(FEATURE_SCHEMA)))
+    scorer.scalers['features'] = RobustScaler().fit(X)
+    scorer.models['risk_scorer'] = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, X[:, 0] * 10 + 50)
+    scorer.feature_names = list(FEATURE_SCHEMA.names)
+    features = scorer.engineer_features(MARKET, SENTIMENT, context=FULL_CONTEXT)
+    assert scorer.predict_market_risks(MARKET, SENTIMENT, features=features)['confidence_score'] != 0.3
+
+    scorer.feature_names = list(FEATURE_SCHEMA.names[::-1])
+    assert not scorer.schema_matches()
+    assert scorer.predict_market_risks(MARKET, SENTIMENT, features=features)['confidence_score'] == 0.3  # Fallback
+    with pytest.raises(FeatureSchemaError):
+        scorer.predict_batch([{'market_data': MARKET, 'sentiment_data': SENTIMENT}], FULL_CONTEXT)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, '-q']))
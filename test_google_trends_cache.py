@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test the Google Trends refresh cadence, 429 backoff and cached reads
+"""
+import sys
+sys.path.append('.')
+
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from services.google_trends import GoogleTrendsCache, TREND_KEYWORDS
+
+NOW = datetime(2026, 6, 1, 12)
+
+
+class TooManyRequestsError(Exception):
+    pass
+
+
+class FakeTrendReq:
+    calls = 0
+    fail = False
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def build_payload(self, kw_list, **kwargs):
+        self.keywords = kw_list
+
+    def interest_over_time(self):
+        FakeTrendReq.calls += 1
+        if FakeTrendReq.fail:
+            raise TooManyRequestsError('The request failed: Google returned a response with code 429')
+        values = {k: [10.0, 20.0] for k in self.keywords}
+        values['bull market'] = [50.0, 80.0]
+        return pd.DataFrame(values, index=pd.date_range(NOW - timedelta(hours=1), periods=2, freq='h'))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    FakeTrendReq.calls, FakeTrendReq.fail = 0, False
+    return GoogleTrendsCache(str(tmp_path / 'trends.json'), refresh_minutes=60, client_factory=FakeTrendReq)
+
+
+def test_refreshes_on_its_own_cadence(cache):
+    assert cache.sentiment() == 0.0 and cache.age() is None
+    assert cache.refresh(NOW)
+    assert not cache.refresh(NOW + timedelta(minutes=30))
+    assert FakeTrendReq.calls == 1
+
+    expected = (80 - (20 * 0.4 + 20 * 0.3 + 20 * 0.3 + 20 * 0.2)) / 100 * 0.3
+    assert cache.sentiment() == pytest.approx(expected)
+    assert list(cache.interest_over_time().columns) == TREND_KEYWORDS
+
+    # Another process (or a restart) reads the same series from disk
+    reader = GoogleTrendsCache(cache.path)
+    assert reader.sentiment() == pytest.approx(expected)
+    assert reader.age(NOW + timedelta(minutes=10)) == timedelta(minutes=10)
+
+    assert cache.refresh(NOW + timedelta(minutes=61))
+    assert FakeTrendReq.calls == 2
+
+
+def test_backs_off_exponentially_on_429(cache):
+    cache.refresh(NOW)
+    FakeTrendReq.fail = True
+    now = NOW + timedelta(minutes=61)
+    delays = []
+    for _ in range(4):
+        assert not cache.refresh(now)
+        retry_at = datetime.fromisoformat(cache._load()['retry_at'])
+        delays.append((retry_at - now).total_seconds() / 60)
+        assert not cache.refresh(retry_at - timedelta(seconds=1))  # Still backing off: no call
+        now = retry_at
+    assert FakeTrendReq.calls == 5
+    for base, delay in zip([5, 10, 20, 40], delays):
+        assert base <= delay <= base * 1.25
+
+    # The last good series is still served, and success resets the backoff
+    assert cache.sentiment() > 0
+    FakeTrendReq.fail = False
+    assert cache.refresh(now)
+    assert cache._load()['failures'] == 0
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test the background job queue: job lifecycle, progress, cancellation, failures, and
+that recovery only fails jobs whose owning process is gone
+"""
+import os
+import sys
+import tempfile
+sys.path.append('.')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'jobs.db')}"
+
+import time
+import threading
+import subprocess
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import app, db
+from models import BackgroundJob, BacktestResult
+from services.job_queue import JobQueue, HOSTNAME, PROCESS_OWNER
+
+
+def _state(queue, job_id):
+    with app.app_context():  # Fresh session, so every read sees the workers' commits
+        return queue.get(job_id)
+
+
+def _wait_for(queue, job_id, condition, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        state = _state(queue, job_id)
+        if condition(state):
+            return state
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} never reached the expected state: {_state(queue, job_id)}")
+
+
+def _finished(state):
+    return state['status'] in ('completed', 'failed', 'cancelled')
+
+
+def _blocking_handler(started, release):
+    def handler(parameters, progress):
+        progress(0.5, 'Halfway')
+        started.set()
+        while not release.wait(0.05):
+            progress(0.5)  # Keeps checking for cancellation like the real services do
+        return {'value': parameters.get('value')}
+    return handler
+
+
+def test_job_runs_reports_progress_and_completes():
+    queue = JobQueue(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+    queue.handlers['backtest'] = _blocking_handler(started, release)
+
+    job_id = queue.submit('backtest', {'value': 7})
+    assert started.wait(30)
+    running = _state(queue, job_id)
+    assert running['status'] == 'running'
+    assert running['progress'] == 0.5 and running['message'] == 'Halfway'
+    assert running['started_at'] is not None and running['finished_at'] is None
+
+    release.set()
+    done = _wait_for(queue, job_id, _finished)
+    assert done['status'] == 'completed'
+    assert done['progress'] == 1.0 and done['message'] == 'Completed'
+    assert done['result'] == {'value': 7} and done['error'] is None
+    assert done['finished_at'] is not None
+
+
+def test_cancel_queued_and_running_jobs():
+    queue = JobQueue(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+    queue.handlers['backtest'] = _blocking_handler(started, release)
+
+    running_id = queue.submit('backtest', {})
+    assert started.wait(30)
+    queued_id = queue.submit('backtest', {})  # The only worker is busy
+
+    cancelled = queue.cancel(queued_id)
+    assert cancelled['status'] == 'cancelled' and cancelled['message'] == 'Cancelled before start'
+
+    requested = queue.cancel(running_id)
+    assert requested['status'] == 'running' and requested['message'] == 'Cancellation requested'
+    stopped = _wait_for(queue, running_id, _finished)
+    assert stopped['status'] == 'cancelled' and stopped['result'] is None
+
+    # The queued job never starts once the worker frees up
+    queue.executor.shutdown(wait=True)
+    never_run = _state(queue, queued_id)
+    assert never_run['status'] == 'cancelled' and never_run['started_at'] is None
+    assert not release.is_set()
+
+
+def test_failed_job_persists_error():
+    queue = JobQueue(max_workers=1)
+
+    def failing(parameters, progress):
+        progress(0.25, 'About to fail')
+        raise ValueError('bad parameters')
+
+    queue.handlers['backtest'] = failing
+    state = _wait_for(queue, queue.submit('backtest', {}), _finished)
+    assert state['status'] == 'failed' and state['message'] == 'Failed'
+    assert state['error'] == 'bad parameters'
+    assert state['progress'] == 0.25 and state['result'] is None
+
+
+def test_backtest_job_writes_result_row():
+    queue = JobQueue(max_workers=1)
+    parameters = {'name': 'Queue test', 'parameters': {'initial_capital': 50000}}
+    state = _wait_for(queue, queue.submit('backtest', parameters), _finished)
+    assert state['status'] == 'completed', state['error']
+
+    result = state['result']
+    with app.app_context():
+        row = db.session.get(BacktestResult, result['backtest_result_id'])
+        assert row is not None and row.name == 'Queue test'
+        assert row.parameters == {'initial_capital': 50000}
+        assert row.results['final_value'] == result['final_value']
+        assert row.results['num_trades'] == result['num_trades']
+        assert row.performance_metrics
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def test_recovery_spares_live_owners():
+    now = datetime.utcnow()
+    owners = {
+        'mine': (PROCESS_OWNER, now - timedelta(hours=1)),
+        'live_worker': (f'{HOSTNAME}:{os.getppid()}:abcd1234', now),
+        'other_host': ('elsewhere:12345:abcd1234', now),
+        'dead_worker': (f'{HOSTNAME}:{_dead_pid()}:abcd1234', now),
+        'stale_heartbeat': ('elsewhere:12345:abcd1234', now - timedelta(hours=1)),
+        'legacy': (None, None)
+    }
+    with app.app_context():
+        BackgroundJob.query.delete()  # Only the jobs below
+        for name, (owner, heartbeat_at) in owners.items():
+            db.session.add(BackgroundJob(job_type='backtest', status='running', message=name,
+                                         owner=owner, heartbeat_at=heartbeat_at))
+        db.session.commit()
+
+        assert JobQueue(max_workers=1).recover_interrupted(now) == 3
+        status = {job.message: job.status for job in BackgroundJob.query.all()}
+        assert status == {'mine': 'running', 'live_worker': 'running', 'other_host': 'running',
+                          'dead_worker': 'failed', 'stale_heartbeat': 'failed', 'legacy': 'failed'}
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test the shared keyword sentiment scorer
+"""
+import sys
+sys.path.append('.')
+
+import time
+
+import numpy as np
+import pytest
+
+from services.keyword_sentiment import KeywordSentimentScorer, keyword_sentiment
+
+
+def test_whole_words_only():
+    scores = keyword_sentiment.score_texts([
+        'Analysts follow support levels',   # no 'low' / 'up'
+        'Stocks move up',
+        'Market slides lower'
+    ])['scores']
+    assert scores[0] == 0.0
+    assert scores[1] > 0 and scores[2] < 0
+
+
+def test_terms_count_once_and_scores_are_capped():
+    scorer = KeywordSentimentScorer({'crash': -0.1, 'sell-off': -0.2, 'sell': -0.05}, cap=0.25)
+    scored = scorer.score_texts(['Crash crash CRASH', 'A sell-off', 'crash, sell-off and sell', None])
+    assert np.allclose(scored['scores'], [-0.1, -0.2, -0.25, 0.0])
+    assert scored['count'] == 4 and scored['negative'] == 3 and scored['positive'] == 0
+    assert scored['average'] == pytest.approx(-0.55 / 4)
+
+
+def test_documents_do_not_bleed_into_each_other():
+    scorer = KeywordSentimentScorer({'record high': 0.1})
+    assert np.allclose(scorer.score_texts(['new record', 'high hopes'])['scores'], [0.0, 0.0])
+    assert keyword_sentiment.score_texts([])['average'] == 0.0
+
+
+def test_batch_matches_per_document_scoring():
+    headlines = ['S&P 500 rallies to a record high as tech gains', 'Recession fears drive a sell-off',
+                 'Oil prices fell while bonds rose', 'Fed holds rates steady'] * 500
+    start = time.perf_counter()
+    batch = keyword_sentiment.score_texts(headlines)['scores']
+    assert time.perf_counter() - start < 1.0
+    assert np.allclose(batch, [keyword_sentiment.score_texts([h])['scores'][0] for h in headlines[:4]] * 500)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, '-q']))
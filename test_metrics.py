@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test the in-process metrics registry and its text exposition
+"""
+import sys
+sys.path.append('.')
+
+import pytest
+from services.metrics import MetricsRegistry, timed, instrumented, stage_failed, STAGE_SECONDS, STAGE_ERRORS
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('demo_seconds', 'Demo latency.', ('stage',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, stage='fetch')
+
+    text = registry.render()
+    assert '# TYPE demo_seconds histogram' in text
+    assert 'demo_seconds_bucket{stage="fetch",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="fetch",le="1.0"} 3' in text
+    assert 'demo_seconds_bucket{stage="fetch",le="+Inf"} 4' in text
+    assert 'demo_seconds_sum{stage="fetch"} 4.05' in text
+    assert 'demo_seconds_count{stage="fetch"} 4' in text
+
+
+def test_timed_counts_errors_and_still_records_duration():
+    _, before = STAGE_SECONDS.snapshot(stage='test_stage')
+    with pytest.raises(RuntimeError):
+        with timed('test_stage'):
+            raise RuntimeError('boom')
+
+    assert STAGE_SECONDS.snapshot(stage='test_stage')[1] == before + 1
+    assert STAGE_ERRORS.value(stage='test_stage') == 1
+
+
+def test_swallowed_failures_count_against_the_innermost_stage():
+    @instrumented('test_collector')
+    def collector():
+        try:
+            raise ConnectionError('upstream down')
+        except Exception:
+            stage_failed()
+            return 0.0
+
+    with timed('test_cycle'):
+        assert collector() == 0.0
+    assert STAGE_ERRORS.value(stage='test_collector') == 1
+    assert STAGE_ERRORS.value(stage='test_cycle') == 0
+
+    stage_failed()  # Outside any stage: nothing to count
+    assert STAGE_ERRORS.value(stage='test_collector') == 1
+
+
+if __name__ == "__main__":
+    test_histogram_renders_cumulative_buckets()
+    test_timed_counts_errors_and_still_records_duration()
+    test_swallowed_failures_count_against_the_innermost_stage()
+    print("✅ Metrics tests passed")
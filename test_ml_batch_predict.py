@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test batched ML predictions against the single-scenario path
+"""
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.preprocessing import RobustScaler
+
+from services.ml_risk_scorer import MLRiskScorer
+from services.feature_context import SharedFeatureContext
+
+CONTEXT = {
+    'technical': {'rsi_14': 41.0, 'sma_20': 552.0, 'volatility_20d': 0.24, 'momentum_5d': -0.012},
+    'sector': {'xlf_5d_return': -0.02, 'xlk_5d_return': 0.01},
+    'economic': {'fed_funds_rate': 5.0, 'unemployment_rate': 4.1, 'cpi_yoy': 3.0, 'real_gdp_growth': 2.0},
+    'breadth': {'small_large_ratio': 0.8},
+    'options': {'vix_level': 22.0, 'vix_term_structure': 1.1}
+}
+
+
+def _scorer(compiled):
+    scorer = MLRiskScorer()
+    scorer.build_feature_context = lambda lookback_days=252: CONTEXT
+    scorer.shared_context = SharedFeatureContext(os.path.join(tempfile.mkdtemp(), 'unpublished'))
+
+    rng = np.random.default_rng(3)
+    training = [{'market_data': {'spy': rng.normal(500, 30), 'vix': rng.uniform(10, 50), 'dxy': rng.normal(100, 4)},
+                 'sentiment_data': {'reddit': rng.normal(0, 0.1), 'news': rng.normal(0, 0.1)}} for _ in range(300)]
+    X = scorer.engineer_feature_matrix(training, CONTEXT).to_numpy()
+    scaler = RobustScaler().fit(X)
+    X_scaled = scaler.transform(X)
+    vix = X[:, 1]
+    scorer.scalers['features'] = scaler
+    scorer.models['crash_predictor_1d'] = RandomForestRegressor(n_estimators=20, max_depth=6, random_state=0).fit(X_scaled, vix / 60)
+    scorer.models['crash_predictor_7d'] = GradientBoostingRegressor(n_estimators=20, random_state=0).fit(X_scaled, vix / 50)
+    scorer.models['risk_scorer'] = RandomForestRegressor(n_estimators=20, max_depth=6, random_state=0).fit(X_scaled, vix * 2)
+    if compiled:
+        scorer._compile_models()
+    return scorer
+
+
+def test_batch_matches_single_predictions():
+    scenarios = [
+        {'market_data': {'spy': 480 + i, 'vix': 12 + i * 0.7, 'dxy': 101, 'ten_year': 4.2}, 'sentiment_data': {'reddit': -0.01 * i}}
+        for i in range(40)
+    ]
+    scenarios.append({'market_data': {'vix': 35}, 'sentiment_data': {}})  # Defaults fill missing inputs
+    scenarios.append({})
+
+    for compiled in (False, True):
+        scorer = _scorer(compiled)
+        assert (scorer.compiled is not None) == compiled
+        batch = scorer.predict_batch(scenarios, CONTEXT)
+        assert all(len(values) == len(scenarios) for values in batch.values())
+
+        for i, scenario in enumerate(scenarios):
+            single = scorer.predict_market_risks(scenario.get('market_data', {}), scenario.get('sentiment_data', {}))
+            for key, values in batch.items():
+                assert abs(values[i] - single[key]) <= 1e-9, (key, i)
+
+    # Without trained models every scenario gets the rule-based fallback
+    fallback = MLRiskScorer().predict_batch(scenarios[:3])
+    assert fallback['confidence_score'] == [0.3, 0.3, 0.3]
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test versioned publishing, rollback and garbage collection of model artifacts
+"""
+import os
+import sys
+sys.path.append('.')
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import RobustScaler
+
+from services.model_store import ModelStore
+
+
+def _writer(content):
+    def write(directory):
+        with open(os.path.join(directory, 'model.bin'), 'w') as f:
+            f.write(content)
+    return write
+
+
+def test_publish_activate_and_gc(tmp_path):
+    store = ModelStore(str(tmp_path), keep=2)
+    assert store.current_version() is None and store.version_dir() is None
+
+    first = store.publish(_writer('a'))
+    assert store.current_version() == first
+    assert open(os.path.join(store.version_dir(), 'model.bin')).read() == 'a'
+    assert store.publish(_writer('a')) == first  # Same content, same version
+
+    versions = [first] + [store.publish(_writer(content)) for content in 'bcd']
+    assert store.current_version() == versions[-1]
+    assert store.versions() == versions[1:]  # Current plus the two newest others
+
+    store.activate(versions[1])
+    assert open(os.path.join(store.version_dir(), 'model.bin')).read() == 'b'
+
+    with open(os.path.join(store.version_dir(versions[2]), 'model.bin'), 'w') as f:
+        f.write('tampered')
+    assert not store.verify(versions[2])
+    with pytest.raises(ValueError):
+        store.activate(versions[2])
+    assert store.current_version() == versions[1]
+
+
+def test_failed_publish_keeps_current_version(tmp_path):
+    store = ModelStore(str(tmp_path))
+    version = store.publish(_writer('good'))
+
+    def broken(directory):
+        _writer('half')(directory)
+        raise IOError('disk full')
+
+    with pytest.raises(IOError):
+        store.publish(broken)
+    assert store.current_version() == version
+    assert store.versions() == [version]
+    assert not [name for name in os.listdir(store.versions_dir) if name.startswith('.staging-')]
+
+
+def test_scorer_round_trip_through_store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from services.ml_risk_scorer import MLRiskScorer, REPLAY_BUFFER_FILE
+    from services.online_learning import ReplayBuffer
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(100, 3))
+    scorer = MLRiskScorer()
+    scorer.scalers['features'] = RobustScaler().fit(X)
+    scorer.models['risk_scorer'] = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, X[:, 0])
+    scorer.feature_names = ['a', 'b', 'c']
+    scorer.replay = ReplayBuffer().clear(3)
+    scorer.replay.append([7, 8], X[:2], {'risk_score': np.ones(2)})
+    scorer._compile_models()
+    scorer._save_models()
+    assert scorer.artifact_version == scorer.store.current_version()
+
+    # The replay window is part of the version, so rolling back restores the matching window
+    replay_path = os.path.join(scorer.store.version_dir(), REPLAY_BUFFER_FILE)
+    assert ReplayBuffer(replay_path).load(3).ids.tolist() == [7, 8]
+
+    loaded = MLRiskScorer()
+    assert loaded.load_models()
+    assert loaded.artifact_version == scorer.artifact_version
+    assert loaded.feature_names == ['a', 'b', 'c']
+    assert np.allclose(loaded.compiled.predict_batch(X)['risk_scorer'], scorer.models['risk_scorer'].predict(
+        scorer.scalers['features'].transform(X)))
+
+
+def test_scorer_publish_failure_propagates(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from services.ml_risk_scorer import MLRiskScorer
+
+    X = np.random.default_rng(0).normal(size=(50, 3))
+    scorer = MLRiskScorer()
+    scorer.scalers['features'] = RobustScaler().fit(X)
+    scorer.models['risk_scorer'] = RandomForestRegressor(n_estimators=3, random_state=0).fit(X, X[:, 0])
+    scorer.feature_names = ['a', 'b', 'c']
+    scorer._save_models()
+    published = scorer.artifact_version
+
+    def broken(writer):
+        raise IOError('disk full')
+
+    # A failed publish must not leave the previous version looking like the new models
+    monkeypatch.setattr(scorer.store, 'publish', broken)
+    with pytest.raises(IOError):
+        scorer._save_models()
+    assert scorer.artifact_version == published
+    assert scorer.store.current_version() == published
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, '-q']))
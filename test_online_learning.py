@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test incremental model updates and the replay window they train on
+"""
+import sys
+sys.path.append('.')
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.neural_network import MLPRegressor
+
+from services import online_learning
+from services.online_learning import ReplayBuffer, update_estimator
+
+
+def test_replay_buffer_window_and_relabel(tmp_path):
+    path = str(tmp_path / 'replay.npz')
+    buffer = ReplayBuffer(path, max_rows=5).load(3)
+    buffer.append([1, 2, 3], np.ones((3, 3)), {'crash_1d': np.array([np.nan, np.nan, 1.0])})
+    buffer.append([3, 4, 5, 6], np.full((4, 3), 2.0), {'crash_1d': np.full(4, np.nan), 'risk_score': np.arange(4.0)})
+
+    # Row 3 was replaced by its newer copy and row 1 fell out of the window
+    assert buffer.ids.tolist() == [2, 3, 4, 5, 6]
+    assert buffer.X[:, 0].tolist() == [1, 2, 2, 2, 2]
+    assert np.isnan(buffer.targets['risk_score'][0])
+
+    buffer.relabel(pd.DataFrame({'id': [2, 4, 99], 'crash_1d': [0.0, 1.0, 1.0]}))
+    assert np.array_equal(buffer.targets['crash_1d'], [0.0, np.nan, 1.0, np.nan, np.nan], equal_nan=True)
+
+    buffer.save()
+    reloaded = ReplayBuffer(path, max_rows=5).load(3)
+    assert reloaded.ids.tolist() == buffer.ids.tolist()
+    assert np.array_equal(reloaded.targets['crash_1d'], buffer.targets['crash_1d'], equal_nan=True)
+    assert len(ReplayBuffer(path).load(4)) == 0  # Different feature layout
+
+
+def test_forest_grows_on_new_rows_and_keeps_old_trees(monkeypatch):
+    monkeypatch.setattr(online_learning, 'ONLINE_TREES_PER_UPDATE', 20)
+    monkeypatch.setattr(online_learning, 'ONLINE_MAX_TREES', 50)
+    rng = np.random.default_rng(3)
+    X_old, X_new = rng.normal(size=(300, 4)), rng.normal(size=(300, 4)) + 3
+    y_old, y_new = X_old[:, 0], X_new[:, 0] + 5
+
+    model = RandomForestRegressor(n_estimators=30, random_state=0).fit(X_old, y_old)
+    first_trees = list(model.estimators_)
+    error_before = np.abs(model.predict(X_new) - y_new).mean()
+
+    assert update_estimator(model, X_new, y_new, random_state=0)
+    assert len(model.estimators_) == 50
+    assert model.estimators_[:30] == first_trees
+    assert np.abs(model.predict(X_new) - y_new).mean() < error_before
+
+    update_estimator(model, X_new, y_new, random_state=0)
+    assert len(model.estimators_) == 50 and model.n_estimators == 50
+    assert model.estimators_[0] is first_trees[20]  # Oldest trees dropped first
+
+    # A trimmed forest keeps growing trees from fresh seeds: all 50 are now online trees
+    update_estimator(model, X_new, y_new, random_state=0)
+    assert len({tree.random_state for tree in model.estimators_}) == 50
+    assert model.online_trees_grown_ == 90
+
+
+def test_boosting_and_partial_fit_updates(monkeypatch):
+    monkeypatch.setattr(online_learning, 'ONLINE_MAX_STAGES', 45)
+    rng = np.random.default_rng(5)
+    X = rng.normal(size=(200, 4))
+    y = X[:, 0] - X[:, 1]
+
+    boosting = GradientBoostingRegressor(n_estimators=40, random_state=0).fit(X, y)
+    assert update_estimator(boosting, X, y)
+    assert boosting.n_estimators_ == 45
+    assert update_estimator(boosting, X, y) is None  # At the stage cap
+
+    mlp = MLPRegressor(hidden_layer_sizes=(8,), max_iter=50, random_state=0).fit(X, y)
+    weights = mlp.coefs_[0].copy()
+    assert 'partial_fit' in update_estimator(mlp, X, y, random_state=0)
+    assert not np.array_equal(weights, mlp.coefs_[0])
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, '-q']))
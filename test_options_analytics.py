@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test the options chain snapshot cache and vectorized skew / put-call analytics
+"""
+import sys
+sys.path.append('.')
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.options_analytics import OptionsChainCache, analyze_chain
+
+EXPIRIES = ('2026-10-23', '2026-10-30', '2026-11-20', '2026-12-18', '2027-01-15')
+
+
+class FakeTicker:
+    calls = {'options': 0, 'option_chain': 0}
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    @property
+    def options(self):
+        FakeTicker.calls['options'] += 1
+        return EXPIRIES
+
+    def option_chain(self, expiry):
+        FakeTicker.calls['option_chain'] += 1
+        return _chain(EXPIRIES.index(expiry))
+
+
+def _chain(seed, spot=100.0):
+    rng = np.random.default_rng(seed)
+    strikes = np.arange(70.0, 131.0, 1.0)
+    side = lambda base: pd.DataFrame({
+        'strike': strikes,
+        'volume': rng.integers(0, 500, len(strikes)).astype(float),
+        'openInterest': rng.integers(0, 5000, len(strikes)).astype(float),
+        'impliedVolatility': base + 0.3 * np.abs(strikes / spot - 1) + 0.01 * seed})
+    return SimpleNamespace(calls=side(0.15), puts=side(0.2))
+
+
+@pytest.fixture
+def cache():
+    FakeTicker.calls.update(options=0, option_chain=0)
+    return OptionsChainCache('SPY', ttl=300, expiries=3, ticker_factory=FakeTicker)
+
+
+def test_snapshots_are_reused_until_their_ttl(cache, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('services.options_analytics.time.monotonic', lambda: clock[0])
+
+    chain = cache.snapshot()
+    assert list(pd.unique(chain['expiry'])) == list(EXPIRIES[:3])
+    assert FakeTicker.calls == {'options': 1, 'option_chain': 3}
+
+    clock[0] += 60
+    cache.snapshot()
+    assert FakeTicker.calls == {'options': 1, 'option_chain': 3}
+
+    clock[0] += 300
+    cache.snapshot()
+    assert FakeTicker.calls == {'options': 1, 'option_chain': 6}
+
+
+def test_front_expiry_matches_original_formulas(cache):
+    spot = 100.0
+    analytics = analyze_chain(cache.snapshot(), spot)
+    front = _chain(0)
+
+    assert analytics['put_call_ratio'] == pytest.approx(front.puts['volume'].sum() / front.calls['volume'].sum())
+    put_iv = front.puts[front.puts['strike'] < spot * 0.95]['impliedVolatility'].mean()
+    call_iv = front.calls[front.calls['strike'] > spot * 1.05]['impliedVolatility'].mean()
+    assert analytics['skew'] == pytest.approx(put_iv - call_iv)
+
+    assert analytics['options_expiries'] == 3
+    assert analytics['iv_term_structure'] == pytest.approx((analytics['atm_iv'] + 0.02) / analytics['atm_iv'])
+    assert analytics['iv_put_80_90'] > analytics['iv_put_90_95'] > analytics['iv_atm']
+    assert analytics['put_call_oi_ratio'] > 0
+
+
+def test_without_spot_only_volume_ratios(cache):
+    analytics = analyze_chain(cache.snapshot(), None)
+    assert analytics['put_call_ratio'] is not None
+    assert 'skew' not in analytics and 'atm_iv' not in analytics
+    assert analyze_chain(pd.DataFrame(columns=['expiry']), 100.0) == {}
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, '-q']))
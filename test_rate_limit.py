@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test the rate-limit governor and the paced Twitter sentiment fallback
+"""
+import sys
+sys.path.append('.')
+
+import pytest
+import requests
+import tweepy
+
+import services.data_collector as data_collector
+from services.data_collector import DataCollector
+from services.rate_limit import RateLimitGovernor
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _headers(limit, remaining, reset):
+    return {'x-rate-limit-limit': str(limit), 'x-rate-limit-remaining': str(remaining), 'x-rate-limit-reset': str(reset)}
+
+
+def test_quota_is_spread_over_the_window():
+    clock = Clock()
+    governor = RateLimitGovernor('test', clock=clock)
+    reset = clock.now + 900
+    assert governor.acquire()
+    governor.update(_headers(10, 9, reset))
+    assert governor.wait_seconds() == pytest.approx(100)  # 900 s left for 9 calls
+
+    calls = 1
+    while clock.now < reset:
+        clock.now += 10
+        if governor.acquire():
+            calls += 1
+            governor.update(_headers(10, 10 - calls, reset))
+    assert calls == 10
+
+
+def test_rate_limited_until_reset():
+    clock = Clock()
+    governor = RateLimitGovernor('test', clock=clock)
+    governor.rate_limited(_headers(10, 0, clock.now + 300))
+    clock.now += 299
+    assert not governor.acquire()
+    clock.now += 1
+    assert governor.acquire()
+
+    governor.rate_limited()  # No headers: wait a default window
+    assert governor.wait_seconds() == pytest.approx(900)
+
+
+class FakeClient:
+    def __init__(self, status_code=200, tweets=()):
+        self.status_code = status_code
+        self.tweets = tweets
+        self.calls = 0
+
+    def search_recent_tweets(self, **kwargs):
+        self.calls += 1
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.headers.update(_headers(10, 0 if self.status_code == 429 else 5, 2_000_000))
+        response._content = b'{"data": [' + b','.join(b'{"text": "%s"}' % t.encode() for t in self.tweets) + b']}'
+        if self.status_code == 429:
+            raise tweepy.TooManyRequests(response)
+        return response
+
+
+@pytest.fixture
+def collector(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(data_collector, 'twitter_governor', RateLimitGovernor('Twitter', clock=clock))
+    monkeypatch.setattr(DataCollector, 'latest_market_data', {'vix': 30.0})
+    return DataCollector.__new__(DataCollector)
+
+
+def test_twitter_paced_and_rate_limited_fallback(collector):
+    collector.twitter_client = FakeClient(tweets=['Stocks rally to a record high'])
+    first = collector._get_twitter_sentiment()
+    assert first > 0
+    assert collector._get_twitter_sentiment() == first  # Paced: last reading, no call
+    assert collector.twitter_client.calls == 1
+
+    data_collector.twitter_governor.next_allowed = 0
+    collector.twitter_client = FakeClient(status_code=429)
+    assert collector._get_twitter_sentiment() == -0.03  # VIX 30 from the in-memory snapshot
+    assert collector._get_twitter_sentiment() == -0.03
+    assert collector.twitter_client.calls == 1
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test RiskScore compaction, archival and history reads across both
+"""
+import os
+import sys
+import tempfile
+sys.path.append('.')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'retention.db')}"
+
+from datetime import datetime, timedelta
+
+from app import app, db
+from models import RiskScore, RiskScoreAggregate, SystemLog
+from services.retention import RetentionManager
+
+
+def test_compaction_preserves_history(tmp_path):
+    now = datetime(2026, 6, 1)
+    start = now - timedelta(days=40)
+    scores = [30 + (i % 17) for i in range(3 * 24 * 60)]  # Three days of minute rows, 40 days ago
+
+    with app.app_context():
+        db.session.add_all(RiskScore(timestamp=start + timedelta(minutes=i), score=s, level='LOW',
+                                     market_data={'vix': s}, sentiment_data={}) for i, s in enumerate(scores))
+        db.session.add(SystemLog(timestamp=start, level='INFO', message='old', component='test'))
+        db.session.add(SystemLog(timestamp=now, level='INFO', message='new', component='test'))
+        db.session.commit()
+
+        manager = RetentionManager(archive_dir=str(tmp_path), batch_size=1000, max_batches=100)
+        before = manager.risk_history(start, start + timedelta(days=3), 'hour')
+        summary = manager.run(now)
+
+        assert summary['risk_scores_compacted'] == len(scores)
+        assert summary['system_logs_archived'] == 1
+        assert RiskScore.query.count() == 0
+        assert RiskScoreAggregate.query.filter_by(resolution='hour').count() == 72
+        assert [log.message for log in SystemLog.query.all()] == ['new']
+
+        # Hourly history is identical whether it comes from raw rows or from aggregates
+        after = manager.risk_history(start, start + timedelta(days=3), 'hour')
+        assert len(after) == 72
+        for b, a in zip(before, after):
+            assert b['timestamp'] == a['timestamp'] and b['samples'] == a['samples'] == 60
+            assert abs(b['score'] - a['score']) < 1e-9 and b['score_max'] == a['score_max']
+
+        # Raw minutes are still readable from the archive
+        raw = manager.risk_history(start, start + timedelta(hours=2), 'raw')
+        assert [p['score'] for p in raw] == scores[:120]
+
+        # A year later the hourly aggregates fold into daily ones with the same mean
+        manager.run(now + timedelta(days=400))
+        daily = manager.risk_history(start, start + timedelta(days=3), 'day')
+        assert [d['samples'] for d in daily] == [1440, 1440, 1440]
+        assert abs(daily[0]['score'] - sum(scores[:1440]) / 1440) <= 0.005  # Scores are rounded to 2 dp
+
+
+if __name__ == "__main__":
+    test_compaction_preserves_history(tempfile.mkdtemp())
+    print("✅ Retention tests passed")
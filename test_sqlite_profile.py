@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite profile: WAL pragmas, the single-writer queue and read-only sessions
+"""
+import sys
+sys.path.append('.')
+
+import threading
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
+
+from services.sqlite_profile import SQLiteProfile
+
+
+def test_writes_are_serialized_and_reads_are_read_only(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'profile.db'}"
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'check_same_thread': False, 'timeout': 30}}
+    db = SQLAlchemy(app)
+
+    class Event(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        source = db.Column(db.Integer)
+
+    with app.app_context():
+        db.create_all()
+    profile = SQLiteProfile(app, db)
+
+    def insert(source):
+        db.session.add(Event(source=source))
+        db.session.commit()
+
+    def producer(source):
+        for _ in range(50):
+            profile.writes.run(lambda: insert(source))
+
+    counts = []
+
+    def reader():
+        for _ in range(50):
+            with profile.read_session() as session:
+                counts.append(session.query(Event).count())
+
+    threads = [threading.Thread(target=producer, args=(i,)) for i in range(4)] + [threading.Thread(target=reader)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with profile.read_session() as session:
+        assert session.query(Event).count() == 200
+        assert session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        with pytest.raises(Exception):
+            session.execute(text('DELETE FROM event'))
+    assert counts == sorted(counts)  # Readers only ever see committed, growing state
+
+    # Failed writes surface to the caller and leave the writer usable
+    with pytest.raises(ZeroDivisionError):
+        profile.writes.run(lambda: 1 / 0)
+    profile.writes.run(lambda: insert(9))
+    with profile.read_session() as session:
+        assert session.query(Event).count() == 201
+
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    test_writes_are_serialized_and_reads_are_read_only(pathlib.Path(tempfile.mkdtemp()))
+    print("✅ SQLite profile tests passed")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test batching and backpressure in the buffered SystemLog writer
+"""
+import sys
+sys.path.append('.')
+
+from contextlib import nullcontext
+from types import SimpleNamespace
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text
+
+from services.system_log_writer import SystemLogWriter
+
+system_log = Table('system_log', MetaData(), Column('id', Integer, primary_key=True), Column('timestamp', DateTime),
+                   Column('level', String(20)), Column('message', Text), Column('component', String(50)))
+
+
+class RecordingSession:
+    def __init__(self):
+        self.batches = []
+        self.commits = 0
+
+    def execute(self, statement, rows):
+        self.batches.append(list(rows))
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+def make_writer(**kwargs):
+    session = RecordingSession()
+    app = SimpleNamespace(app_context=nullcontext)
+    return SystemLogWriter(app, SimpleNamespace(session=session), system_log, **kwargs), session
+
+
+def test_entries_are_written_one_commit_per_batch():
+    writer, session = make_writer(batch_size=3, flush_interval=60, max_queue=100)
+    for i in range(7):
+        writer.write('INFO', f'event {i}', 'monitoring')
+
+    writer.flush()
+
+    assert [len(batch) for batch in session.batches] == [3, 3, 1]
+    assert session.commits == 3
+    assert [row['message'] for batch in session.batches for row in batch] == [f'event {i}' for i in range(7)]
+
+
+def test_backpressure_samples_info_and_keeps_errors():
+    writer, session = make_writer(batch_size=100, flush_interval=60, max_queue=10, sample_rate=5)
+    accepted = [writer.write('INFO', f'info {i}') for i in range(15)]
+    assert sum(accepted) == 9  # Everything up to the high-water mark, then one in five
+
+    assert writer.write('ERROR', 'kept')  # Errors are never sampled out
+    assert not writer.write('ERROR', 'lost')  # but a full queue drops anything
+
+    writer.flush()
+
+    messages = [row['message'] for row in session.batches[0]]
+    assert 'kept' in messages and 'lost' not in messages
+    assert messages[-1] == 'Dropped 1 log entries under backpressure'
+
+
+if __name__ == "__main__":
+    test_entries_are_written_one_commit_per_batch()
+    test_backpressure_samples_info_and_keeps_errors()
+    print("✅ SystemLog writer tests passed")
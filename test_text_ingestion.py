@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test deduplicated text ingestion and the time-decayed sentiment aggregate
+"""
+import os
+import sys
+import tempfile
+sys.path.append('.')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'ingestion.db')}"
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from app import app, db
+from models import SeenTextItem
+from services.retention import RetentionManager
+from services.text_ingestion import BloomFilter, DecayedSentiment, TextIngestor
+
+NOW = datetime.utcnow()  # Restored state covers the retention window back from the real clock
+
+
+def _posts(start, stop):
+    return [(f'p{i}', 'Stocks rally to a record high' if i % 2 else 'Recession fears spark a sell-off',
+             NOW - timedelta(minutes=i)) for i in range(start, stop)]
+
+
+@pytest.fixture
+def ingestor():
+    with app.app_context():
+        SeenTextItem.query.delete()
+        db.session.commit()
+        yield TextIngestor(capacity=10000, error_rate=0.001, half_life_minutes=60)
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(1000, 0.01)
+    for i in range(1000):
+        bloom.add(f'key{i}')
+    assert all(f'key{i}' in bloom for i in range(1000))
+    assert sum(f'other{i}' in bloom for i in range(10000)) < 300
+
+
+def test_only_new_items_are_scored(ingestor):
+    assert ingestor.ingest('reddit', _posts(0, 100), NOW) == 100
+    assert ingestor.ingest('reddit', _posts(50, 150), NOW) == 50
+    assert ingestor.ingest('newsapi', _posts(0, 10), NOW) == 10  # Keys are per source
+    assert SeenTextItem.query.filter_by(source='reddit').count() == 150
+
+    # Another process shares the table: its Bloom filter is rebuilt from it
+    restarted = TextIngestor(capacity=10000, error_rate=0.001, half_life_minutes=60)
+    assert restarted.is_seen('reddit', 'p0') and not restarted.is_seen('reddit', 'p150')
+    assert restarted.ingest('reddit', _posts(100, 160), NOW) == 10
+    assert restarted.sentiment('reddit', NOW) == pytest.approx(ingestor.sentiment('reddit', NOW), abs=0.002)
+
+
+def test_collect_stops_paging_at_seen_items(ingestor):
+    ingestor.ingest('reddit', _posts(0, 100), NOW)
+    pulled = []
+
+    def newest_first():
+        for item in _posts(-20, 400):  # 20 new posts, then the ones already ingested
+            pulled.append(item)
+            yield item
+
+    assert ingestor.collect('reddit', newest_first(), NOW, stop_after_seen=10) == 20
+    assert len(pulled) == 30
+
+
+def test_long_ids_are_hashed_not_truncated():
+    prefix = 'https://example.com/markets/' + 'x' * 60
+    first, second = TextIngestor.item_key(prefix + '/a'), TextIngestor.item_key(prefix + '/b')
+    assert first != second and len(first) <= 64
+    assert TextIngestor.item_key('t3_abc') == 't3_abc'
+
+
+def test_filter_is_rebuilt_past_capacity_and_after_pruning(ingestor):
+    small = TextIngestor(capacity=50, error_rate=0.001, half_life_minutes=60)
+    small.ingest('reddit', _posts(0, 40), NOW)
+    assert small.seen_capacity == 50
+    small.ingest('reddit', _posts(40, 80), NOW)
+    assert small.seen is None  # Passed capacity: rebuilt on next use, sized for the retained rows
+    assert small.is_seen('reddit', 'p79') and small.seen_capacity == 160
+
+    old = datetime.utcnow() - timedelta(days=30)
+    SeenTextItem.query.filter(SeenTextItem.item_key.in_([f'p{i}' for i in range(40)])).update(
+        {'seen_at': old}, synchronize_session=False)
+    db.session.commit()
+    manager = RetentionManager()
+    with patch('services.text_ingestion.text_ingestor', small):
+        assert manager.prune_seen_text() == 40
+    assert not small.is_seen('reddit', 'p0') and small.is_seen('reddit', 'p40')
+
+
+def test_decayed_aggregate():
+    aggregate = DecayedSentiment(half_life_minutes=60)
+    aggregate.add([0.2], [NOW - timedelta(hours=1)], NOW)  # Published an hour ago: half weight
+    aggregate.add([-0.1], [NOW], NOW)
+    assert aggregate.value(NOW) == pytest.approx((0.5 * 0.2 - 0.1) / 1.5)
+
+    # Decaying all items equally leaves the mean unchanged; new items then dominate
+    later = NOW + timedelta(hours=5)
+    assert aggregate.value(later) == pytest.approx((0.5 * 0.2 - 0.1) / 1.5)
+    aggregate.add([0.3], [later], later)
+    assert aggregate.value(later) > 0.25
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test incremental RiskScore extraction into the training snapshot
+"""
+import os
+import sys
+import tempfile
+sys.path.append('.')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'training.db')}"
+
+import numpy as np
+from datetime import datetime, timedelta
+
+from app import app, db
+from models import RiskScore
+from services.training_data import TrainingDataLoader, to_training_frame
+from services.training_targets import TargetBuilder, heuristic_crash_targets
+
+
+def _add_scores(start, count, offset=0):
+    db.session.add_all(RiskScore(
+        timestamp=start + timedelta(minutes=offset + i),
+        score=float(offset + i),
+        level='LOW',
+        market_data={'spy': 500 + offset + i, 'vix': '21.5', 'skew': None, 'timestamp': 'ignored'},
+        sentiment_data={'reddit': -0.1} if i % 2 else None
+    ) for i in range(count))
+    db.session.commit()
+
+
+def test_snapshot_appends_only_new_rows(tmp_path):
+    start = datetime(2026, 1, 5)
+    with app.app_context():
+        _add_scores(start, 25)
+        loader = TrainingDataLoader(snapshot_dir=str(tmp_path), chunk_size=10)
+
+        assert loader.refresh() == 25
+        assert [p['rows'] for p in loader.manifest()['parts']] == [10, 10, 5]
+        assert loader.refresh() == 0
+
+        _add_scores(start, 7, offset=25)
+        assert loader.refresh() == 7
+        assert loader.manifest()['rows'] == 32
+
+        frame = loader.load()
+        assert frame['id'].tolist() == sorted(frame['id'].tolist())
+        assert frame['score'].tolist() == [float(i) for i in range(32)]
+        assert frame['market_spy'].dtype == np.float64
+        assert frame['market_vix'].eq(21.5).all()
+        assert frame['market_skew'].isna().all()
+        assert frame['sentiment_reddit'].isna().sum() == 17  # 13 of the first batch, 4 of the second
+        assert frame['timestamp'].iloc[-1] == start + timedelta(minutes=31)
+
+        recent = loader.load(columns=['id', 'score'], max_rows=12)
+        assert list(recent.columns) == ['id', 'score']
+        assert recent['score'].tolist() == [float(i) for i in range(20, 32)]
+        assert sum(len(chunk) for chunk in loader.iter_chunks(['id'])) == 32
+
+        training = to_training_frame(frame.merge(loader.labels(), on='id', how='left'))
+        assert training['risk_score'].iloc[-1] == 31.0
+        assert training['market_direction'].equals(training['return_1d'])
+        assert training['market_vix'].iloc[0] == 21.5
+
+
+def test_targets_use_realized_forward_prices():
+    # Daily closes with a gap over a weekend: 100 flat, a 20% drop on day 10, then recovery
+    days = [d for d in range(40) if d not in (5, 6)]
+    timestamps = [datetime(2026, 1, 1) + timedelta(days=d) for d in days]
+    prices = [80.0 if d == 10 else 100.0 for d in days]
+    prices[3] = np.nan  # Missing quote is carried forward, not treated as a crash
+
+    labels = TargetBuilder().build(timestamps, prices)
+    by_day = dict(zip(days, range(len(days))))
+
+    assert labels.loc[by_day[9], 'crash_1d'] == 1.0
+    assert np.isclose(labels.loc[by_day[9], 'return_1d'], -0.2)
+    assert labels.loc[by_day[8], 'crash_1d'] == 0.0
+    assert np.isclose(labels.loc[by_day[8], 'drawdown_3d'], -0.2)
+    assert labels.loc[by_day[0], 'crash_14d'] == 1.0  # Day 10 is inside [0, 14]
+    assert labels.loc[by_day[4], 'return_3d'] == 0.0  # Looks across the day 5-6 gap to day 7
+    assert labels.loc[by_day[2], 'drawdown_1d'] == 0.0
+    assert labels.loc[by_day[11], 'crash_30d'] != labels.loc[by_day[11], 'crash_30d']  # Day 41 not observed yet
+    assert labels['crash_1d'].iloc[-1] != labels['crash_1d'].iloc[-1]
+
+
+def test_labels_are_cached_with_the_snapshot(tmp_path):
+    start = datetime(2026, 3, 2)
+    with app.app_context():
+        RiskScore.query.delete()
+        _add_scores(start, 5)
+        loader = TrainingDataLoader(snapshot_dir=str(tmp_path), chunk_size=10)
+        loader.refresh()
+        labels = loader.labels(TargetBuilder(horizons=(1,)))
+        assert list(labels.columns) == ['id', 'crash_1d', 'drawdown_1d', 'return_1d']
+        assert labels['crash_1d'].isna().all()  # Five minutes of history resolve no 1-day horizon
+
+        cached = [name for name in os.listdir(loader.version_dir) if name.startswith('labels-')]
+        assert len(cached) == 1
+        assert loader.labels(TargetBuilder(horizons=(1,)))['id'].tolist() == labels['id'].tolist()
+
+        _add_scores(start + timedelta(days=2), 1)
+        loader.refresh()
+        assert len(loader.labels(TargetBuilder(horizons=(1,)))) == 6
+        assert len([name for name in os.listdir(loader.version_dir) if name.startswith('labels-')]) == 1
+
+
+def test_heuristic_targets_match_the_per_row_rule():
+    targets = heuristic_crash_targets([30.0, 12.0, np.nan], [-0.05, 0.1, 0.0])
+    assert np.allclose(targets['crash_1d'], [min(0.95, 0.4 + 0.3), 0.05, 0.2])
+    assert np.allclose(targets['crash_30d'], [0.95, 0.05, 0.4])
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test TreeSHAP attributions against brute-force Shapley values
+"""
+import sys
+import math
+import itertools
+sys.path.append('.')
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+
+from services.tree_explainer import TreeExplainer, ExplanationSet
+
+
+def _conditional_expectation(tree, x, known):
+    """Path-dependent E[f(x) | x_known]: unknown splits average the children by training cover"""
+    def walk(node):
+        if tree.children_left[node] == -1:
+            return tree.value[node].ravel()[0]
+        left, right = tree.children_left[node], tree.children_right[node]
+        if tree.feature[node] in known:
+            return walk(left if np.float32(x[tree.feature[node]]) <= tree.threshold[node] else right)
+        cover = tree.weighted_n_node_samples
+        return (cover[left] * walk(left) + cover[right] * walk(right)) / cover[node]
+    return walk(0)
+
+
+def _brute_force_shap(trees, scale, x):
+    n = len(x)
+    phi = np.zeros(n)
+    for j in range(n):
+        others = [k for k in range(n) if k != j]
+        for size in range(n):
+            weight = math.factorial(size) * math.factorial(n - size - 1) / math.factorial(n)
+            for subset in itertools.combinations(others, size):
+                known = set(subset)
+                for estimator in trees:
+                    tree = estimator.tree_
+                    phi[j] += weight * scale * (_conditional_expectation(tree, x, known | {j})
+                                                - _conditional_expectation(tree, x, known))
+    return phi
+
+
+def test_attributions_match_brute_force_shapley():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(200, 5))
+    y = X[:, 0] * X[:, 1] + np.abs(X[:, 2]) + rng.normal(0, 0.1, 200)
+    forest = RandomForestRegressor(n_estimators=4, max_depth=5, random_state=0).fit(X, y)
+    boosting = GradientBoostingRegressor(n_estimators=4, max_depth=3, random_state=0).fit(X, y)
+    X_test = X[:4] * 1.5
+
+    for model, trees, scale in ((forest, forest.estimators_, 1 / 4), (boosting, boosting.estimators_[:, 0], 0.1)):
+        explainer = TreeExplainer.from_model(model)
+        phi = explainer.shap_values(X_test)
+        for i, x in enumerate(X_test):
+            assert np.allclose(phi[i], _brute_force_shap(trees, scale, x), rtol=0, atol=1e-12)
+        assert np.allclose(phi.sum(axis=1) + explainer.expected_value, model.predict(X_test), rtol=0, atol=1e-9)
+
+
+def test_explanation_set_caches_and_round_trips(tmp_path):
+    rng = np.random.default_rng(2)
+    X = rng.normal(size=(300, 6))
+    y = X[:, 0] - X[:, 3] ** 2
+    models = {'risk_scorer': RandomForestRegressor(n_estimators=10, max_depth=6, random_state=0).fit(X, y),
+              'crash_predictor_1d': GradientBoostingRegressor(n_estimators=10, random_state=0).fit(X, y),
+              'sentiment_analyzer': RandomForestRegressor(n_estimators=2, random_state=0).fit(X, y)}
+    names = [f'f{i}' for i in range(6)]
+    explanations = ExplanationSet.build(models, names)
+    assert set(explanations.explainers) == {'risk_scorer', 'crash_predictor_1d'}
+
+    only = explanations.explain(X[0], ['risk_scorer'])
+    assert list(only) == ['risk_scorer']
+    assert list(explanations._cache) == [(X[0].tobytes(), 'risk_scorer')]  # Other models not computed
+
+    first = explanations.explain(X[0])
+    assert first['risk_scorer'] is only['risk_scorer']
+    assert explanations.explain(X[0])['crash_predictor_1d'] is first['crash_predictor_1d']
+    total = sum(first['risk_scorer']['contributions'].values()) + first['risk_scorer']['expected_value']
+    assert abs(total - models['risk_scorer'].predict(X[:1])[0]) <= 1e-9
+
+    path = tmp_path / 'explainer.npz'
+    explanations.save(path)
+    loaded = ExplanationSet.load(path)
+    assert loaded.feature_names == names
+    assert loaded.explain(X[0]) == first
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, '-q']))